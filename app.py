@@ -6,9 +6,7 @@ Streamlit-based text world generator with optional LLM integration
 import streamlit as st
 import json
 import os
-from datetime import datetime
-from world_generator import WorldGenerator
-from pathlib import Path
+from world_generator import WorldGenerator, public_world
 
 # Page config
 st.set_page_config(
@@ -60,13 +58,113 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def configured_api_key() -> str:
+    """API key from the environment or Streamlit secrets ('' if neither is set)"""
+    env_api_key = os.environ.get("ANTHROPIC_API_KEY", "")
+    secrets_api_key = ""
+    try:
+        secrets_api_key = st.secrets.get("ANTHROPIC_API_KEY", "")
+    except:
+        pass
+    return env_api_key or secrets_api_key
+
+@st.cache_resource
+def get_world_store():
+    """Shared world store, enabled by setting WORLD_FORGE_DB"""
+    db_path = os.environ.get("WORLD_FORGE_DB")
+    if not db_path:
+        return None
+    from world_store import WorldStore
+    return WorldStore(db_path, batch_size=1)
+
+@st.cache_resource
+def get_profiler():
+    """Slow-generation log shared by every session, shown on the admin panel (WORLD_FORGE_ADMIN=1)"""
+    from profiler import GenerationProfiler
+    return GenerationProfiler(threshold=float(os.environ.get("WORLD_FORGE_PROFILE_THRESHOLD", "1.0")))
+
+# Example prompts shown in the sidebar; these are pre-generated by the warm cache
+EXAMPLE_PROMPTS = [
+    "A throne room with a jester who tells dad jokes",
+    "Dark dungeon, held together by hope, explosive barrels",
+    "Cozy tavern with a grumpy bartender and three goblins",
+    "Cyberpunk alley with neon signs and a shady merchant",
+    "Peaceful library with a sleeping wizard",
+    "Convergence Zero control room with malfunctioning robots"
+]
+
+@st.cache_resource
+def get_warm_cache():
+    """Pre-generated variants of the example prompts (plus WORLD_FORGE_WARM_PROMPTS), refreshed in the background"""
+    from warm_cache import WarmCache, load_prompts
+    
+    prompts = list(EXAMPLE_PROMPTS)
+    if os.environ.get("WORLD_FORGE_WARM_PROMPTS"):
+        prompts += load_prompts(os.environ["WORLD_FORGE_WARM_PROMPTS"])
+    
+    # Same key source as the sidebar, so sessions using the configured key match the cache
+    generator = WorldGenerator(
+        api_key=configured_api_key() or None,
+        template_dir=os.environ.get("WORLD_FORGE_TEMPLATES"),
+    )
+    cache = WarmCache(
+        generator,
+        prompts,
+        variants=int(os.environ.get("WORLD_FORGE_WARM_VARIANTS", "3")),
+        refresh_interval=float(os.environ.get("WORLD_FORGE_WARM_REFRESH", "3600")),
+    )
+    cache.start()
+    return cache
+
+# Start warming the example prompts as soon as the page first loads (once per server)
+warm_cache = get_warm_cache()
+
 # Initialize session state
 if 'worlds' not in st.session_state:
     st.session_state.worlds = []
 if 'generator' not in st.session_state:
-    st.session_state.generator = WorldGenerator()
+    st.session_state.generator = WorldGenerator(
+        template_dir=os.environ.get("WORLD_FORGE_TEMPLATES"),
+        world_store=get_world_store(),
+    )
 
-def render_world(world: dict):
+# Sections that get a reroll button, with their labels
+REROLL_SECTIONS = [
+    ("name", "Name"),
+    ("atmosphere", "Atmosphere"),
+    ("npcs", "Characters"),
+    ("mood_tags", "Mood"),
+]
+
+def forge_world(prompt: str) -> dict:
+    """Serve a prefetched or warm-cached world when there is one, otherwise generate it"""
+    generator = st.session_state.generator
+    prefetcher = st.session_state.get('prefetcher')
+    
+    world = prefetcher.take(prompt) if prefetcher else None
+    if world is None:
+        world = warm_cache.get(prompt, generator)
+    if world is None:
+        if prefetcher:
+            with prefetcher.foreground():
+                world = generator.generate(prompt)
+        else:
+            world = generator.generate(prompt)
+    return world
+
+def follow_exit(destination: str):
+    """Generate the room an exit leads to"""
+    try:
+        st.session_state.worlds.append(forge_world(destination))
+    except Exception as e:
+        st.error(f"Generation failed: {str(e)}")
+
+def reroll(index: int, section: str):
+    """Regenerate one section of a stored world in place"""
+    world = st.session_state.worlds[index]
+    st.session_state.worlds[index] = st.session_state.generator.regenerate(world, [section])
+
+def render_world(world: dict, index: int):
     """Render a generated world in a nice format"""
     
     st.markdown(f"""
@@ -76,6 +174,13 @@ def render_world(world: dict):
     </div>
     """, unsafe_allow_html=True)
     
+    # Per-section rerolls
+    reroll_cols = st.columns(len(REROLL_SECTIONS))
+    for col, (section, label) in zip(reroll_cols, REROLL_SECTIONS):
+        with col:
+            st.button(f"🎲 {label}", key=f"reroll_{section}_{index}",
+                      on_click=reroll, args=(index, section), use_container_width=True)
+    
     # Layout columns
     col1, col2 = st.columns([2, 1])
     
@@ -122,11 +227,12 @@ def render_world(world: dict):
         if world.get('exits'):
             st.markdown("### 🚪 Exits")
             for exit_dir, exit_desc in world['exits'].items():
-                st.write(f"**{exit_dir.title()}:** {exit_desc}")
+                st.button(f"{exit_dir.title()}: {exit_desc}", key=f"exit_{exit_dir}_{index}",
+                          on_click=follow_exit, args=(exit_desc,), use_container_width=True)
 
 def export_world(world: dict) -> str:
-    """Export world to JSON string"""
-    return json.dumps(world, indent=2, default=str)
+    """Export world to JSON string, without the generator's internal bookkeeping"""
+    return json.dumps(public_world(world), indent=2, default=str)
 
 # Sidebar
 with st.sidebar:
@@ -139,14 +245,7 @@ with st.sidebar:
     st.markdown("### 🔑 LLM Configuration")
     
     # Check for API key in environment or secrets first
-    env_api_key = os.environ.get("ANTHROPIC_API_KEY", "")
-    secrets_api_key = ""
-    try:
-        secrets_api_key = st.secrets.get("ANTHROPIC_API_KEY", "")
-    except:
-        pass
-    
-    default_key = env_api_key or secrets_api_key
+    default_key = configured_api_key()
     
     if default_key:
         st.success("✓ API key configured (from environment)")
@@ -187,8 +286,58 @@ with st.sidebar:
     st.session_state.generator.include_props = include_props
     st.session_state.generator.include_exits = include_exits
     
+    prefetch_exits = st.checkbox(
+        "Prefetch exits",
+        value=False,
+        help="Generate the rooms behind each exit in the background, so following an exit is instant"
+    )
+    if prefetch_exits and 'prefetcher' not in st.session_state:
+        from prefetch import Prefetcher
+        st.session_state.prefetcher = Prefetcher(st.session_state.generator)
+    elif not prefetch_exits and 'prefetcher' in st.session_state:
+        st.session_state.prefetcher.shutdown()
+        del st.session_state.prefetcher
+    
     st.divider()
     
+    # Admin: opt-in profiling of slow generations
+    if os.environ.get("WORLD_FORGE_ADMIN"):
+        with st.expander("🩺 Admin: Slow Generations"):
+            profiler = get_profiler()
+            profiling = st.checkbox("Profile generations", value=bool(st.session_state.get('profiling')))
+            st.session_state.profiling = profiling
+            st.session_state.generator.profiler = profiler if profiling else None
+            
+            profiler.threshold = st.number_input("Threshold (seconds)", min_value=0.0, value=profiler.threshold, step=0.1)
+            profiler.mode = st.selectbox("Mode", ["sample", "cprofile", "off"],
+                                         index=["sample", "cprofile", "off"].index(profiler.mode),
+                                         help="sample: cheap stack sampling; cprofile: exact but slower; off: timings only")
+            
+            stats = profiler.stats()
+            st.caption(f"{stats['calls']} profiled, {stats['slow_calls']} slow, {stats['logged']} kept")
+            slowest = profiler.slowest()
+            if slowest:
+                # Expanders cannot nest, so one call at a time is shown in full
+                index = st.selectbox(
+                    "Slowest calls",
+                    range(len(slowest)),
+                    format_func=lambda i: f"{slowest[i].duration * 1000:.0f} ms · {slowest[i].source} · {slowest[i].prompt[:30]}",
+                )
+                call = slowest[index]
+                st.write({name: f"{seconds * 1000:.1f} ms" for name, seconds in call.stages.items()})
+                st.code(call.profile or "(no profile)", language=None)
+            
+            col_a, col_b = st.columns(2)
+            with col_a:
+                st.download_button("Download", json.dumps(profiler.to_dict(), indent=2),
+                                   file_name="slow_generations.json", mime="application/json")
+            with col_b:
+                if st.button("Clear"):
+                    profiler.clear()
+                    st.rerun()
+        
+        st.divider()
+    
     # World history
     if st.session_state.worlds:
         st.markdown("### 📜 History")
@@ -200,15 +349,7 @@ with st.sidebar:
     
     # Examples
     st.markdown("### 💡 Try These")
-    examples = [
-        "A throne room with a jester who tells dad jokes",
-        "Dark dungeon, held together by hope, explosive barrels",
-        "Cozy tavern with a grumpy bartender and three goblins",
-        "Cyberpunk alley with neon signs and a shady merchant",
-        "Peaceful library with a sleeping wizard",
-        "Convergence Zero control room with malfunctioning robots"
-    ]
-    for example in examples:
+    for example in EXAMPLE_PROMPTS:
         if st.button(f"_{example[:35]}..._", key=f"ex_{hash(example)}"):
             st.session_state.prompt_input = example
 
@@ -238,7 +379,7 @@ with col2:
 if generate_btn and prompt:
     with st.spinner("Forging your world..."):
         try:
-            world = st.session_state.generator.generate(prompt)
+            world = forge_world(prompt)
             st.session_state.worlds.append(world)
             st.session_state.prompt_input = ""  # Clear input
             st.success(f"✨ Created: {world['name']}")
@@ -249,13 +390,19 @@ if generate_btn and prompt:
 if st.session_state.worlds:
     st.divider()
     
+    # Warm up the rooms behind the newest world's exits while the user reads it
+    if 'prefetcher' in st.session_state:
+        st.session_state.prefetcher.prefetch(st.session_state.worlds[-1])
+    
     # Tabs for multiple worlds
     if len(st.session_state.worlds) > 1:
-        tabs = st.tabs([f"🏰 {w['name'][:20]}" for w in st.session_state.worlds[-5:]])
+        recent = st.session_state.worlds[-5:]
+        first = len(st.session_state.worlds) - len(recent)
+        tabs = st.tabs([f"🏰 {w['name'][:20]}" for w in recent])
         for i, tab in enumerate(tabs):
             with tab:
-                world = st.session_state.worlds[-(5-i)] if len(st.session_state.worlds) > i else st.session_state.worlds[i]
-                render_world(world)
+                world = recent[i]
+                render_world(world, first + i)
                 
                 # Export options
                 with st.expander("📤 Export"):
@@ -267,7 +414,7 @@ if st.session_state.worlds:
                         mime="application/json"
                     )
     else:
-        render_world(st.session_state.worlds[-1])
+        render_world(st.session_state.worlds[-1], len(st.session_state.worlds) - 1)
         with st.expander("📤 Export"):
             st.code(export_world(st.session_state.worlds[-1]), language="json")
             st.download_button(
@@ -0,0 +1,196 @@
+"""
+Batch Jobs - Offline world generation through the Anthropic Message Batches API
+Job state is persisted to a local JSON file so long-running jobs can resume
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Optional
+from dataclasses import dataclass, field
+from world_generator import WorldGenerator, LLM_MODEL, SYSTEM_PROMPT, extract_json, public_world
+
+# The API accepts up to 100,000 requests per batch; smaller chunks finish sooner
+MAX_REQUESTS_PER_BATCH = 10000
+
+
+@dataclass
+class BatchJob:
+    """Submits prompts as message batches, polls them, and collects worlds to NDJSON
+
+    Pass a `client` (or a `base_url`) to run against a local stub of the batch endpoints.
+    """
+    
+    state_path: str
+    generator: WorldGenerator = field(default_factory=WorldGenerator)
+    client: Optional[object] = None
+    base_url: Optional[str] = None
+    max_tokens: int = 1500
+    state: dict = field(default_factory=dict)
+    
+    def __post_init__(self):
+        path = Path(self.state_path)
+        if path.exists():
+            self.state = json.loads(path.read_text())
+    
+    def _get_client(self):
+        """Create the Anthropic client on first use"""
+        if self.client is None:
+            import anthropic
+            
+            self.client = anthropic.Anthropic(api_key=self.generator.api_key, base_url=self.base_url)
+        return self.client
+    
+    def _save(self):
+        """Write job state atomically so an interrupted job can resume"""
+        path = Path(self.state_path)
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        tmp.write_text(json.dumps(self.state, indent=2))
+        tmp.replace(path)
+    
+    def submit(self, prompts: list):
+        """Submit prompts in chunks, skipping chunks already submitted by an earlier run"""
+        if not self.state:
+            self.state = {'prompts': list(prompts), 'batches': [], 'output_lines': 0}
+            self._save()
+        
+        prompts = self.state['prompts']
+        client = self._get_client()
+        
+        for start in range(0, len(prompts), MAX_REQUESTS_PER_BATCH):
+            if any(b['start'] == start for b in self.state['batches']):
+                continue
+            
+            end = min(start + MAX_REQUESTS_PER_BATCH, len(prompts))
+            requests = [
+                {
+                    'custom_id': f"world-{i}",
+                    'params': {
+                        'model': LLM_MODEL,
+                        'max_tokens': self.max_tokens,
+                        'system': SYSTEM_PROMPT,
+                        'messages': [
+                            {"role": "user", "content": f"Create a world based on: {prompts[i]}"}
+                        ],
+                    },
+                }
+                for i in range(start, end)
+            ]
+            
+            batch = client.messages.batches.create(requests=requests)
+            self.state['batches'].append({
+                'id': batch.id,
+                'start': start,
+                'end': end,
+                'status': batch.processing_status,
+                'collected': False,
+            })
+            self._save()
+    
+    def poll(self) -> bool:
+        """Refresh batch statuses, returning True once every batch has ended"""
+        client = self._get_client()
+        
+        for batch_state in self.state.get('batches', []):
+            if batch_state['status'] != 'ended':
+                batch = client.messages.batches.retrieve(batch_state['id'])
+                batch_state['status'] = batch.processing_status
+        
+        self._save()
+        return all(b['status'] == 'ended' for b in self.state.get('batches', []))
+    
+    def _parse_result(self, entry, prompt: str) -> Optional[dict]:
+        """Turn a batch result entry into a world, or None if it failed"""
+        if entry.result.type != 'succeeded':
+            return None
+        
+        try:
+            world = extract_json(entry.result.message.content[0].text)
+        except Exception:
+            return None
+        if not isinstance(world, dict):
+            # A list or bare value parsed fine but is not a world
+            return None
+        
+        world['source'] = 'llm'
+        world['original_prompt'] = prompt
+        return world
+    
+    def collect(self, output_path: str) -> int:
+        """Append worlds from ended batches to an NDJSON file, in prompt order
+
+        The file size after each collected batch is saved with the job state; on
+        resume anything past it (a batch written just before a crash, but not yet
+        marked collected) is truncated, so no batch is written twice.
+        """
+        client = self._get_client()
+        prompts = self.state['prompts']
+        written = 0
+        
+        path = Path(output_path)
+        size = path.stat().st_size if path.exists() else 0
+        if 'output_bytes' not in self.state:
+            self.state['output_bytes'] = size
+            self._save()
+        committed = self.state['output_bytes']
+        if size > committed:
+            with open(output_path, 'r+b') as f:
+                f.truncate(committed)
+        
+        with open(output_path, 'a') as out:
+            for batch_state in self.state['batches']:
+                if batch_state['collected'] or batch_state['status'] != 'ended':
+                    continue
+                
+                worlds = {}
+                for entry in client.messages.batches.results(batch_state['id']):
+                    i = int(entry.custom_id.split('-')[1])
+                    worlds[i] = self._parse_result(entry, prompts[i])
+                
+                # Fill failed, expired or missing results from templates
+                for i in range(batch_state['start'], batch_state['end']):
+                    world = worlds.get(i) or self.generator._generate_with_templates(prompts[i])
+                    out.write(json.dumps(public_world(world), default=str) + "\n")
+                    written += 1
+                
+                out.flush()
+                batch_state['collected'] = True
+                self.state['output_lines'] += batch_state['end'] - batch_state['start']
+                self.state['output_bytes'] = out.tell()
+                self._save()
+        
+        return written
+    
+    def run(self, prompts: list, output_path: str, poll_interval: float = 60.0) -> int:
+        """Submit (or resume) a job, wait for it to finish, and collect the results"""
+        self.submit(prompts)
+        while not self.poll():
+            self.collect(output_path)
+            time.sleep(poll_interval)
+        self.collect(output_path)
+        return self.state['output_lines']
+
+
+def main():
+    import argparse
+    import os
+    
+    parser = argparse.ArgumentParser(description="Generate worlds offline with the Message Batches API")
+    parser.add_argument('prompts', help="Text file with one prompt per line")
+    parser.add_argument('output', help="NDJSON file to append generated worlds to")
+    parser.add_argument('--state', default='batch_job.json', help="Job state file (reused to resume)")
+    parser.add_argument('--poll-interval', type=float, default=60.0)
+    parser.add_argument('--base-url', default=None, help="Override the API endpoint, e.g. a local stub")
+    args = parser.parse_args()
+    
+    with open(args.prompts) as f:
+        prompts = [line.strip() for line in f if line.strip()]
+    
+    generator = WorldGenerator(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+    job = BatchJob(args.state, generator=generator, base_url=args.base_url)
+    count = job.run(prompts, args.output, poll_interval=args.poll_interval)
+    print(f"Wrote {count} worlds to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Import-time benchmark - Cold-start cost of each World Forge entry point
+Every measurement runs in a fresh interpreter, like a newly started dyno
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+# Entry point -> code that brings it up to "ready to generate"
+ENTRY_POINTS = {
+    'world_generator': "import world_generator",
+    'cli': "import cli",
+    'template_generate': "from world_generator import WorldGenerator; WorldGenerator().generate('a dark dungeon')",
+    'batch_jobs': "import batch_jobs",
+    'app': "import streamlit; import app",
+}
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'anthropic_loaded': 'anthropic' in sys.modules, 'modules': len(sys.modules)}}))
+"""
+
+
+def measure(code: str, runs: int) -> dict:
+    """Time one entry point over several fresh interpreters"""
+    samples = []
+    wall = []
+    last = {}
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE.format(code=code)],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        wall.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'
+            return {'error': error}
+        last = json.loads(result.stdout.strip().splitlines()[-1])
+        samples.append(last['seconds'])
+    
+    return {
+        'import_ms': round(statistics.median(samples) * 1000, 1),
+        'process_ms': round(statistics.median(wall) * 1000, 1),
+        'anthropic_loaded': last['anthropic_loaded'],
+        'modules': last['modules'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time for each entry point")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--importtime', metavar='ENTRY', help="Dump `python -X importtime` for one entry point")
+    args = parser.parse_args()
+    
+    if args.importtime:
+        subprocess.run([sys.executable, '-X', 'importtime', '-c', ENTRY_POINTS[args.importtime]], cwd=ROOT)
+        return
+    
+    print(f"{'entry point':<20}{'import ms':>12}{'process ms':>12}{'modules':>10}  anthropic")
+    for name, code in ENTRY_POINTS.items():
+        stats = measure(code, args.runs)
+        if 'error' in stats:
+            print(f"{name:<20}  unavailable: {stats['error']}")
+            continue
+        print(f"{name:<20}{stats['import_ms']:>12}{stats['process_ms']:>12}{stats['modules']:>10}  "
+              f"{'yes' if stats['anthropic_loaded'] else 'no'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+World Forge CLI - Generate worlds from the command line
+Template-only runs never import the anthropic SDK
+"""
+
+import argparse
+import json
+import os
+import sys
+from world_generator import WorldGenerator, public_world
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate worlds from natural language prompts")
+    parser.add_argument('prompt', nargs='?', help="Describe the world to create")
+    parser.add_argument('--batch', help="Text file with one prompt per line")
+    parser.add_argument('--out', help="Write NDJSON here instead of printing to stdout")
+    parser.add_argument('--templates', action='store_true', help="Use template generation even if ANTHROPIC_API_KEY is set")
+    parser.add_argument('--template-dir', default=os.environ.get("WORLD_FORGE_TEMPLATES"), help="Template pack directory")
+    parser.add_argument('--transport', help="LLM transport: live, record:DIR or replay:DIR[?latency=..&error_rate=..]")
+    parser.add_argument('--parquet', help="Also write the worlds to this Parquet file (needs pyarrow)")
+    parser.add_argument('--internal', action='store_true',
+                        help="Keep the parse/seed/rerolls bookkeeping in the JSON (needed to reroll sections later)")
+    parser.add_argument('--profile', type=float, metavar='SECONDS',
+                        help="Log generations slower than this, with stage timings and a profile, to stderr")
+    parser.add_argument('--profile-mode', choices=('sample', 'cprofile', 'off'), default='sample')
+    parser.add_argument('--profile-out', help="Also save the slow-generation log as JSON (read it with profiler.py)")
+    args = parser.parse_args(argv)
+    
+    if not args.prompt and not args.batch:
+        parser.error("give a prompt or --batch FILE")
+    
+    api_key = None if args.templates else os.environ.get("ANTHROPIC_API_KEY")
+    transport = None
+    if args.transport and not args.templates:
+        from transport import make_transport
+        
+        transport = make_transport(args.transport, api_key)
+        # Replays need no real key, but the LLM path only runs when one is set
+        if args.transport.startswith('replay'):
+            api_key = api_key or 'replay'
+    profiler = None
+    if args.profile is not None:
+        from profiler import GenerationProfiler
+        
+        profiler = GenerationProfiler(threshold=args.profile, mode=args.profile_mode)
+    generator = WorldGenerator(api_key=api_key, template_dir=args.template_dir, transport=transport,
+                               profiler=profiler)
+    
+    if args.batch:
+        with open(args.batch) as f:
+            prompts = [line.strip() for line in f if line.strip()]
+        worlds = generator.generate_batch(prompts)
+    else:
+        worlds = [generator.generate(args.prompt)]
+    
+    if args.parquet:
+        from world_batch import WorldBatch
+        
+        WorldBatch.from_worlds(worlds).to_parquet(args.parquet)
+    
+    exported = worlds if args.internal else [public_world(world) for world in worlds]
+    out = open(args.out, 'w') if args.out else sys.stdout
+    try:
+        if args.out or args.batch:
+            for world in exported:
+                out.write(json.dumps(world, default=str) + "\n")
+        else:
+            out.write(json.dumps(exported[0], indent=2, default=str) + "\n")
+    finally:
+        if args.out:
+            out.close()
+    
+    if profiler is not None:
+        print(profiler.report(), file=sys.stderr)
+        if args.profile_out:
+            profiler.save(args.profile_out)
+
+
+if __name__ == '__main__':
+    main()
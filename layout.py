@@ -0,0 +1,357 @@
+"""
+Map Layout - Places rooms on a 3D lattice with consistent two-way exits
+Procedural rooms are generated chunk by chunk around a focus point; placed worlds overlay them
+"""
+
+import argparse
+import time
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+from template_packs import TemplatePack, default_pack
+
+# Direction -> (dx, dy, dz); each direction owns one bit of a cell's link mask
+DIRECTIONS = {
+    'east': (1, 0, 0),
+    'west': (-1, 0, 0),
+    'north': (0, 1, 0),
+    'south': (0, -1, 0),
+    'up': (0, 0, 1),
+    'down': (0, 0, -1),
+}
+BITS = {direction: 1 << i for i, direction in enumerate(DIRECTIONS)}
+OPPOSITE = {
+    'east': 'west', 'west': 'east',
+    'north': 'south', 'south': 'north',
+    'up': 'down', 'down': 'up',
+}
+
+CHUNK_WIDTH = 32   # cells per chunk along x and y
+CHUNK_DEPTH = 4    # cells per chunk along z
+EMPTY = -1
+
+_M1 = np.uint64(0x9E3779B97F4A7C15)
+_M2 = np.uint64(0xBF58476D1CE4E5B9)
+_M3 = np.uint64(0x94D049BB133111EB)
+
+
+def cell_hash(x, y, z, salt: int, seed: int):
+    """Stateless 64-bit hash of lattice coordinates (splitmix64 finalizer), vectorized over arrays"""
+    # Wraparound is intended; numpy only warns about it for scalars
+    with np.errstate(over='ignore'):
+        h = (np.asarray(x).astype(np.uint64) * _M1) ^ (np.asarray(y).astype(np.uint64) * _M2)
+        h ^= np.asarray(z).astype(np.uint64) * _M3
+        h ^= np.uint64((seed * 1_000_003 + salt) & 0xFFFFFFFFFFFFFFFF)
+        h ^= h >> np.uint64(30)
+        h *= _M2
+        h ^= h >> np.uint64(27)
+        h *= _M3
+        h ^= h >> np.uint64(31)
+    return h
+
+
+def offset(pos: tuple, direction: str) -> tuple:
+    """The cell one step from pos in a direction"""
+    dx, dy, dz = DIRECTIONS[direction]
+    return (pos[0] + dx, pos[1] + dy, pos[2] + dz)
+
+
+class Chunk:
+    """Dense room-type and link-mask arrays for one CHUNK_WIDTH x CHUNK_WIDTH x CHUNK_DEPTH block"""
+    
+    __slots__ = ('key', 'types', 'links')
+    
+    def __init__(self, key: tuple, types, links):
+        self.key = key
+        self.types = types
+        self.links = links
+    
+    @property
+    def origin(self) -> tuple:
+        cx, cy, cz = self.key
+        return (cx * CHUNK_WIDTH, cy * CHUNK_WIDTH, cz * CHUNK_DEPTH)
+    
+    @property
+    def room_count(self) -> int:
+        return int((self.types != EMPTY).sum())
+    
+    @property
+    def nbytes(self) -> int:
+        return self.types.nbytes + self.links.nbytes
+
+
+class MapLayout:
+    """Spatially hashed lattice of rooms
+
+    Procedural rooms and links are pure functions of (seed, coordinates), so a chunk
+    evicted from the bounded LRU is rebuilt identically when it is next visited.
+    Links are decided per edge, so both rooms always agree on a shared exit.
+    Changes made by place() and link() are kept as sparse per-chunk overrides.
+    """
+    
+    def __init__(self, seed: int = 0, density: float = 0.55, link_chance: float = 0.7,
+                 vertical_chance: float = 0.08, max_chunks: int = 256, templates: Optional[TemplatePack] = None):
+        self.seed = seed
+        self.density = density
+        self.link_chance = link_chance
+        self.vertical_chance = vertical_chance
+        self.max_chunks = max_chunks
+        self.templates = templates or default_pack()
+        self.room_types = [t for t in self.templates.ROOM_TEMPLATES if t != 'generic'] + ['generic']
+        self.chunks = OrderedDict()
+        self.overrides = {}
+        self.worlds = {}
+        self.chunks_built = 0
+        self.rooms_built = 0
+        self.build_seconds = 0.0
+    
+    # Spatial hash
+    
+    @staticmethod
+    def chunk_key(pos: tuple) -> tuple:
+        """Chunk containing a cell"""
+        return (pos[0] // CHUNK_WIDTH, pos[1] // CHUNK_WIDTH, pos[2] // CHUNK_DEPTH)
+    
+    @staticmethod
+    def _local(pos: tuple) -> tuple:
+        return (pos[0] % CHUNK_WIDTH, pos[1] % CHUNK_WIDTH, pos[2] % CHUNK_DEPTH)
+    
+    def chunk(self, key: tuple) -> Chunk:
+        """Load a chunk, building it on demand and evicting the least recently used"""
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+        
+        chunk = self._build_chunk(key)
+        self.chunks[key] = chunk
+        while len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+        return chunk
+    
+    def _build_chunk(self, key: tuple) -> Chunk:
+        """Generate a chunk's rooms and links from the seed, then apply overrides"""
+        start = time.perf_counter()
+        x0, y0, z0 = key[0] * CHUNK_WIDTH, key[1] * CHUNK_WIDTH, key[2] * CHUNK_DEPTH
+        
+        # One cell of padding on each side so links across chunk borders agree
+        xs = np.arange(x0 - 1, x0 + CHUNK_WIDTH + 1, dtype=np.int64)
+        ys = np.arange(y0 - 1, y0 + CHUNK_WIDTH + 1, dtype=np.int64)
+        zs = np.arange(z0 - 1, z0 + CHUNK_DEPTH + 1, dtype=np.int64)
+        X, Y, Z = np.meshgrid(xs, ys, zs, indexing='ij')
+        
+        h = cell_hash(X, Y, Z, 0, self.seed)
+        occupied = (h % np.uint64(10_000)) < np.uint64(int(self.density * 10_000))
+        
+        def inner(array, delta=(0, 0, 0)):
+            dx, dy, dz = delta
+            return array[1 + dx:1 + dx + CHUNK_WIDTH, 1 + dy:1 + dy + CHUNK_WIDTH, 1 + dz:1 + dz + CHUNK_DEPTH]
+        
+        here = inner(occupied)
+        types = np.where(here, (inner(h) >> np.uint64(32)) % np.uint64(len(self.room_types) - 1), EMPTY).astype(np.int8)
+        links = np.zeros(types.shape, dtype=np.uint8)
+        
+        # Each edge is keyed by its lower cell and axis
+        for salt, (positive, negative) in enumerate((('east', 'west'), ('north', 'south'), ('up', 'down')), 1):
+            chance = self.vertical_chance if positive == 'up' else self.link_chance
+            edge = (cell_hash(X, Y, Z, salt, self.seed) % np.uint64(10_000)) < np.uint64(int(chance * 10_000))
+            delta = DIRECTIONS[positive]
+            back = DIRECTIONS[negative]
+            links |= np.where(here & inner(occupied, delta) & inner(edge), BITS[positive], 0).astype(np.uint8)
+            links |= np.where(here & inner(occupied, back) & inner(edge, back), BITS[negative], 0).astype(np.uint8)
+        
+        for local, (type_index, mask) in self.overrides.get(key, {}).items():
+            types[local] = type_index
+            links[local] = mask
+        
+        chunk = Chunk(key, types, links)
+        self.chunks_built += 1
+        self.rooms_built += chunk.room_count
+        self.build_seconds += time.perf_counter() - start
+        return chunk
+    
+    def _set_cell(self, pos: tuple, type_index: int, mask: int):
+        """Change one cell, recording the change so it survives chunk eviction"""
+        key = self.chunk_key(pos)
+        local = self._local(pos)
+        self.overrides.setdefault(key, {})[local] = (type_index, mask)
+        chunk = self.chunk(key)
+        chunk.types[local] = type_index
+        chunk.links[local] = mask
+    
+    # Queries
+    
+    def room_type(self, pos: tuple) -> Optional[str]:
+        """Room type at a cell, or None if it is empty"""
+        index = int(self.chunk(self.chunk_key(pos)).types[self._local(pos)])
+        return None if index == EMPTY else self.room_types[index]
+    
+    def links(self, pos: tuple) -> int:
+        """Link bitmask of a cell (see BITS)"""
+        return int(self.chunk(self.chunk_key(pos)).links[self._local(pos)])
+    
+    def exits(self, pos: tuple) -> dict:
+        """Direction -> neighbouring cell for every exit of a room"""
+        mask = self.links(pos)
+        return {direction: offset(pos, direction) for direction, bit in BITS.items() if mask & bit}
+    
+    def ensure_around(self, focus: tuple, radius: int = 1) -> int:
+        """Load every chunk within `radius` chunks of a focus cell, returning their room count"""
+        cx, cy, cz = self.chunk_key(focus)
+        rooms = 0
+        for dz in range(-radius, radius + 1):
+            for dy in range(-radius, radius + 1):
+                for dx in range(-radius, radius + 1):
+                    rooms += self.chunk((cx + dx, cy + dy, cz + dz)).room_count
+        return rooms
+    
+    def rooms_near(self, focus: tuple, radius: int) -> list:
+        """Occupied cells within a Chebyshev radius of a focus cell"""
+        low = (focus[0] - radius, focus[1] - radius, focus[2] - radius)
+        high = (focus[0] + radius, focus[1] + radius, focus[2] + radius)
+        low_key, high_key = self.chunk_key(low), self.chunk_key(high)
+        
+        found = []
+        for cz in range(low_key[2], high_key[2] + 1):
+            for cy in range(low_key[1], high_key[1] + 1):
+                for cx in range(low_key[0], high_key[0] + 1):
+                    chunk = self.chunk((cx, cy, cz))
+                    origin = np.array(chunk.origin)
+                    cells = np.argwhere(chunk.types != EMPTY) + origin
+                    inside = np.all((cells >= low) & (cells <= high), axis=1)
+                    found.extend(map(tuple, cells[inside].tolist()))
+        return found
+    
+    def nearest_free(self, pos: tuple, max_radius: int = 64) -> tuple:
+        """Closest cell to pos that has no placed world (procedural rooms can be claimed)"""
+        if pos not in self.worlds:
+            return pos
+        for radius in range(1, max_radius + 1):
+            for dz in range(-radius, radius + 1):
+                for dy in range(-radius, radius + 1):
+                    for dx in range(-radius, radius + 1):
+                        if max(abs(dx), abs(dy), abs(dz)) != radius:
+                            continue
+                        candidate = (pos[0] + dx, pos[1] + dy, pos[2] + dz)
+                        if candidate not in self.worlds:
+                            return candidate
+        raise ValueError(f"No free cell within {max_radius} of {pos}")
+    
+    # Editing
+    
+    def _type_index(self, room_type: Optional[str]) -> int:
+        if room_type in self.room_types:
+            return self.room_types.index(room_type)
+        return len(self.room_types) - 1
+    
+    def _classify(self, world: dict) -> str:
+        """Room type of a world dict, from its parse or by matching its prompt"""
+        room_type = world.get('room_type') or world.get('parse', {}).get('room_type')
+        if room_type:
+            return room_type
+        text = world.get('original_prompt') or world.get('name', '')
+        return self.templates.PROMPT_INDEX.match(text).room_type
+    
+    def link(self, pos: tuple, direction: str):
+        """Open an exit and its back-link, creating a generic room on the far side if needed"""
+        neighbor = offset(pos, direction)
+        if self.room_type(pos) is None:
+            self._set_cell(pos, self._type_index('generic'), 0)
+        if self.room_type(neighbor) is None:
+            self._set_cell(neighbor, self._type_index('generic'), 0)
+        
+        here_key, there_key = self.chunk_key(pos), self.chunk_key(neighbor)
+        here = self.chunk(here_key)
+        there = self.chunk(there_key)
+        self._set_cell(pos, int(here.types[self._local(pos)]), self.links(pos) | BITS[direction])
+        self._set_cell(neighbor, int(there.types[self._local(neighbor)]),
+                       self.links(neighbor) | BITS[OPPOSITE[direction]])
+    
+    def place(self, world: dict, pos: tuple = (0, 0, 0)) -> tuple:
+        """Put a generated world on the map, wiring its exits to neighbours
+
+        If another world already sits at pos, the nearest free cell is used instead.
+        Exits pointing at an occupied cell link to that room; exits into empty space
+        create a stub room typed from the exit's description.
+        """
+        pos = self.nearest_free(tuple(pos))
+        self._set_cell(pos, self._type_index(self._classify(world)), self.links(pos))
+        self.worlds[pos] = world
+        
+        for direction, destination in world.get('exits', {}).items():
+            direction = direction.lower()
+            if direction not in DIRECTIONS:
+                continue
+            neighbor = offset(pos, direction)
+            if self.room_type(neighbor) is None:
+                stub_type = self.templates.PROMPT_INDEX.match(str(destination)).room_type
+                self._set_cell(neighbor, self._type_index(stub_type), 0)
+            self.link(pos, direction)
+        
+        world['position'] = list(pos)
+        return pos
+    
+    def world_at(self, pos: tuple) -> Optional[dict]:
+        """The world placed at a cell, if any"""
+        return self.worlds.get(tuple(pos))
+    
+    def describe(self, pos: tuple, generator) -> Optional[dict]:
+        """World for a cell, generating and placing it on first visit"""
+        pos = tuple(pos)
+        if pos in self.worlds:
+            return self.worlds[pos]
+        room_type = self.room_type(pos)
+        if room_type is None:
+            return None
+        
+        seed = int(cell_hash(pos[0], pos[1], pos[2], 7, self.seed) & np.uint64(0xFFFFFFFF))
+        world = generator.generate(room_type.replace('_', ' '), seed=seed)
+        world['exits'] = {
+            direction: (self.worlds[neighbor]['name'] if neighbor in self.worlds
+                        else (self.room_type(neighbor) or 'unknown').replace('_', ' ').title())
+            for direction, neighbor in self.exits(pos).items()
+        }
+        world['position'] = list(pos)
+        self.worlds[pos] = world
+        return world
+    
+    def stats(self) -> dict:
+        """Chunk cache and build throughput figures"""
+        return {
+            'chunks_loaded': len(self.chunks),
+            'chunks_built': self.chunks_built,
+            'rooms_built': self.rooms_built,
+            'loaded_bytes': sum(chunk.nbytes for chunk in self.chunks.values()),
+            'override_cells': sum(len(cells) for cells in self.overrides.values()),
+            'placed_worlds': len(self.worlds),
+            'rooms_per_second': round(self.rooms_built / self.build_seconds) if self.build_seconds else 0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lay out a large procedural map and report throughput")
+    parser.add_argument('--rooms', type=int, default=1_000_000)
+    parser.add_argument('--max-chunks', type=int, default=256)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    layout = MapLayout(seed=args.seed, max_chunks=args.max_chunks)
+    start = time.perf_counter()
+    ring = 0
+    while layout.rooms_built < args.rooms:
+        # Walk outward in square rings of chunks on the ground level
+        for cy in range(-ring, ring + 1):
+            for cx in range(-ring, ring + 1):
+                if max(abs(cx), abs(cy)) == ring and layout.rooms_built < args.rooms:
+                    layout.chunk((cx, cy, 0))
+        ring += 1
+    elapsed = time.perf_counter() - start
+    
+    stats = layout.stats()
+    print(f"{stats['rooms_built']:,} rooms in {stats['chunks_built']:,} chunks, {elapsed:.2f}s "
+          f"({stats['rooms_built'] / elapsed:,.0f} rooms/s)")
+    print(f"{stats['chunks_loaded']} chunks resident, {stats['loaded_bytes'] / 1024:.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
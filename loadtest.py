@@ -0,0 +1,268 @@
+"""
+Load Test - Ramp concurrent users against World Forge and find where it breaks
+Drives the Streamlit generate flow, the generator directly, or any HTTP endpoint, and reports per-level stats
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Optional
+
+ROOT = Path(__file__).resolve().parent
+
+# Popular prompts (the sidebar examples) plus parts for novel prompts that miss every cache
+POPULAR_PROMPTS = [
+    "A throne room with a jester who tells dad jokes",
+    "Dark dungeon, held together by hope, explosive barrels",
+    "Cozy tavern with a grumpy bartender and three goblins",
+    "Cyberpunk alley with neon signs and a shady merchant",
+    "Peaceful library with a sleeping wizard",
+    "Convergence Zero control room with malfunctioning robots",
+]
+NOVEL_MOODS = ['haunted', 'flooded', 'glittering', 'abandoned', 'noisy', 'frozen', 'sunlit', 'crumbling']
+NOVEL_PLACES = ['cave', 'temple', 'laboratory', 'forest', 'space station', 'market', 'crypt', 'observatory']
+NOVEL_EXTRAS = ['a guard', 'two goblins', 'a merchant', 'a robot', 'a sleeping dragon', 'a chest', 'barrels', 'a throne']
+
+
+def rss_bytes(pid: Optional[int] = None) -> int:
+    """Resident set size of a process (this one by default), or 0 where /proc is unavailable"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class PromptMix:
+    """Draws popular prompts with probability 1 - novel_fraction, otherwise a random novel prompt"""
+    
+    def __init__(self, prompts: list = None, novel_fraction: float = 0.5, seed: Optional[int] = None):
+        self.prompts = prompts or POPULAR_PROMPTS
+        self.novel_fraction = novel_fraction
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+    
+    def next(self) -> str:
+        with self.lock:
+            if self.rng.random() < self.novel_fraction:
+                return (f"{self.rng.choice(NOVEL_MOODS).title()} {self.rng.choice(NOVEL_PLACES)} "
+                        f"with {self.rng.choice(NOVEL_EXTRAS)}")
+            return self.rng.choice(self.prompts)
+
+
+# Drivers: each virtual user gets its own session object; run(prompt) returns the world source or raises
+
+class GeneratorDriver:
+    """Calls WorldGenerator.generate, one generator per user, like one Streamlit session each"""
+    
+    def __init__(self, transport=None, api_key: Optional[str] = None):
+        self.transport = transport
+        self.api_key = api_key
+    
+    def session(self):
+        from world_generator import WorldGenerator
+        
+        generator = WorldGenerator(api_key=self.api_key, transport=self.transport)
+        return lambda prompt: generator.generate(prompt).get('source', '')
+
+
+class AppDriver:
+    """Runs app.py headless with streamlit.testing, typing a prompt and pressing Forge World"""
+    
+    def __init__(self, timeout: float = 60.0):
+        from streamlit.testing.v1 import AppTest
+        
+        self.app_test = AppTest
+        self.timeout = timeout
+    
+    def session(self):
+        app = self.app_test.from_file(str(ROOT / 'app.py'), default_timeout=self.timeout)
+        app.run()
+        
+        def run(prompt: str) -> str:
+            app.text_input(key='main_prompt').input(prompt)
+            forge = next(button for button in app.button if 'Forge World' in button.label)
+            forge.click().run()
+            if app.exception:
+                raise RuntimeError(app.exception[0].message)
+            if app.error:
+                raise RuntimeError(app.error[0].value)
+            return 'app'
+        
+        return run
+
+
+class HTTPDriver:
+    """POSTs JSON to an endpoint; {prompt} in the body template is replaced with the prompt"""
+    
+    MESSAGES_BODY = json.dumps({
+        'model': 'claude-sonnet-4-20250514',
+        'max_tokens': 1500,
+        'messages': [{'role': 'user', 'content': 'Create a world based on: {prompt}'}],
+    })
+    
+    def __init__(self, url: str, body: Optional[str] = None, timeout: float = 60.0):
+        self.url = url
+        self.body = body or self.MESSAGES_BODY
+        self.timeout = timeout
+    
+    def session(self):
+        def run(prompt: str) -> str:
+            payload = self.body.replace('{prompt}', json.dumps(prompt)[1:-1]).encode()
+            request = urllib.request.Request(self.url, payload, {'Content-Type': 'application/json'})
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return f"http {response.status}"
+        
+        return run
+
+
+def run_level(driver, mix: PromptMix, users: int, duration: float, sessions: list) -> dict:
+    """Run `users` closed-loop virtual users for `duration` seconds"""
+    latencies = []
+    sources = {}
+    errors = {}
+    lock = threading.Lock()
+    
+    # Reuse sessions across levels, adding only the new users
+    while len(sessions) < users:
+        sessions.append(driver.session())
+    
+    deadline = time.monotonic() + duration
+    start = time.monotonic()
+    
+    def user(run):
+        while time.monotonic() < deadline:
+            prompt = mix.next()
+            began = time.perf_counter()
+            try:
+                source = run(prompt)
+                elapsed = time.perf_counter() - began
+                with lock:
+                    latencies.append(elapsed)
+                    sources[source] = sources.get(source, 0) + 1
+            except Exception as e:
+                with lock:
+                    name = type(e).__name__
+                    errors[name] = errors.get(name, 0) + 1
+    
+    threads = [threading.Thread(target=user, args=(sessions[i],), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    
+    completed = len(latencies)
+    failed = sum(errors.values())
+    return {
+        'users': users,
+        'requests': completed + failed,
+        'throughput': round(completed / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'error_rate': round(failed / (completed + failed), 4) if completed + failed else 0.0,
+        # LLM failures are hidden by the template fallback, so count them separately
+        'fallback_rate': round(sources.get('template', 0) / completed, 4) if completed else 0.0,
+        'errors': errors,
+        'sources': sources,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramp concurrent users and report where latency or errors climb")
+    parser.add_argument('--target', choices=('generator', 'app', 'http'), default='generator')
+    parser.add_argument('--url', default='http://127.0.0.1:8765/v1/messages', help="Endpoint for --target http")
+    parser.add_argument('--body', help="JSON body template for --target http ({prompt} is substituted)")
+    parser.add_argument('--llm', choices=('templates', 'replay'), default='templates',
+                        help="Generator/app backend: template path or the replay LLM stub")
+    parser.add_argument('--latency', type=float, default=1.0, help="Replay latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.3)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Replay error injection rate")
+    parser.add_argument('--levels', default='1,2,4,8,16,32', help="Comma-separated concurrent user counts")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per level")
+    parser.add_argument('--prompts', help="File of popular prompts, one per line")
+    parser.add_argument('--novel-fraction', type=float, default=0.5)
+    parser.add_argument('--error-threshold', type=float, default=0.01, help="Error rate that counts as breaking")
+    parser.add_argument('--p95-slo', type=float, default=5000.0, help="p95 latency (ms) that counts as breaking")
+    parser.add_argument('--server-pid', type=int, help="Read RSS from this process instead of the load generator")
+    parser.add_argument('--json', help="Also write the results here")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    
+    if args.llm == 'replay':
+        spec = (f"replay:?synthesize=1&latency={args.latency}&jitter={args.jitter}"
+                f"&error_rate={args.error_rate}")
+        # The app builds its own generators, so it picks the transport up from the environment
+        os.environ['WORLD_FORGE_LLM_TRANSPORT'] = spec
+        os.environ.setdefault('ANTHROPIC_API_KEY', 'replay')
+    
+    if args.target == 'http':
+        driver = HTTPDriver(args.url, args.body)
+    elif args.target == 'app':
+        driver = AppDriver()
+    else:
+        transport = None
+        if args.llm == 'replay':
+            from transport import make_transport
+            
+            transport = make_transport(os.environ['WORLD_FORGE_LLM_TRANSPORT'])
+        driver = GeneratorDriver(transport, os.environ.get('ANTHROPIC_API_KEY') if args.llm == 'replay' else None)
+    
+    prompts = None
+    if args.prompts:
+        with open(args.prompts) as f:
+            prompts = [line.strip() for line in f if line.strip()]
+    mix = PromptMix(prompts, args.novel_fraction, args.seed)
+    
+    sessions = []
+    baseline_rss = rss_bytes(args.server_pid)
+    results = []
+    breaking_point = None
+    
+    expect_llm = args.llm == 'replay' and args.target == 'generator'
+    print(f"{'users':>6}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}{'fallback':>10}{'RSS/session':>14}")
+    for users in [int(level) for level in args.levels.split(',')]:
+        result = run_level(driver, mix, users, args.duration, sessions)
+        rss = rss_bytes(args.server_pid)
+        result['rss_mb'] = round(rss / 2 ** 20, 1)
+        result['rss_per_session_kb'] = round((rss - baseline_rss) / len(sessions) / 1024, 1) if sessions else 0.0
+        if not expect_llm:
+            result['fallback_rate'] = 0.0
+        results.append(result)
+        
+        print(f"{users:>6}{result['throughput']:>9}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}"
+              f"{result['error_rate']:>9.1%}{result['fallback_rate']:>10.1%}{result['rss_per_session_kb']:>11} KB")
+        
+        failing = result['error_rate'] + result['fallback_rate']
+        if breaking_point is None and (failing > args.error_threshold or result['p95_ms'] > args.p95_slo):
+            breaking_point = users
+    
+    if breaking_point is None:
+        print("No breaking point within the tested levels")
+    else:
+        print(f"Error/fallback rate or p95 latency crossed its threshold at {breaking_point} concurrent users")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': vars(args), 'levels': results, 'breaking_point': breaking_point}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Prompt Matcher - Scored room type and mood detection over a precomputed inverted index
+Matches whole tokens and phrases, synonyms, and (optionally) TF-IDF terms from template text
+"""
+
+import math
+import re
+from dataclasses import dataclass, field
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Weights per kind of evidence; direct keywords should always beat template vocabulary
+KEYWORD_WEIGHT = 1.0
+PHRASE_BONUS = 0.5
+SYNONYM_WEIGHT = 0.8
+TFIDF_WEIGHT = 0.35
+
+# Template vocabulary alone only picks a label with at least this much of it (two strong terms);
+# otherwise a keyword or synonym hit is needed to beat generic / neutral
+MIN_TFIDF_SCORE = 2 * TFIDF_WEIGHT
+# Confidence is score / (all evidence + prior): one keyword gives 0.67, a stray term about 0.2
+CONFIDENCE_PRIOR = 0.5
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'every', 'for', 'from', 'here', 'in', 'into',
+    'is', 'it', 'its', 'like', 'more', 'of', 'on', 'or', 'that', 'the', 'their', 'this', 'through',
+    'to', 'with', 'seems', 'each', 'some', 'than', 'your', 'you', 'there', 'only', 'all',
+}
+
+
+def normalize(token: str) -> str:
+    """Light stemming so plurals match their keyword"""
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens, normalized"""
+    return [normalize(token) for token in TOKEN_RE.findall(text.lower())]
+
+
+@dataclass
+class PromptMatch:
+    """Best room type and mood for a prompt, with confidences in [0, 1]
+
+    Confidences are absolute: they grow with the winning label's evidence and
+    shrink when other labels compete, so thresholds mean the same for any prompt.
+    """
+    
+    room_type: str = 'generic'
+    room_confidence: float = 0.0
+    mood: str = 'neutral'
+    mood_confidence: float = 0.0
+    room_scores: dict = field(default_factory=dict)
+    mood_scores: dict = field(default_factory=dict)
+
+
+class PromptIndex:
+    """Inverted index from terms and phrases to weighted room type / mood labels"""
+    
+    ROOM = 0
+    MOOD = 1
+    
+    def __init__(self):
+        self.postings = {}
+        self.priority = ({}, {})
+        self.max_phrase = 1
+    
+    def add(self, axis: int, term: str, label: str, weight: float):
+        """Add evidence that a term points at a label, keeping the strongest weight"""
+        key = ' '.join(tokenize(term))
+        if not key:
+            return
+        self.max_phrase = max(self.max_phrase, key.count(' ') + 1)
+        self.priority[axis].setdefault(label, len(self.priority[axis]))
+        
+        labels = self.postings.setdefault(key, {})
+        current = labels.get((axis, label), 0.0)
+        labels[(axis, label)] = max(current, weight)
+    
+    def match(self, prompt: str) -> PromptMatch:
+        """Score every label in one pass over the prompt's tokens and phrases"""
+        tokens = tokenize(prompt)
+        scores = ({}, {})
+        direct = (set(), set())
+        
+        for n in range(1, self.max_phrase + 1):
+            for i in range(len(tokens) - n + 1):
+                labels = self.postings.get(' '.join(tokens[i:i + n]))
+                if not labels:
+                    continue
+                for (axis, label), weight in labels.items():
+                    scores[axis][label] = scores[axis].get(label, 0.0) + weight
+                    if weight >= SYNONYM_WEIGHT:
+                        direct[axis].add(label)
+        
+        room_type, room_confidence = self._best(self.ROOM, scores[self.ROOM], direct[self.ROOM], 'generic')
+        mood, mood_confidence = self._best(self.MOOD, scores[self.MOOD], direct[self.MOOD], 'neutral')
+        return PromptMatch(room_type, room_confidence, mood, mood_confidence,
+                           scores[self.ROOM], scores[self.MOOD])
+    
+    def _best(self, axis: int, scores: dict, direct: set, default: str) -> tuple:
+        """Highest-scoring label with real evidence (ties go to the earlier keyword) and its confidence"""
+        candidates = [label for label, score in scores.items() if label in direct or score >= MIN_TFIDF_SCORE]
+        if not candidates:
+            return default, 0.0
+        priority = self.priority[axis]
+        label = max(candidates, key=lambda l: (scores[l], -priority.get(l, len(priority))))
+        return label, round(scores[label] / (sum(scores.values()) + CONFIDENCE_PRIOR), 3)
+
+
+def _tfidf_terms(documents: dict, top_n: int = 12) -> dict:
+    """Top TF-IDF terms per label, with weights scaled to [0, 1]"""
+    counts = {}
+    for label, text in documents.items():
+        tokens = [t for t in tokenize(text) if t not in STOPWORDS and len(t) > 2]
+        counts[label] = {}
+        for token in tokens:
+            counts[label][token] = counts[label].get(token, 0) + 1
+    
+    doc_freq = {}
+    for terms in counts.values():
+        for term in terms:
+            doc_freq[term] = doc_freq.get(term, 0) + 1
+    
+    result = {}
+    total = len(documents)
+    for label, terms in counts.items():
+        length = sum(terms.values()) or 1
+        weighted = {
+            term: (count / length) * math.log((1 + total) / (1 + doc_freq[term]))
+            for term, count in terms.items()
+        }
+        top = sorted(weighted.items(), key=lambda item: -item[1])[:top_n]
+        if top and top[0][1] > 0:
+            result[label] = {term: weight / top[0][1] for term, weight in top if weight > 0}
+    return result
+
+
+def build_prompt_index(tables: dict, use_tfidf: bool = True) -> PromptIndex:
+    """Build the matcher index from a set of template tables"""
+    index = PromptIndex()
+    
+    for keyword, room_type in tables['ROOM_KEYWORDS'].items():
+        weight = KEYWORD_WEIGHT + (PHRASE_BONUS if ' ' in keyword else 0.0)
+        index.add(PromptIndex.ROOM, keyword, room_type, weight)
+    for keyword, mood in tables['MOOD_KEYWORDS'].items():
+        weight = KEYWORD_WEIGHT + (PHRASE_BONUS if ' ' in keyword else 0.0)
+        index.add(PromptIndex.MOOD, keyword, mood, weight)
+    
+    for room_type, synonyms in tables['ROOM_SYNONYMS'].items():
+        for synonym in synonyms:
+            index.add(PromptIndex.ROOM, synonym, room_type, SYNONYM_WEIGHT)
+    for mood, synonyms in tables['MOOD_SYNONYMS'].items():
+        for synonym in synonyms:
+            index.add(PromptIndex.MOOD, synonym, mood, SYNONYM_WEIGHT)
+    
+    if not use_tfidf:
+        return index
+    
+    # Room documents: the template text a user might echo back when describing a place
+    room_docs = {}
+    for room_type, template in tables['ROOM_TEMPLATES'].items():
+        if room_type == 'generic':
+            continue
+        parts = [template.get('description', ''), template.get('lighting', '')]
+        parts += tables['ATMOSPHERE_PHRASES'].get(room_type, [])
+        parts += tables['NAME_PARTS'].get('cores', {}).get(room_type, [])
+        room_docs[room_type] = ' '.join(parts).replace('{mood}', '')
+    
+    mood_docs = {}
+    for mood, words in tables['MOOD_WORDS'].items():
+        if mood == 'neutral':
+            continue
+        parts = list(words) + tables['ATMOSPHERE_PHRASES'].get(f"mood_{mood}", [])
+        parts += tables['NAME_PARTS'].get('prefixes', {}).get(mood, [])
+        mood_docs[mood] = ' '.join(parts)
+    
+    for room_type, terms in _tfidf_terms(room_docs).items():
+        for term, weight in terms.items():
+            index.add(PromptIndex.ROOM, term, room_type, TFIDF_WEIGHT * weight)
+    for mood, terms in _tfidf_terms(mood_docs).items():
+        for term, weight in terms.items():
+            index.add(PromptIndex.MOOD, term, mood, TFIDF_WEIGHT * weight)
+    
+    return index
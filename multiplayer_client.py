@@ -0,0 +1,143 @@
+"""
+Multiplayer Client - Simulated players for load testing the multiplayer server
+Opens many WebSocket connections from one process, wanders rooms, chats and measures broadcast latency
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import resource
+import time
+from loadtest import POPULAR_PROMPTS, percentile
+
+try:
+    from websockets.asyncio.client import connect
+    from websockets.exceptions import ConnectionClosed, InvalidHandshake
+except ImportError:
+    raise ImportError("websockets is required for the multiplayer client; install it with `pip install websockets`")
+
+
+class Results:
+    """Counters and latencies shared by every simulated player"""
+    
+    def __init__(self):
+        self.connected = 0
+        self.failed = 0
+        self.sent = 0
+        self.received = 0
+        self.moves = 0
+        self.errors = 0
+        self.enter_latencies = []
+        self.say_latencies = []
+
+
+async def player(url: str, index: int, deadline: float, results: Results, prompts: list,
+                 think_time: float, move_chance: float, rng: random.Random, timeout: float = 30.0):
+    """One player: join, enter a popular room, then chat and sometimes take an exit until the deadline"""
+    try:
+        websocket = await connect(url, open_timeout=30, max_size=2 ** 22)
+    except (OSError, InvalidHandshake, asyncio.TimeoutError):
+        results.failed += 1
+        return
+    results.connected += 1
+    name = f"bot-{index}"
+    pending_room = asyncio.Event()
+    exits = {}
+    
+    async def receive():
+        nonlocal exits
+        async for raw in websocket:
+            message = json.loads(raw)
+            results.received += 1
+            kind = message.get('type')
+            if kind == 'room':
+                exits = message['world'].get('exits', {})
+                pending_room.set()
+            elif kind == 'said' and message.get('player') == name and message.get('t'):
+                results.say_latencies.append(time.perf_counter() - message['t'])
+            elif kind == 'error':
+                results.errors += 1
+                pending_room.set()
+    
+    async def enter(command: dict):
+        pending_room.clear()
+        began = time.perf_counter()
+        await websocket.send(json.dumps(command))
+        results.sent += 1
+        await asyncio.wait_for(pending_room.wait(), timeout)
+        results.enter_latencies.append(time.perf_counter() - began)
+    
+    receiver = asyncio.create_task(receive())
+    try:
+        await websocket.send(json.dumps({'type': 'join', 'name': name}))
+        await enter({'type': 'enter', 'prompt': rng.choice(prompts)})
+        while time.monotonic() < deadline:
+            await asyncio.sleep(rng.expovariate(1 / think_time) if think_time else 0)
+            if exits and rng.random() < move_chance:
+                await enter({'type': 'go', 'direction': rng.choice(list(exits))})
+                results.moves += 1
+            else:
+                await websocket.send(json.dumps({'type': 'say', 'text': f"hello from {name}", 't': time.perf_counter()}))
+                results.sent += 1
+    except (ConnectionClosed, asyncio.TimeoutError):
+        results.errors += 1
+    finally:
+        receiver.cancel()
+        await websocket.close()
+
+
+async def run(url: str, clients: int, duration: float, ramp: float, think_time: float, move_chance: float,
+              prompts: list, seed=None) -> Results:
+    results = Results()
+    rng = random.Random(seed)
+    deadline = time.monotonic() + ramp + duration
+    tasks = []
+    for i in range(clients):
+        tasks.append(asyncio.create_task(player(url, i, deadline, results, prompts, think_time, move_chance,
+                                                random.Random(rng.random()))))
+        # Spread connections over the ramp so the server is not hit by one burst
+        if ramp:
+            await asyncio.sleep(ramp / clients)
+    await asyncio.gather(*tasks)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the multiplayer server with simulated players")
+    parser.add_argument('--url', default='ws://127.0.0.1:8770')
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds after the ramp")
+    parser.add_argument('--ramp', type=float, default=5.0, help="Seconds over which clients connect")
+    parser.add_argument('--think-time', type=float, default=2.0, help="Mean seconds between a player's actions")
+    parser.add_argument('--move-chance', type=float, default=0.1, help="Chance an action is taking an exit")
+    parser.add_argument('--prompts', help="File of starting prompts, one per line")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    
+    # Each connection is a file descriptor; raise the soft limit as far as the hard limit allows
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = args.clients + 256 if hard == resource.RLIM_INFINITY else min(hard, args.clients + 256)
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+    
+    prompts = POPULAR_PROMPTS
+    if args.prompts:
+        with open(args.prompts) as f:
+            prompts = [line.strip() for line in f if line.strip()]
+    
+    start = time.monotonic()
+    results = asyncio.run(run(args.url, args.clients, args.duration, args.ramp, args.think_time,
+                              args.move_chance, prompts, args.seed))
+    elapsed = time.monotonic() - start
+    
+    print(f"{results.connected} connected, {results.failed} failed, {results.errors} errors")
+    print(f"{results.sent / elapsed:,.0f} msgs/s sent, {results.received / elapsed:,.0f} msgs/s received "
+          f"(broadcast fan-out), {results.moves} room moves")
+    for label, values in (('say->echo', results.say_latencies), ('enter room', results.enter_latencies)):
+        print(f"{label:>10}: p50 {percentile(values, 0.5) * 1000:.1f} ms, p95 {percentile(values, 0.95) * 1000:.1f} ms, "
+              f"p99 {percentile(values, 0.99) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+"""
+Multiplayer Server - Players explore generated worlds together over WebSockets
+Rooms are generated (or loaded from the world store) on first entry, broadcast per room, and evicted when idle
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from warm_cache import prompt_key
+from world_generator import WorldGenerator
+
+try:
+    from websockets.asyncio.server import broadcast, serve
+    from websockets.exceptions import ConnectionClosed
+except ImportError:
+    raise ImportError("websockets is required for the multiplayer server; install it with `pip install websockets`")
+
+MAX_TEXT = 500
+LOG_LENGTH = 50
+
+
+class Room:
+    """One loaded world, the players in it and its recent chat"""
+    
+    def __init__(self, key: str, world: dict):
+        self.key = key
+        self.world = world
+        self.members = {}
+        self.log = deque(maxlen=LOG_LENGTH)
+        self.last_active = time.monotonic()
+        self.dirty = False
+    
+    def snapshot(self) -> dict:
+        return {
+            'type': 'room',
+            'room': self.key,
+            'world': self.world,
+            'players': sorted(self.members.values()),
+            'log': list(self.log),
+        }
+
+
+class RoomHub:
+    """Loaded rooms and their subscribers
+
+    Each room's members are its subscriber set: publish() sends one serialized
+    message to all of them without awaiting slow clients. Concurrent first
+    entries share one generation, which runs on a thread pool so the event loop
+    never blocks. Rooms with no members for idle_timeout seconds are dropped;
+    rooms whose state changed are saved to the world store first.
+    """
+    
+    def __init__(self, generator: WorldGenerator, store=None, idle_timeout: float = 300.0, workers: int = 4):
+        self.generator = generator
+        self.store = store
+        self.idle_timeout = idle_timeout
+        self.rooms = {}
+        self.connections = 0
+        self.generated = 0
+        self.loaded = 0
+        self.evicted = 0
+        self.messages = 0
+        self._loading = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="room-gen")
+    
+    def _load_or_generate(self, prompt: str) -> tuple:
+        world = self.store.find(prompt) if self.store is not None else None
+        if world is not None:
+            return world, 'store'
+        return self.generator.generate(prompt), 'generated'
+    
+    async def get(self, prompt: str) -> Room:
+        """The room for a prompt, loading or generating it on first use
+
+        Rooms are keyed by the normalized prompt, but the prompt itself is what
+        gets generated and looked up in the store.
+        """
+        key = prompt_key(prompt)
+        room = self.rooms.get(key)
+        if room is not None:
+            return room
+        
+        task = self._loading.get(key)
+        if task is None:
+            loop = asyncio.get_running_loop()
+            task = loop.run_in_executor(self._executor, self._load_or_generate, prompt)
+            self._loading[key] = task
+        try:
+            world, origin = await task
+        finally:
+            self._loading.pop(key, None)
+        
+        # Another waiter on the same load may have created the room already
+        if key not in self.rooms:
+            self.rooms[key] = Room(key, world)
+            if origin == 'store':
+                self.loaded += 1
+            else:
+                self.generated += 1
+        return self.rooms[key]
+    
+    def publish(self, room: Room, message: dict):
+        """Send a message to everyone in a room"""
+        room.last_active = time.monotonic()
+        self.messages += len(room.members)
+        broadcast(room.members, json.dumps(message, default=str))
+    
+    async def enter(self, websocket, name: str, prompt: str, current: Optional[Room]) -> Room:
+        """Move a player into the room for a prompt, announcing the move on both sides"""
+        room = await self.get(prompt)
+        if room is not current:
+            if current is not None:
+                self.leave(websocket, current)
+            room.members[websocket] = name
+            self.publish(room, {'type': 'joined', 'room': room.key, 'player': name})
+        await websocket.send(json.dumps(room.snapshot(), default=str))
+        return room
+    
+    def leave(self, websocket, room: Room):
+        name = room.members.pop(websocket, None)
+        if name is not None:
+            self.publish(room, {'type': 'left', 'room': room.key, 'player': name})
+    
+    async def evict_idle(self) -> int:
+        """Drop rooms nobody has been in for idle_timeout seconds, saving changed ones over their stored copy"""
+        cutoff = time.monotonic() - self.idle_timeout
+        idle = [key for key, room in self.rooms.items() if not room.members and room.last_active < cutoff]
+        evicted = [self.rooms.pop(key) for key in idle]
+        dirty = [room.world for room in evicted if room.dirty]
+        self.evicted += len(idle)
+        if dirty and self.store is not None:
+            # SQLite writes run on the generation pool, never on the event loop
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, self._save, dirty)
+        return len(idle)
+    
+    def _save(self, worlds: list):
+        for world in worlds:
+            try:
+                self.store.replace(world)
+            except Exception as e:
+                print(f"Could not save room '{world.get('original_prompt')}': {e}")
+    
+    async def sweep(self, interval: float = 30.0):
+        """Evict idle rooms forever"""
+        while True:
+            await asyncio.sleep(interval)
+            await self.evict_idle()
+    
+    def stats(self) -> dict:
+        return {
+            'connections': self.connections,
+            'rooms': len(self.rooms),
+            'players': sum(len(room.members) for room in self.rooms.values()),
+            'generated': self.generated,
+            'loaded': self.loaded,
+            'evicted': self.evicted,
+            'messages': self.messages,
+        }
+
+
+async def handle(hub: RoomHub, websocket):
+    """One player's connection: JSON commands in, room events out
+
+    Commands: join {name}, enter {prompt}, go {direction}, say {text},
+    take {prop}, look, stats, ping {t}. A command that fails (a generation
+    error, a malformed world) gets an error reply; the connection stays up.
+    """
+    hub.connections += 1
+    name = f"player-{hub.connections}"
+    room = None
+    
+    async def reply(message: dict):
+        await websocket.send(json.dumps(message, default=str))
+    
+    async def dispatch(kind, message: dict):
+        nonlocal name, room
+        if kind == 'join':
+            name = str(message.get('name') or name)[:40]
+            await reply({'type': 'welcome', 'player': name})
+        elif kind == 'enter':
+            prompt = str(message.get('prompt', '')).strip()[:MAX_TEXT]
+            if not prompt:
+                await reply({'type': 'error', 'message': "enter needs a prompt"})
+                return
+            room = await hub.enter(websocket, name, prompt, room)
+        elif kind == 'go':
+            exits = room.world.get('exits', {}) if room else {}
+            direction = str(message.get('direction', ''))[:40]
+            destination = exits.get(direction) if isinstance(exits, dict) else None
+            if not destination:
+                await reply({'type': 'error', 'message': f"No exit {direction!r}"})
+                return
+            room = await hub.enter(websocket, name, str(destination), room)
+        elif kind == 'say' and room is not None:
+            entry = {'type': 'said', 'room': room.key, 'player': name,
+                     'text': str(message.get('text', ''))[:MAX_TEXT], 't': message.get('t')}
+            room.log.append(entry)
+            hub.publish(room, entry)
+        elif kind == 'take' and room is not None:
+            props = room.world.get('props', [])
+            wanted = str(message.get('prop', '')).lower()
+            match = next((prop for prop in props if str(prop.get('name', '')).lower() == wanted), None)
+            if match is None:
+                await reply({'type': 'error', 'message': f"No {str(message.get('prop', ''))[:40]!r} here"})
+                return
+            props.remove(match)
+            room.dirty = True
+            hub.publish(room, {'type': 'taken', 'room': room.key, 'player': name, 'prop': match})
+        elif kind == 'look' and room is not None:
+            await reply(room.snapshot())
+        elif kind == 'stats':
+            await reply({'type': 'stats', **hub.stats()})
+        elif kind == 'ping':
+            await reply({'type': 'pong', 't': message.get('t')})
+        else:
+            await reply({'type': 'error', 'message': f"Unknown or out-of-room command {kind!r}"})
+    
+    try:
+        async for raw in websocket:
+            try:
+                message = json.loads(raw)
+                kind = message.get('type')
+            except (json.JSONDecodeError, AttributeError):
+                await reply({'type': 'error', 'message': "Messages must be JSON objects"})
+                continue
+            try:
+                await dispatch(kind, message)
+            except ConnectionClosed:
+                raise
+            except Exception as e:
+                await reply({'type': 'error', 'message': f"{kind!r} failed: {type(e).__name__}"})
+    except ConnectionClosed:
+        pass
+    finally:
+        if room is not None:
+            hub.leave(websocket, room)
+            room.last_active = time.monotonic()
+        hub.connections -= 1
+
+
+async def run_server(hub: RoomHub, host: str, port: int, sweep_interval: float = 30.0):
+    """Serve until cancelled"""
+    sweeper = asyncio.create_task(hub.sweep(sweep_interval))
+    try:
+        async with serve(lambda websocket: handle(hub, websocket), host, port, max_size=2 ** 16):
+            print(f"Multiplayer server on ws://{host}:{port}")
+            await asyncio.get_running_loop().create_future()
+    finally:
+        sweeper.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the multiplayer exploration server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8770)
+    parser.add_argument('--db', default=os.environ.get("WORLD_FORGE_DB"), help="World store for loading and saving rooms")
+    parser.add_argument('--idle-timeout', type=float, default=300.0, help="Seconds before an empty room is evicted")
+    parser.add_argument('--workers', type=int, default=4, help="Generation threads")
+    parser.add_argument('--templates', action='store_true', help="Use template generation even if ANTHROPIC_API_KEY is set")
+    args = parser.parse_args()
+    
+    store = None
+    if args.db:
+        from world_store import WorldStore
+        
+        store = WorldStore(args.db, batch_size=1)
+    api_key = None if args.templates else os.environ.get("ANTHROPIC_API_KEY")
+    generator = WorldGenerator(api_key=api_key, world_store=store)
+    hub = RoomHub(generator, store, args.idle_timeout, args.workers)
+    
+    try:
+        asyncio.run(run_server(hub, args.host, args.port, min(30.0, args.idle_timeout)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if store is not None:
+            store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Name Service - Collision-free names for locations and NPCs
+Enumerates the combinatorial name space lazily and tracks used names per scope
+"""
+
+import hashlib
+import math
+import random
+import threading
+from math import gcd
+from typing import Optional
+from template_packs import TemplatePack, default_pack
+
+DEFAULT_NPC_NAMES = ['Stranger', 'Unknown Figure', 'Mysterious Entity']
+
+
+def roman(number: int) -> str:
+    """Roman numeral for a positive integer"""
+    numerals = [
+        (1000, 'M'), (900, 'CM'), (500, 'D'), (400, 'CD'), (100, 'C'), (90, 'XC'),
+        (50, 'L'), (40, 'XL'), (10, 'X'), (9, 'IX'), (5, 'V'), (4, 'IV'), (1, 'I'),
+    ]
+    result = ''
+    for value, numeral in numerals:
+        count, number = divmod(number, value)
+        result += numeral * count
+    return result
+
+
+class BloomFilter:
+    """Compact probabilistic set; false positives only ever skip a free name"""
+    
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+    
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+    
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+    
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class NameSpace:
+    """A lazily enumerated name space: the product of head parts, repeated per tier
+
+    Each tier appends its suffix (the first tier is usually ''); once the tiers run
+    out, the whole sequence repeats with a Roman numeral. Within a tier the order is
+    scrambled by an affine bijection, so position -> name is O(1) and never repeats.
+    """
+    
+    def __init__(self, parts: list, tiers: list, rng: random.Random):
+        self.parts = [list(p) for p in parts]
+        self.tiers = list(tiers) or ['']
+        self.tier_size = math.prod(len(p) for p in self.parts)
+        self.multiplier = self._coprime(rng)
+        self.offset = rng.randrange(self.tier_size)
+    
+    def _coprime(self, rng: random.Random) -> int:
+        if self.tier_size == 1:
+            return 1
+        while True:
+            a = rng.randrange(1, self.tier_size)
+            if gcd(a, self.tier_size) == 1:
+                return a
+    
+    def name_at(self, position: int, rotation: int = 0) -> str:
+        """The name at a position in the enumeration, optionally rotated within each tier"""
+        tier, r = divmod(position, self.tier_size)
+        j = (self.multiplier * ((r + rotation) % self.tier_size) + self.offset) % self.tier_size
+        
+        words = []
+        for part in reversed(self.parts):
+            j, k = divmod(j, len(part))
+            words.insert(0, part[k])
+        words.append(self.tiers[tier % len(self.tiers)])
+        
+        cycle = tier // len(self.tiers)
+        if cycle:
+            words.append(roman(cycle + 1))
+        return ' '.join(w for w in words if w)
+
+
+class NameScope:
+    """Names used within one region or world, plus a cursor per name space"""
+    
+    def __init__(self, index: str = 'set', capacity: int = 1_000_000, rotation: int = 0):
+        self.used = BloomFilter(capacity) if index == 'bloom' else set()
+        self.cursors = {}
+        self.rotation = rotation
+        self.spaces = {}  # name spaces built from a seeded rng, private to this scope
+    
+    def claim(self, name: str) -> bool:
+        """Reserve a name, returning False if it was already taken"""
+        if name in self.used:
+            return False
+        self.used.add(name)
+        return True
+    
+    def next_name(self, key, space: NameSpace) -> str:
+        """Advance this scope's cursor through a name space to the next free name"""
+        position = self.cursors.get(key, 0)
+        while True:
+            name = space.name_at(position, self.rotation)
+            position += 1
+            if self.claim(name):
+                self.cursors[key] = position
+                return name
+
+
+class NameService:
+    """Generates location and NPC names without collisions inside a scope
+
+    Passing a seeded `rng` makes a name depend only on that rng, so seeded worlds
+    repeat exactly. Seeded location names are claimed in the scope (unseeded names
+    avoid them) but not forced unique, since the same seed must give the same name.
+    """
+    
+    def __init__(self, index: str = 'set', seed: Optional[int] = None, capacity: int = 1_000_000):
+        self.index = index
+        self.capacity = capacity
+        self.rng = random.Random(seed)
+        self.spaces = {}
+        self.scopes = {}
+        self._lock = threading.Lock()
+    
+    def scope(self, key='global') -> NameScope:
+        """Get (or create) the named scope, e.g. a region id"""
+        if key not in self.scopes:
+            self.scopes[key] = NameScope(self.index, self.capacity)
+        return self.scopes[key]
+    
+    def new_scope(self, rng: Optional[random.Random] = None) -> NameScope:
+        """A throwaway scope, e.g. for the NPCs of a single world"""
+        return NameScope('set', rotation=(rng or self.rng).randrange(1 << 30))
+    
+    def _space(self, key, parts: list, tiers: list) -> NameSpace:
+        if key not in self.spaces:
+            self.spaces[key] = NameSpace(parts, tiers, self.rng)
+        return self.spaces[key]
+    
+    def location_name(self, room_type: str, mood: str, scope='global',
+                      templates: Optional[TemplatePack] = None, rng: Optional[random.Random] = None) -> str:
+        """A location name unique within the scope (or fixed by a seeded rng)"""
+        templates = templates or default_pack()
+        prefixes = templates.NAME_PARTS.get('prefixes', {}).get(mood, ['The'])
+        cores = templates.NAME_PARTS.get('cores', {}).get(room_type, ['Chamber'])
+        suffixes = list(dict.fromkeys(templates.NAME_PARTS.get('suffixes', [''])))
+        
+        if rng is not None:
+            name = ' '.join(word for word in (rng.choice(prefixes), rng.choice(cores), rng.choice(suffixes)) if word)
+            with self._lock:
+                (scope if isinstance(scope, NameScope) else self.scope(scope)).claim(name)
+            return name
+        
+        space_key = (templates.content_hash, 'location', room_type, mood)
+        with self._lock:
+            space = self._space(space_key, [prefixes, cores, suffixes], [''])
+            if not isinstance(scope, NameScope):
+                scope = self.scope(scope)
+            return scope.next_name(space_key, space)
+    
+    def npc_name(self, npc_type: str, scope='global', templates: Optional[TemplatePack] = None,
+                 rng: Optional[random.Random] = None) -> str:
+        """An NPC name unique within the scope; a seeded rng fixes the enumeration order"""
+        templates = templates or default_pack()
+        names = templates.NPC_NAMES.get(npc_type, DEFAULT_NPC_NAMES)
+        
+        space_key = (templates.content_hash, 'npc', npc_type)
+        with self._lock:
+            if rng is not None and isinstance(scope, NameScope):
+                # Built from the seeded rng once per scope, not from this service's shared state
+                if space_key not in scope.spaces:
+                    scope.spaces[space_key] = NameSpace([names], [''] + list(templates.NPC_EPITHETS), rng)
+                return scope.next_name(space_key, scope.spaces[space_key])
+            space = self._space(space_key, [names], [''] + list(templates.NPC_EPITHETS))
+            if not isinstance(scope, NameScope):
+                scope = self.scope(scope)
+            return scope.next_name(space_key, space)
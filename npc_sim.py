@@ -0,0 +1,339 @@
+"""
+NPC Simulation - Tick-stepped NPCs with behavior state machines, per-tick dialogue and movement along exits
+Entities live in NumPy component tables (one array per field), so a tick is a handful of vectorized passes
+"""
+
+import argparse
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+from region_graph import RegionGraph
+from template_packs import TemplatePack, default_pack
+
+STATES = ('idle', 'talk', 'wander', 'patrol', 'rest')
+IDLE, TALK, WANDER, PATROL, REST = range(len(STATES))
+
+# Ticks spent in a state before the next decision (plus up to the same again in jitter)
+DWELL = np.array([4, 3, 2, 3, 8], dtype=np.int16)
+
+# Behavior text -> profile; the first profile with a matching keyword wins.
+# Keywords match at the start of a word ("scurr" matches "scurries", "serves" not "observes").
+PROFILE_KEYWORDS = {
+    'patrol': ('patrol', 'pacing', 'at attention', 'guards', 'sentry'),
+    'wander': ('skulks', 'wander', 'roam', 'looking for', 'scurr', 'prowl'),
+    'talk': ('telling', 'jokes', 'hawks', 'serves', 'gossip', 'shares', 'chatter', 'greets'),
+    'idle': ('studies', 'mutters', 'sleep', 'reads', 'meditat', 'stands'),
+}
+PROFILES = tuple(PROFILE_KEYWORDS)
+PROFILE_PATTERNS = {
+    profile: re.compile(r"\b(?:" + '|'.join(map(re.escape, keywords)) + ")")
+    for profile, keywords in PROFILE_KEYWORDS.items()
+}
+
+# How likely each profile is to pick each next state (idle, talk, wander, patrol, rest).
+# Patrollers never wander, so they are always at home or one step out.
+PROFILE_WEIGHTS = {
+    'patrol': (0.20, 0.10, 0.00, 0.60, 0.10),
+    'wander': (0.15, 0.10, 0.60, 0.00, 0.15),
+    'talk': (0.25, 0.55, 0.05, 0.00, 0.15),
+    'idle': (0.55, 0.15, 0.05, 0.00, 0.25),
+}
+STAY_BIAS = 0.4
+
+
+def behavior_profile(behavior: str) -> str:
+    """Profile for an NPC's behavior text, 'idle' when nothing matches"""
+    text = (behavior or '').lower()
+    for profile, pattern in PROFILE_PATTERNS.items():
+        if pattern.search(text):
+            return profile
+    return 'idle'
+
+
+def transition_table() -> np.ndarray:
+    """Cumulative next-state probabilities, indexed [profile, current state, next state]"""
+    weights = np.array([PROFILE_WEIGHTS[profile] for profile in PROFILES], dtype=np.float64)
+    weights /= weights.sum(axis=1, keepdims=True)
+    table = (1 - STAY_BIAS) * weights[:, None, :] + STAY_BIAS * np.eye(len(STATES))[None, :, :]
+    return np.cumsum(table, axis=2)
+
+
+@dataclass
+class TickEvents:
+    """What happened in one tick, as parallel arrays of entity ids"""
+    
+    tick: int
+    moved: np.ndarray
+    origins: np.ndarray
+    destinations: np.ndarray
+    speakers: np.ndarray
+    lines: np.ndarray
+
+
+class NPCSimulation:
+    """Component tables for NPCs on a room graph, advanced one tick at a time
+
+    Each NPC has a kind (its template type), a profile (state machine derived from
+    the template's behavior text), a state, a countdown timer and a room. Only NPCs
+    whose timer runs out re-decide on a tick, which spreads work across ticks. Talkers
+    draw a dialogue line each time they decide; wanderers step through a random exit;
+    patrollers alternate between their home room and its neighbours.
+    """
+    
+    def __init__(self, graph: RegionGraph, seed: Optional[int] = None, capacity: int = 1024,
+                 templates: Optional[TemplatePack] = None):
+        self.graph = graph
+        self.templates = templates or default_pack()
+        self.rng = np.random.default_rng(seed)
+        self.tick = 0
+        self.count = 0
+        self.names = []
+        self.transitions = transition_table()
+        
+        # Kinds come from the template pack; dialogue is one flat table with a slice per kind
+        self.kinds = [kind for kind in self.templates.NPC_TEMPLATES]
+        self.kind_index = {kind: i for i, kind in enumerate(self.kinds)}
+        dialogue = self.templates.DIALOGUE_TEMPLATES
+        self.lines = []
+        starts, counts = [], []
+        for kind in self.kinds:
+            kind_lines = dialogue.get(kind, dialogue['generic'])
+            starts.append(len(self.lines))
+            counts.append(len(kind_lines))
+            self.lines.extend(kind_lines)
+        self.line_start = np.array(starts, dtype=np.int32)
+        self.line_count = np.array(counts, dtype=np.int32)
+        self.kind_profile = np.array([
+            PROFILES.index(behavior_profile(self.templates.NPC_TEMPLATES[kind].get('behavior', '')))
+            for kind in self.kinds
+        ], dtype=np.int8)
+        
+        self.room = np.zeros(capacity, dtype=np.int32)
+        self.home = np.zeros(capacity, dtype=np.int32)
+        self.kind = np.zeros(capacity, dtype=np.int16)
+        self.profile = np.zeros(capacity, dtype=np.int8)
+        self.state = np.zeros(capacity, dtype=np.int8)
+        self.timer = np.zeros(capacity, dtype=np.int16)
+        self.line = np.full(capacity, -1, dtype=np.int32)
+        self.active = np.zeros(capacity, dtype=bool)
+    
+    def __len__(self):
+        return int(self.active[:self.count].sum())
+    
+    @classmethod
+    def from_worlds(cls, worlds: list, seed: Optional[int] = None, **kwargs) -> 'NPCSimulation':
+        """Simulate the NPCs of a list of worlds, moving along exits that name other worlds"""
+        sim = cls(RegionGraph.from_worlds(worlds), seed, **kwargs)
+        for room, world in enumerate(worlds):
+            npcs = world.get('npcs', [])
+            sim.spawn([room] * len(npcs), [npc.get('type', 'generic') for npc in npcs],
+                      [npc.get('name', '') for npc in npcs])
+        return sim
+    
+    # Entities
+    
+    def _grow(self, needed: int):
+        capacity = len(self.room)
+        if needed <= capacity:
+            return
+        size = max(needed, capacity * 2)
+        for field in ('room', 'home', 'kind', 'profile', 'state', 'timer', 'line', 'active'):
+            old = getattr(self, field)
+            new = np.full(size, -1 if field == 'line' else 0, dtype=old.dtype)
+            new[:capacity] = old
+            setattr(self, field, new)
+    
+    def kind_of(self, npc_type: str) -> int:
+        """Kind index for an NPC type ('Bartender', 'bartender'...); unknown types are generic"""
+        key = str(npc_type).strip().lower().replace(' ', '_')
+        return self.kind_index.get(key, self.kind_index['generic'])
+    
+    def spawn(self, rooms, kinds, names: list = None) -> np.ndarray:
+        """Add NPCs in rooms, by kind index or type name, returning their ids"""
+        rooms = np.asarray(rooms, dtype=np.int32)
+        if not isinstance(kinds, np.ndarray):
+            kinds = [kind if isinstance(kind, (int, np.integer)) else self.kind_of(kind) for kind in kinds]
+        kinds = np.asarray(kinds, dtype=np.int16)
+        n = len(rooms)
+        ids = np.arange(self.count, self.count + n)
+        self._grow(self.count + n)
+        
+        self.room[ids] = rooms
+        self.home[ids] = rooms
+        self.kind[ids] = kinds
+        self.profile[ids] = self.kind_profile[kinds]
+        self.state[ids] = IDLE
+        # Random first timers stagger decisions across ticks
+        self.timer[ids] = self.rng.integers(1, DWELL.max() + 1, n)
+        self.line[ids] = -1
+        self.active[ids] = True
+        self.names.extend(names if names is not None else [''] * n)
+        self.count += n
+        return ids
+    
+    def despawn(self, ids):
+        """Remove NPCs from the simulation (their ids are not reused)"""
+        self.active[np.asarray(ids)] = False
+    
+    # Ticking
+    
+    def _step_to(self, movers: np.ndarray, targets: Optional[np.ndarray] = None) -> np.ndarray:
+        """Move NPCs through a random exit (or towards targets they neighbour); returns who moved"""
+        indptr, indices = self.graph.indptr, self.graph.indices
+        rooms = self.room[movers]
+        start = indptr[rooms]
+        degree = indptr[rooms + 1] - start
+        can_move = degree > 0
+        choice = start + (self.rng.random(len(movers)) * degree).astype(np.int64)
+        destination = np.where(can_move, indices[np.minimum(choice, len(indices) - 1)], rooms)
+        if targets is not None:
+            destination = np.where(targets != rooms, targets, destination)
+        moved = destination != rooms
+        self.room[movers] = destination
+        return moved
+    
+    def step(self) -> TickEvents:
+        """Advance one tick"""
+        self.tick += 1
+        n = self.count
+        timer = self.timer[:n]
+        timer -= 1
+        due = np.flatnonzero((timer <= 0) & self.active[:n])
+        
+        # Next state: sample the profile's cumulative row once per due NPC
+        rows = self.transitions[self.profile[due], self.state[due]]
+        draws = self.rng.random(len(due))
+        state = (draws[:, None] > rows).sum(axis=1).astype(np.int8)
+        state = np.minimum(state, len(STATES) - 1)
+        self.state[due] = state
+        self.timer[due] = DWELL[state] + self.rng.integers(0, DWELL[state] + 1)
+        
+        # Talkers draw a line from their kind's slice of the dialogue table
+        speakers = due[state == TALK]
+        kinds = self.kind[speakers]
+        lines = self.line_start[kinds] + (self.rng.random(len(speakers)) * self.line_count[kinds]).astype(np.int32)
+        self.line[due] = -1
+        self.line[speakers] = lines
+        
+        # Wanderers take a random exit; patrollers go home if away, otherwise step out
+        wanderers = due[state == WANDER]
+        patrollers = due[state == PATROL]
+        origins = self.room[np.concatenate([wanderers, patrollers])].copy()
+        moved_wander = self._step_to(wanderers)
+        away = self.room[patrollers] != self.home[patrollers]
+        home_targets = np.where(away, self.home[patrollers], self.room[patrollers])
+        moved_patrol = self._step_to(patrollers, home_targets)
+        
+        movers = np.concatenate([wanderers, patrollers])
+        moved = np.concatenate([moved_wander, moved_patrol])
+        return TickEvents(self.tick, movers[moved], origins[moved], self.room[movers[moved]], speakers, lines)
+    
+    def run(self, ticks: int) -> list:
+        """Advance several ticks, returning each tick's events"""
+        return [self.step() for _ in range(ticks)]
+    
+    # Queries
+    
+    def in_room(self, room) -> np.ndarray:
+        """Ids of active NPCs in a room"""
+        room = self.graph.node(room)
+        return np.flatnonzero((self.room[:self.count] == room) & self.active[:self.count])
+    
+    def occupancy(self) -> np.ndarray:
+        """Number of active NPCs per room"""
+        return np.bincount(self.room[:self.count][self.active[:self.count]], minlength=len(self.graph))
+    
+    def say(self, npc: int) -> Optional[str]:
+        """What an NPC is saying this tick, if anything"""
+        line = self.line[npc]
+        return None if line < 0 else self.lines[line]
+    
+    def describe(self, npc: int) -> dict:
+        """An NPC as a dict in the shape render_world expects, plus its live state"""
+        kind = self.kinds[self.kind[npc]]
+        template = self.templates.NPC_TEMPLATES[kind]
+        says = self.say(npc)
+        return {
+            'name': self.names[npc],
+            'type': kind.replace('_', ' ').title(),
+            'description': template['description'],
+            'behavior': template['behavior'],
+            'dialogue': [says] if says else [],
+            'state': STATES[self.state[npc]],
+            'room': int(self.room[npc]),
+        }
+    
+    def room_npcs(self, room) -> list:
+        """Dicts for every NPC currently in a room, e.g. to replace a world's static 'npcs'"""
+        return [self.describe(int(npc)) for npc in self.in_room(room)]
+    
+    def stats(self) -> dict:
+        """Entity counts by state and the memory held by the component tables"""
+        active = self.active[:self.count]
+        counts = np.bincount(self.state[:self.count][active], minlength=len(STATES))
+        tables = sum(getattr(self, field).nbytes for field in
+                     ('room', 'home', 'kind', 'profile', 'state', 'timer', 'line', 'active'))
+        return {
+            'tick': self.tick,
+            'npcs': int(active.sum()),
+            'states': {name: int(count) for name, count in zip(STATES, counts)},
+            'table_bytes': tables,
+        }
+
+
+class TickScheduler:
+    """Runs a simulation at a fixed tick rate, calling back with each tick's events"""
+    
+    def __init__(self, simulation: NPCSimulation, rate: float = 10.0):
+        self.simulation = simulation
+        self.interval = 1.0 / rate
+        self.late_ticks = 0
+    
+    def run(self, ticks: int, callback=None):
+        """Step `ticks` times, sleeping to hold the rate; ticks that overrun are counted, not skipped"""
+        next_tick = time.perf_counter()
+        for _ in range(ticks):
+            events = self.simulation.step()
+            if callback:
+                callback(events)
+            next_tick += self.interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self.late_ticks += 1
+                next_tick = time.perf_counter()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time NPC simulation ticks on a procedural region")
+    parser.add_argument('--npcs', type=int, default=100_000)
+    parser.add_argument('--ticks', type=int, default=200)
+    parser.add_argument('--radius', type=int, default=1, help="Region radius in chunks")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    from layout import MapLayout
+    
+    graph = RegionGraph.from_layout(MapLayout(seed=args.seed), radius=args.radius)
+    sim = NPCSimulation(graph, seed=args.seed, capacity=args.npcs)
+    rng = np.random.default_rng(args.seed)
+    sim.spawn(rng.integers(0, len(graph), args.npcs), rng.integers(0, len(sim.kinds), args.npcs))
+    
+    start = time.perf_counter()
+    moves = lines = 0
+    for _ in range(args.ticks):
+        events = sim.step()
+        moves += len(events.moved)
+        lines += len(events.speakers)
+    elapsed = time.perf_counter() - start
+    
+    print(f"{args.npcs:,} NPCs in {len(graph):,} rooms: {args.ticks / elapsed:,.0f} ticks/s "
+          f"({elapsed / args.ticks * 1000:.2f} ms/tick)")
+    print(f"{moves / args.ticks:,.0f} moves and {lines / args.ticks:,.0f} lines per tick; {sim.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Parse Cache - Bounded, thread-safe LRU for prompt parse results
+One instance is shared by every WorldGenerator, so repeats are parsed once per process
+"""
+
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase with collapsed whitespace; prompts that normalize alike parse alike"""
+    return ' '.join(prompt.lower().split())
+
+
+class ParseCache:
+    """Least-recently-used cache with hit-rate statistics"""
+    
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, key):
+        """Cached value for a key, or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def get_or_compute(self, key, compute):
+        """Cached value, or compute(), store and return it (computed outside the lock)"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+    
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+    
+    def stats(self) -> dict:
+        """Size, hit/miss counts and hit rate"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+@lru_cache(maxsize=None)
+def shared_parse_cache() -> ParseCache:
+    """The process-wide cache used by default by every generator"""
+    return ParseCache()
@@ -0,0 +1,160 @@
+"""
+Prefetch - Speculatively generate a world's exit destinations while the user reads it
+Work runs on a small background pool that yields to foreground generation and spends from a token budget
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional
+from scheduler import TokenBucket
+from warm_cache import prompt_key
+from world_generator import SYSTEM_PROMPT, WORLD_OUTPUT_TOKENS, WorldGenerator, estimate_tokens
+
+
+def exit_prompts(world: dict) -> list:
+    """The prompts a user would send by following each of a world's exits"""
+    return [str(destination) for destination in world.get('exits', {}).values() if destination]
+
+
+class Prefetcher:
+    """Per-session prefetcher of exit destinations
+
+    prefetch(world) queues the world's exits and cancels queued work for rooms the
+    user has moved away from. Workers wait while any foreground() generation is
+    running, so prefetching never competes with a request the user is waiting on.
+    LLM prefetches are paid for from a token bucket when queued (template prefetches
+    are free); prefetches cancelled before they start are refunded.
+    """
+    
+    def __init__(self, generator: WorldGenerator, workers: int = 1, max_ready: int = 32,
+                 token_rate: float = 50.0, token_burst: float = 12000.0):
+        self.generator = generator
+        self.max_ready = max_ready
+        self.budget = TokenBucket(token_rate, token_burst)
+        self.pending = {}
+        self.costs = {}
+        self.ready = OrderedDict()
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.over_budget = 0
+        self.hits = 0
+        self.misses = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._foreground = 0
+    
+    def _cost(self, prompt: str) -> int:
+        """Estimated tokens for one speculative generation (zero on the template path)"""
+        if not self.generator.api_key:
+            return 0
+        return estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt) + WORLD_OUTPUT_TOKENS
+    
+    def prefetch(self, world: dict) -> int:
+        """Queue generation of a world's exit destinations, returning how many were queued"""
+        wanted = {prompt_key(prompt): prompt for prompt in exit_prompts(world)}
+        queued = 0
+        
+        with self._lock:
+            # The user has moved on: drop work that has not started yet
+            for key, future in list(self.pending.items()):
+                if key not in wanted and future.cancel():
+                    self._drop(key)
+            
+            for key, prompt in wanted.items():
+                if key in self.pending or key in self.ready:
+                    continue
+                cost = self._cost(prompt)
+                if cost and not self.budget.try_acquire(cost):
+                    self.over_budget += 1
+                    continue
+                self.pending[key] = self._executor.submit(self._run, key, prompt)
+                self.costs[key] = cost
+                self.submitted += 1
+                queued += 1
+        return queued
+    
+    def _drop(self, key: str):
+        """Forget a cancelled prefetch and refund its budget (call with the lock held)"""
+        del self.pending[key]
+        cost = self.costs.pop(key, 0)
+        if cost:
+            self.budget.refund(cost)
+        self.cancelled += 1
+    
+    def _run(self, key: str, prompt: str):
+        self._idle.wait()
+        try:
+            world = self.generator.generate(prompt, remember=False)
+        except Exception as e:
+            print(f"Prefetch failed for '{prompt}': {e}")
+            with self._lock:
+                self.pending.pop(key, None)
+                self.costs.pop(key, None)
+            return
+        
+        with self._lock:
+            self.pending.pop(key, None)
+            self.costs.pop(key, None)
+            self.ready[key] = world
+            self.ready.move_to_end(key)
+            while len(self.ready) > self.max_ready:
+                self.ready.popitem(last=False)
+            self.completed += 1
+    
+    @contextmanager
+    def foreground(self):
+        """Wrap user-facing generation so prefetch workers stand aside until it finishes"""
+        with self._lock:
+            self._foreground += 1
+            self._idle.clear()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._foreground -= 1
+                if not self._foreground:
+                    self._idle.set()
+    
+    def take(self, prompt: str) -> Optional[dict]:
+        """A prefetched world for a prompt, or None; taken worlds are remembered like normal ones"""
+        with self._lock:
+            world = self.ready.pop(prompt_key(prompt), None)
+            if world is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self.generator._remember(world)
+        return world
+    
+    def cancel(self) -> int:
+        """Cancel every queued prefetch, returning how many were dropped"""
+        with self._lock:
+            dropped = [key for key, future in self.pending.items() if future.cancel()]
+            for key in dropped:
+                self._drop(key)
+        return len(dropped)
+    
+    def shutdown(self):
+        """Cancel queued work and stop the workers"""
+        self.cancel()
+        self._idle.set()
+        self._executor.shutdown(wait=False)
+    
+    def stats(self) -> dict:
+        """Queue sizes and counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'pending': len(self.pending),
+                'ready': len(self.ready),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'cancelled': self.cancelled,
+                'over_budget': self.over_budget,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,306 @@
+"""
+Profiler - Opt-in slow-generation log with per-call profiles
+Times every generation by stage and keeps a profile of the slowest calls above a threshold
+"""
+
+import argparse
+import cProfile
+import heapq
+import io
+import itertools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+MODES = ('sample', 'cprofile', 'off')
+STACK_DEPTH = 40
+TOP_ENTRIES = 25
+PARK_AFTER = 1.0  # seconds without observed calls before the sampler thread sleeps
+
+
+@dataclass
+class SlowCall:
+    """One generation that took longer than the threshold"""
+    
+    duration: float
+    prompt: str
+    source: str
+    stages: dict
+    started_at: float
+    thread: str
+    mode: str
+    profile: str = ''
+    seed: Optional[int] = None
+    
+    def report(self) -> str:
+        stages = ', '.join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in self.stages.items())
+        return (f"{self.duration * 1000:.1f} ms [{self.source}] {self.prompt[:80]!r}\n"
+                f"  stages: {stages or 'none'}\n{self.profile}")
+
+
+class _StageTimer:
+    """Adds the time spent in a with-block to one entry of a stage dict"""
+    
+    __slots__ = ('stages', 'name', 'began')
+    
+    def __init__(self, stages: dict, name: str):
+        self.stages = stages
+        self.name = name
+    
+    def __enter__(self):
+        self.began = time.perf_counter()
+    
+    def __exit__(self, *exc):
+        self.stages[self.name] = self.stages.get(self.name, 0.0) + time.perf_counter() - self.began
+
+
+class _StackSampler:
+    """Background thread that snapshots the stacks of threads being observed
+
+    Only threads inside an observed call are sampled. The thread stays awake
+    between calls so starting one costs no wakeup, and parks after PARK_AFTER
+    seconds without any. Stacks are kept in folded form ("outer;inner;leaf"),
+    which flame graph tools read directly.
+    """
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._last_active = 0.0
+    
+    def start(self, thread_id: int):
+        with self._lock:
+            self._active[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+            if not self._wake.is_set():
+                self._wake.set()
+    
+    def stop(self, thread_id: int) -> Counter:
+        with self._lock:
+            return self._active.pop(thread_id, Counter())
+    
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    if time.monotonic() - self._last_active > PARK_AFTER:
+                        self._wake.clear()
+                    continue
+                self._last_active = time.monotonic()
+                frames = sys._current_frames()
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    stack = []
+                    while frame is not None and len(stack) < STACK_DEPTH:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                        frame = frame.f_back
+                    if stack:
+                        samples[';'.join(reversed(stack))] += 1
+
+
+@dataclass
+class GenerationProfiler:
+    """Slowest-N log of generations, each with stage timings and a profile
+
+    mode 'sample' samples the calling thread's stack every sample_interval
+    seconds (cheap enough to leave on); 'cprofile' runs cProfile around every
+    call (exact counts, but roughly doubles the cost of template generation);
+    'off' only keeps timings. Profiles are captured for every call because
+    slowness is only known at the end, but only calls slower than threshold are kept.
+    """
+    
+    threshold: float = 1.0
+    keep: int = 20
+    mode: str = 'sample'
+    sample_interval: float = 0.005
+    calls: int = 0
+    slow_calls: int = 0
+    _slowest: list = field(default_factory=list, repr=False)
+    _order: itertools.count = field(default_factory=itertools.count, repr=False)
+    _local: threading.local = field(default_factory=threading.local, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _sampler: Optional[_StackSampler] = field(default=None, repr=False)
+    
+    def __post_init__(self):
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown profiling mode '{self.mode}', expected one of {MODES}")
+    
+    def stage(self, name: str):
+        """Context manager adding a block's time to the current call's stage timings (stages may nest)"""
+        stages = getattr(self._local, 'stages', None)
+        if stages is None:
+            return nullcontext()
+        return _StageTimer(stages, name)
+    
+    def observe(self, prompt: str, generate):
+        """Run generate() and log it if it was slower than the threshold"""
+        if getattr(self._local, 'stages', None) is not None:
+            # Nested call (e.g. a fallback path): the outer call already covers it
+            return generate()
+        
+        self._local.stages = stages = {}
+        profile, mode = self._begin()
+        began = time.perf_counter()
+        started_at = time.time()
+        try:
+            result = generate()
+        finally:
+            duration = time.perf_counter() - began
+            self._local.stages = None
+            captured = self._end(profile, mode)
+        with self._lock:
+            self.calls += 1
+        if duration >= self.threshold:
+            self._record(SlowCall(
+                duration=duration,
+                prompt=prompt,
+                source=_source(result),
+                stages=stages,
+                started_at=started_at,
+                thread=threading.current_thread().name,
+                mode=mode,
+                profile=self._format(captured, mode),
+                seed=result.get('seed') if isinstance(result, dict) else None,
+            ))
+        return result
+    
+    def _begin(self) -> tuple:
+        if self.mode == 'cprofile':
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                return profile, 'cprofile'
+            except ValueError:
+                # Only one profiler can be active at a time (Python 3.12+); fall back to sampling
+                pass
+        if self.mode == 'off':
+            return None, 'off'
+        with self._lock:
+            if self._sampler is None:
+                self._sampler = _StackSampler(self.sample_interval)
+        self._sampler.start(threading.get_ident())
+        return None, 'sample'
+    
+    def _end(self, profile, mode: str):
+        if mode == 'cprofile':
+            profile.disable()
+            return profile
+        if mode == 'sample':
+            return self._sampler.stop(threading.get_ident())
+        return None
+    
+    def _format(self, captured, mode: str) -> str:
+        if mode == 'cprofile':
+            out = io.StringIO()
+            pstats.Stats(captured, stream=out).strip_dirs().sort_stats('cumulative').print_stats(TOP_ENTRIES)
+            return out.getvalue()
+        if mode == 'sample':
+            total = sum(captured.values())
+            lines = [f"{count:6d} {stack}" for stack, count in captured.most_common(TOP_ENTRIES)]
+            return f"{total} samples every {self.sample_interval * 1000:g} ms (folded stacks)\n" + '\n'.join(lines)
+        return ''
+    
+    def _record(self, call: SlowCall):
+        with self._lock:
+            self.slow_calls += 1
+            entry = (call.duration, next(self._order), call)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heappushpop(self._slowest, entry)
+    
+    def slowest(self) -> list:
+        """Logged calls, slowest first"""
+        with self._lock:
+            return [call for _, _, call in sorted(self._slowest, key=lambda entry: -entry[0])]
+    
+    def clear(self):
+        with self._lock:
+            self._slowest.clear()
+            self.calls = 0
+            self.slow_calls = 0
+    
+    def stats(self) -> dict:
+        return {
+            'mode': self.mode,
+            'threshold': self.threshold,
+            'calls': self.calls,
+            'slow_calls': self.slow_calls,
+            'logged': len(self._slowest),
+        }
+    
+    def report(self) -> str:
+        """Plain-text report of the logged calls"""
+        stats = self.stats()
+        header = (f"{stats['calls']} generations, {stats['slow_calls']} slower than "
+                  f"{self.threshold * 1000:g} ms ({self.mode} mode)")
+        return '\n\n'.join([header] + [call.report() for call in self.slowest()])
+    
+    def to_dict(self) -> dict:
+        """The log as JSON-ready data"""
+        return {'stats': self.stats(), 'calls': [asdict(call) for call in self.slowest()]}
+    
+    def save(self, path: str):
+        """Write the log as JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def _source(result) -> str:
+    if isinstance(result, dict):
+        return str(result.get('source', 'unknown'))
+    if isinstance(result, list):
+        counts = Counter(str(world.get('source', 'unknown')) for world in result)
+        return ', '.join(f"{source} x{count}" for source, count in counts.most_common())
+    return 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show a saved slow-generation log, or profile a batch of prompts")
+    parser.add_argument('log', nargs='?', help="JSON log written by GenerationProfiler.save (or cli.py --profile-out)")
+    parser.add_argument('--prompts', help="Profile generating these prompts (one per line) instead")
+    parser.add_argument('--threshold', type=float, default=0.0, help="Seconds")
+    parser.add_argument('--keep', type=int, default=5)
+    parser.add_argument('--mode', choices=MODES, default='sample')
+    parser.add_argument('--templates', action='store_true', help="Use template generation even if ANTHROPIC_API_KEY is set")
+    args = parser.parse_args()
+    
+    if args.log:
+        with open(args.log) as f:
+            data = json.load(f)
+        print(data['stats'])
+        for call in data['calls']:
+            print('\n' + SlowCall(**call).report())
+        return
+    
+    if not args.prompts:
+        parser.error("give a saved log or --prompts FILE")
+    from world_generator import WorldGenerator
+    
+    with open(args.prompts) as f:
+        prompts = [line.strip() for line in f if line.strip()]
+    profiler = GenerationProfiler(threshold=args.threshold, keep=args.keep, mode=args.mode)
+    api_key = None if args.templates else os.environ.get("ANTHROPIC_API_KEY")
+    generator = WorldGenerator(api_key=api_key, profiler=profiler)
+    for prompt in prompts:
+        generator.generate(prompt)
+    print(profiler.report())
+
+
+if __name__ == '__main__':
+    main()
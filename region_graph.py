@@ -0,0 +1,310 @@
+"""
+Region Graph - Shortest paths, reachability and components over linked rooms
+Adjacency is stored as CSR arrays; BFS runs level by level in NumPy with cached distance tables
+"""
+
+import argparse
+import heapq
+import time
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+from layout import BITS, DIRECTIONS, MapLayout
+
+UNREACHABLE = -1
+
+
+class RegionGraph:
+    """Directed graph of rooms in compressed sparse row form
+
+    Node i's exits are indices[indptr[i]:indptr[i + 1]]. BFS results (distance and
+    parent arrays) are cached per source, so repeated queries from an entrance
+    or towards a landmark are array lookups.
+    """
+    
+    def __init__(self, num_nodes: int, src, dst, names: list = None, positions=None, cache_size: int = 16):
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        order = np.argsort(src, kind='stable')
+        
+        self.num_nodes = num_nodes
+        self.indices = dst[order].astype(np.int32)
+        self.indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=num_nodes), out=self.indptr[1:])
+        self.names = names
+        self.positions = None if positions is None else np.asarray(positions, dtype=np.int64)
+        self.cache_size = cache_size
+        self._bfs_cache = OrderedDict()
+        self._name_index = None
+        self._components = None
+        self._lists = None
+    
+    def __len__(self):
+        return self.num_nodes
+    
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+    
+    # Construction
+    
+    @classmethod
+    def from_worlds(cls, worlds: list) -> 'RegionGraph':
+        """Link worlds whose exits name another world, or that sit next to each other on a layout"""
+        by_name = {world.get('name', '').lower(): i for i, world in enumerate(worlds)}
+        by_position = {tuple(world['position']): i for i, world in enumerate(worlds) if world.get('position')}
+        
+        src, dst = [], []
+        for i, world in enumerate(worlds):
+            position = world.get('position')
+            for direction, destination in world.get('exits', {}).items():
+                target = by_name.get(str(destination).lower())
+                if target is None and position and direction.lower() in DIRECTIONS:
+                    dx, dy, dz = DIRECTIONS[direction.lower()]
+                    target = by_position.get((position[0] + dx, position[1] + dy, position[2] + dz))
+                if target is not None and target != i:
+                    src.append(i)
+                    dst.append(target)
+        
+        positions = [world['position'] for world in worlds] if len(by_position) == len(worlds) else None
+        return cls(len(worlds), src, dst, [world.get('name', '') for world in worlds], positions)
+    
+    @classmethod
+    def from_layout(cls, layout: MapLayout, focus: tuple = (0, 0, 0), radius: int = 1) -> 'RegionGraph':
+        """Graph of every room in the chunks within `radius` chunks of a focus cell"""
+        cx, cy, cz = layout.chunk_key(focus)
+        cells, masks = [], []
+        for dz in range(-radius, radius + 1):
+            for dy in range(-radius, radius + 1):
+                for dx in range(-radius, radius + 1):
+                    chunk = layout.chunk((cx + dx, cy + dy, cz + dz))
+                    local = np.argwhere(chunk.types != -1)
+                    cells.append(local + np.array(chunk.origin))
+                    masks.append(chunk.links[tuple(local.T)])
+        positions = np.concatenate(cells)
+        masks = np.concatenate(masks)
+        
+        # Encode cells as sortable integer keys to map neighbour coordinates back to node ids
+        low = positions.min(axis=0) - 1
+        span = positions.max(axis=0) - low + 2
+        
+        def encode(points):
+            shifted = points - low
+            return (shifted[:, 0] * span[1] + shifted[:, 1]) * span[2] + shifted[:, 2]
+        
+        keys = encode(positions)
+        order = np.argsort(keys)
+        sorted_keys = keys[order]
+        
+        src, dst = [], []
+        for direction, bit in BITS.items():
+            nodes = np.flatnonzero(masks & bit)
+            neighbour_keys = encode(positions[nodes] + np.array(DIRECTIONS[direction]))
+            slot = np.minimum(np.searchsorted(sorted_keys, neighbour_keys), len(sorted_keys) - 1)
+            found = sorted_keys[slot] == neighbour_keys
+            src.append(nodes[found])
+            dst.append(order[slot[found]])
+        
+        return cls(len(positions), np.concatenate(src), np.concatenate(dst), positions=positions)
+    
+    # Lookups
+    
+    def node(self, key) -> int:
+        """Node id for an id, a world name (case-insensitive) or a position"""
+        if isinstance(key, (int, np.integer)):
+            return int(key)
+        if isinstance(key, str):
+            if self._name_index is None:
+                self._name_index = {name.lower(): i for i, name in enumerate(self.names or [])}
+            if key.lower() not in self._name_index:
+                raise KeyError(f"No room named '{key}'")
+            return self._name_index[key.lower()]
+        if self.positions is not None:
+            matches = np.flatnonzero((self.positions == np.asarray(key)).all(axis=1))
+            if len(matches):
+                return int(matches[0])
+        raise KeyError(f"No room at {key}")
+    
+    def neighbors(self, node) -> np.ndarray:
+        """Ids of the rooms a room's exits lead to"""
+        node = self.node(node)
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+    
+    # Breadth-first search
+    
+    def _expand(self, frontier: np.ndarray) -> tuple:
+        """All (parent, child) edge pairs leaving a frontier, without a Python loop"""
+        starts = self.indptr[frontier]
+        counts = self.indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        parents = np.repeat(frontier, counts)
+        # Position of each edge within its node's row, added to the row start
+        within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        children = self.indices[np.repeat(starts, counts) + within].astype(np.int64)
+        return parents, children
+    
+    def bfs(self, source) -> tuple:
+        """(distance, parent) arrays from a source; -1 marks unreachable rooms. Cached per source"""
+        source = self.node(source)
+        cached = self._bfs_cache.get(source)
+        if cached is not None:
+            self._bfs_cache.move_to_end(source)
+            return cached
+        
+        distance = np.full(self.num_nodes, UNREACHABLE, dtype=np.int32)
+        parent = np.full(self.num_nodes, UNREACHABLE, dtype=np.int32)
+        distance[source] = 0
+        frontier = np.array([source], dtype=np.int64)
+        level = 0
+        
+        while len(frontier):
+            level += 1
+            parents, children = self._expand(frontier)
+            fresh = distance[children] == UNREACHABLE
+            children, parents = children[fresh], parents[fresh]
+            children, first = np.unique(children, return_index=True)
+            distance[children] = level
+            parent[children] = parents[first]
+            frontier = children
+        
+        result = (distance, parent)
+        self._bfs_cache[source] = result
+        while len(self._bfs_cache) > self.cache_size:
+            self._bfs_cache.popitem(last=False)
+        return result
+    
+    def distance(self, source, target) -> int:
+        """Number of steps from source to target, or -1 if unreachable"""
+        return int(self.bfs(source)[0][self.node(target)])
+    
+    def distances(self, source) -> np.ndarray:
+        """Distance table from a source to every room"""
+        return self.bfs(source)[0]
+    
+    def shortest_path(self, source, target) -> Optional[list]:
+        """Node ids from source to target inclusive, or None if unreachable"""
+        target = self.node(target)
+        distance, parent = self.bfs(source)
+        if distance[target] == UNREACHABLE:
+            return None
+        path = [target]
+        while parent[path[-1]] != UNREACHABLE:
+            path.append(int(parent[path[-1]]))
+        return path[::-1]
+    
+    def reachable(self, source) -> np.ndarray:
+        """Boolean mask of rooms reachable from a source"""
+        return self.bfs(source)[0] != UNREACHABLE
+    
+    def all_reachable(self, source) -> bool:
+        """Whether every room can be reached from a source (e.g. the entrance)"""
+        return bool(self.reachable(source).all())
+    
+    def astar(self, source, target) -> Optional[list]:
+        """Shortest path guided by Manhattan distance between positions
+
+        Best for one-off queries between nearby rooms; falls back to the BFS tables
+        when the graph has no positions or the source's table is already cached.
+        """
+        source, target = self.node(source), self.node(target)
+        if self.positions is None or source in self._bfs_cache:
+            return self.shortest_path(source, target)
+        
+        if self._lists is None:
+            self._lists = (self.indptr.tolist(), self.indices.tolist())
+        indptr, indices = self._lists
+        # Manhattan distance is admissible for unit-cost lattice steps
+        heuristic = np.abs(self.positions - self.positions[target]).sum(axis=1).tolist()
+        
+        g_score = {source: 0}
+        came_from = {}
+        heap = [(heuristic[source], 0, source)]
+        
+        while heap:
+            _, steps, node = heapq.heappop(heap)
+            if node == target:
+                path = [node]
+                while path[-1] in came_from:
+                    path.append(came_from[path[-1]])
+                return path[::-1]
+            if steps > g_score[node]:
+                continue
+            for neighbor in indices[indptr[node]:indptr[node + 1]]:
+                if steps + 1 < g_score.get(neighbor, steps + 2):
+                    g_score[neighbor] = steps + 1
+                    came_from[neighbor] = node
+                    heapq.heappush(heap, (steps + 1 + heuristic[neighbor], steps + 1, neighbor))
+        return None
+    
+    # Components
+    
+    def components(self) -> np.ndarray:
+        """Weakly connected component label per room (0..k-1), by label hooking and pointer jumping"""
+        if self._components is not None:
+            return self._components
+        
+        src = np.repeat(np.arange(self.num_nodes, dtype=np.int64), np.diff(self.indptr))
+        dst = self.indices.astype(np.int64)
+        labels = np.arange(self.num_nodes, dtype=np.int64)
+        
+        while True:
+            low = np.minimum(labels[src], labels[dst])
+            before = labels.copy()
+            np.minimum.at(labels, labels[src], low)
+            np.minimum.at(labels, labels[dst], low)
+            # Labels only ever point at smaller ids, so jumping converges to the root
+            while True:
+                jumped = labels[labels]
+                if np.array_equal(jumped, labels):
+                    break
+                labels = jumped
+            if np.array_equal(labels, before):
+                break
+        
+        self._components = np.unique(labels, return_inverse=True)[1]
+        return self._components
+    
+    def component_sizes(self) -> np.ndarray:
+        """Number of rooms in each component"""
+        return np.bincount(self.components())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time graph queries over a procedural layout")
+    parser.add_argument('--radius', type=int, default=3, help="chunks around the origin (3 -> ~1.2M rooms when dense)")
+    parser.add_argument('--density', type=float, default=0.9)
+    parser.add_argument('--link-chance', type=float, default=0.9)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    side = 2 * args.radius + 1
+    layout = MapLayout(seed=args.seed, density=args.density, link_chance=args.link_chance, max_chunks=side ** 3)
+    start = time.perf_counter()
+    graph = RegionGraph.from_layout(layout, radius=args.radius)
+    print(f"build: {graph.num_nodes:,} rooms, {graph.num_edges:,} exits in {time.perf_counter() - start:.2f}s")
+    
+    start = time.perf_counter()
+    labels = graph.components()
+    sizes = np.bincount(labels)
+    print(f"components: {len(sizes):,} (largest {sizes.max():,}) in {time.perf_counter() - start:.2f}s")
+    
+    source = int(np.flatnonzero(labels == sizes.argmax())[0])
+    start = time.perf_counter()
+    distance = graph.distances(source)
+    print(f"bfs: {(distance >= 0).sum():,} reachable, max depth {distance.max()} in {time.perf_counter() - start:.2f}s")
+    
+    target = int(distance.argmax())
+    start = time.perf_counter()
+    path = graph.astar(source, target)
+    print(f"a* (farthest room): {len(path) - 1} steps in {time.perf_counter() - start:.3f}s")
+    
+    nearby = int(np.flatnonzero((distance > 0) & (distance <= 40))[0])
+    start = time.perf_counter()
+    path = graph.astar(source, nearby)
+    print(f"a* (nearby room): {len(path) - 1} steps in {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Scheduler - Fair, rate-limited access to a shared WorldGenerator
+Per-tenant token buckets, interactive/batch priority classes, and weighted fair queuing across tenants
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from world_generator import WorldGenerator
+
+PRIORITIES = ('interactive', 'batch')
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a tenant submits faster than its token bucket allows"""
+    
+    def __init__(self, tenant: str, retry_after: float):
+        super().__init__(f"Rate limit exceeded for '{tenant}', retry in {retry_after:.2f}s")
+        self.tenant = tenant
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`"""
+    
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def try_acquire(self, cost: float = 1.0) -> bool:
+        self._refill()
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+    
+    def refund(self, cost: float):
+        """Give back tokens for work that was acquired for but never done"""
+        self._refill()
+        self.tokens = min(self.burst, self.tokens + cost)
+    
+    def retry_after(self, cost: float = 1.0) -> float:
+        self._refill()
+        return max(0.0, (cost - self.tokens) / self.rate) if self.rate else float('inf')
+
+
+@dataclass
+class _Request:
+    prompt: str
+    tenant: str
+    priority: str
+    future: Future
+    enqueued: float
+    finish_tag: float = 0.0
+
+
+@dataclass
+class _ClassQueue:
+    """One priority class: a FIFO per tenant plus WFQ virtual time"""
+    
+    tenants: dict = field(default_factory=dict)
+    last_finish: dict = field(default_factory=dict)
+    virtual_time: float = 0.0
+    waits: deque = field(default_factory=lambda: deque(maxlen=1000))
+    served: int = 0
+    
+    def depth(self) -> int:
+        return sum(len(q) for q in self.tenants.values())
+
+
+class GenerationScheduler:
+    """Runs generate() calls on a worker pool, fairly across tenants
+
+    Interactive requests always go before batch requests. Within a class, each
+    tenant's next request gets a virtual finish tag of start + 1 / weight, and the
+    smallest tag runs next, so a tenant with a deep queue cannot starve the others.
+    LLM calls additionally share a bounded concurrency pool.
+    """
+    
+    def __init__(self, generator: WorldGenerator, workers: int = 8, llm_concurrency: int = 4,
+                 rate: float = 2.0, burst: float = 10.0, tenant_weights: dict = None, tenant_rates: dict = None):
+        self.generator = generator
+        self.rate = rate
+        self.burst = burst
+        self.tenant_weights = tenant_weights or {}
+        self.tenant_rates = tenant_rates or {}
+        self.buckets = {}
+        self.queues = {priority: _ClassQueue() for priority in PRIORITIES}
+        self.rejected = 0
+        self.llm_pool = threading.BoundedSemaphore(llm_concurrency)
+        self._cond = threading.Condition()
+        self._running = True
+        self._workers = [
+            threading.Thread(target=self._work, name=f"scheduler-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+    
+    def _bucket(self, tenant: str) -> TokenBucket:
+        if tenant not in self.buckets:
+            rate, burst = self.tenant_rates.get(tenant, (self.rate, self.burst))
+            self.buckets[tenant] = TokenBucket(rate, burst)
+        return self.buckets[tenant]
+    
+    def submit(self, prompt: str, tenant: str = 'default', priority: str = 'interactive') -> Future:
+        """Queue a generation; raises RateLimitExceeded if the tenant is over its limit"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {PRIORITIES}")
+        
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("Scheduler has been shut down")
+            bucket = self._bucket(tenant)
+            if not bucket.try_acquire():
+                self.rejected += 1
+                raise RateLimitExceeded(tenant, bucket.retry_after())
+            
+            queue = self.queues[priority]
+            start = max(queue.virtual_time, queue.last_finish.get(tenant, 0.0))
+            finish = start + 1.0 / self.tenant_weights.get(tenant, 1.0)
+            queue.last_finish[tenant] = finish
+            
+            request = _Request(prompt, tenant, priority, Future(), time.monotonic(), finish)
+            queue.tenants.setdefault(tenant, deque()).append(request)
+            self._cond.notify()
+            return request.future
+    
+    def generate(self, prompt: str, tenant: str = 'default', priority: str = 'interactive',
+                 timeout: float = None) -> dict:
+        """Submit and wait for the world"""
+        return self.submit(prompt, tenant, priority).result(timeout)
+    
+    def _next_request(self):
+        """Pop the request with the smallest finish tag from the highest non-empty class"""
+        for priority in PRIORITIES:
+            queue = self.queues[priority]
+            heads = [(q[0].finish_tag, tenant) for tenant, q in queue.tenants.items() if q]
+            if not heads:
+                continue
+            
+            _, tenant = min(heads)
+            request = queue.tenants[tenant].popleft()
+            if not queue.tenants[tenant]:
+                del queue.tenants[tenant]
+            queue.virtual_time = max(queue.virtual_time, request.finish_tag - 1.0 / self.tenant_weights.get(tenant, 1.0))
+            queue.waits.append(time.monotonic() - request.enqueued)
+            queue.served += 1
+            return request
+        return None
+    
+    def _work(self):
+        while True:
+            with self._cond:
+                request = self._next_request()
+                while request is None and self._running:
+                    self._cond.wait()
+                    request = self._next_request()
+                if request is None:
+                    return
+            
+            if not request.future.set_running_or_notify_cancel():
+                continue
+            
+            try:
+                if self.generator.api_key:
+                    with self.llm_pool:
+                        world = self.generator.generate(request.prompt)
+                else:
+                    world = self.generator.generate(request.prompt)
+                request.future.set_result(world)
+            except Exception as e:
+                request.future.set_exception(e)
+    
+    def metrics(self) -> dict:
+        """Queue depths, wait-time percentiles and counters per priority class"""
+        with self._cond:
+            result = {'rejected': self.rejected}
+            for priority, queue in self.queues.items():
+                waits = sorted(queue.waits)
+                result[priority] = {
+                    'depth': queue.depth(),
+                    'depth_by_tenant': {tenant: len(q) for tenant, q in queue.tenants.items()},
+                    'served': queue.served,
+                    'wait_p50_ms': round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+                    'wait_p95_ms': round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+                }
+            return result
+    
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work once the queues drain"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
@@ -0,0 +1,112 @@
+"""
+Similarity Index - Find previously generated worlds that are close to a new prompt
+MinHash signatures over prompt and description shingles, bucketed with LSH for sublinear lookups
+"""
+
+import threading
+import zlib
+import numpy as np
+from matcher import tokenize, STOPWORDS
+
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+def shingles(text: str) -> set:
+    """Normalized content words (word order is ignored, so rephrasings still match)"""
+    return {t for t in tokenize(text) if t not in STOPWORDS}
+
+
+class SimilarityIndex:
+    """MinHash/LSH index over every generated world
+
+    Each world contributes two signatures (prompt and description); a query is
+    scored against both and the better match wins. Bands x rows must equal num_perm;
+    the default 16 x 3 surfaces pairs above roughly 0.4 Jaccard similarity.
+    """
+    
+    def __init__(self, num_perm: int = 48, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+        
+        self.signatures = np.zeros((1024, num_perm), dtype=np.uint32)
+        self.owners = np.zeros(1024, dtype=np.int64)
+        self.count = 0
+        self.buckets = {}
+        self.worlds = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.worlds)
+    
+    def signature(self, text: str):
+        """MinHash signature of a text, or None if it has no content words"""
+        grams = shingles(text)
+        if not grams:
+            return None
+        hashes = np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+        permuted = (hashes[:, None] * self.a + self.b) % MERSENNE_PRIME
+        return (permuted.min(axis=0) & 0xFFFFFFFF).astype(np.uint32)
+    
+    def _band_keys(self, signature) -> list:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+    
+    def _append(self, signature, world_id: int):
+        """Store one signature row, growing the arrays geometrically"""
+        if self.count == len(self.signatures):
+            self.signatures = np.concatenate([self.signatures, np.zeros_like(self.signatures)])
+            self.owners = np.concatenate([self.owners, np.zeros_like(self.owners)])
+        row = self.count
+        self.signatures[row] = signature
+        self.owners[row] = world_id
+        self.count += 1
+        
+        for key in self._band_keys(signature):
+            self.buckets.setdefault(key, []).append(row)
+    
+    def add(self, world: dict) -> int:
+        """Index a world, returning its id"""
+        prompt_sig = self.signature(world.get('original_prompt', ''))
+        description_sig = self.signature(f"{world.get('name', '')} {world.get('description', '')}")
+        
+        with self._lock:
+            world_id = len(self.worlds)
+            self.worlds[world_id] = world
+            for signature in (prompt_sig, description_sig):
+                if signature is not None:
+                    self._append(signature, world_id)
+        return world_id
+    
+    def get_world(self, world_id: int) -> dict:
+        """Look up a stored world by id"""
+        return self.worlds[world_id]
+    
+    def find_similar(self, prompt: str, k: int = 5, min_score: float = 0.0) -> list:
+        """Up to k (score, world) pairs, best first; scores estimate Jaccard similarity"""
+        signature = self.signature(prompt)
+        if signature is None:
+            return []
+        
+        with self._lock:
+            rows = set()
+            for key in self._band_keys(signature):
+                rows.update(self.buckets.get(key, ()))
+            if not rows:
+                return []
+            
+            rows = np.fromiter(rows, dtype=np.int64, count=len(rows))
+            scores = (self.signatures[rows] == signature).mean(axis=1)
+            owners = self.owners[rows]
+        
+        best = {}
+        for owner, score in zip(owners.tolist(), scores.tolist()):
+            if score >= min_score and score > best.get(owner, -1.0):
+                best[owner] = score
+        
+        ranked = sorted(best.items(), key=lambda item: -item[1])[:k]
+        return [(round(score, 3), self.get_world(owner)) for owner, score in ranked]
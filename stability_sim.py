@@ -0,0 +1,294 @@
+"""
+Stability Simulation - Integrity and damage propagation for rooms and props across a region
+Explosions and collapses spread through exits one ring per step, with every update a NumPy array pass
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+from region_graph import RegionGraph
+from template_packs import TemplatePack, default_pack
+
+STABILITIES = ('solid', 'normal', 'fragile', 'hope')
+
+# Per stability label: structural integrity, damage multiplier and integrity lost per step
+STABILITY_INTEGRITY = np.array([200.0, 100.0, 40.0, 15.0], dtype=np.float32)
+STABILITY_VULNERABILITY = np.array([0.5, 1.0, 1.5, 2.5], dtype=np.float32)
+STABILITY_DECAY = np.array([0.0, 0.0, 0.02, 0.1], dtype=np.float32)
+
+# Per prop type: integrity and how much of a room's damage reaches the prop
+PROP_INTEGRITY = {'furniture': 30.0, 'container': 20.0, 'hazard': 10.0, 'light': 5.0, 'decoration': 15.0,
+                  'restraint': 60.0, 'natural': 80.0, 'vehicle': 40.0, 'tech': 25.0}
+PROP_FRAGILITY = {'natural': 0.3, 'restraint': 0.5, 'tech': 1.5, 'light': 1.5}
+DEFAULT_PROP_INTEGRITY = 25.0
+
+# Explosive yield per prop template; hazards without an entry use HAZARD_BLAST
+PROP_BLAST = {'explosive_barrel': 120.0}
+HAZARD_BLAST = 60.0
+
+BLAST_FALLOFF = 0.35     # share of a blast that reaches each neighbouring room
+COLLAPSE_DEBRIS = 0.25   # share of a collapsed room's full integrity dealt to each neighbour
+
+CAUSES = ('strain', 'impact', 'blast', 'debris')
+STRAIN, IMPACT, BLAST, DEBRIS = range(len(CAUSES))
+
+
+@dataclass
+class StepEvents:
+    """What broke in one step, as arrays of ids"""
+    
+    tick: int
+    exploded: np.ndarray
+    destroyed: np.ndarray
+    collapsed: np.ndarray
+    causes: np.ndarray
+
+
+class StabilitySimulation:
+    """Room and prop integrity tables over a room graph
+
+    Damage dealt during a step is applied at the start of the next one, so chain
+    reactions advance one ring of rooms per step: an exploding barrel damages its
+    room, the props in it and (with falloff) the neighbouring rooms; props that break
+    and are explosive go off next step; rooms whose integrity runs out collapse,
+    crushing their props and showering neighbours with debris. Fragile and hope rooms
+    also lose a little integrity every step on their own.
+    """
+    
+    def __init__(self, graph: RegionGraph, stability, names: list = None,
+                 templates: Optional[TemplatePack] = None):
+        self.graph = graph
+        self.templates = templates or default_pack()
+        self.names = names
+        self.tick = 0
+        rooms = len(graph)
+        
+        # Labels ('fragile') or label indices
+        if not isinstance(stability, np.ndarray):
+            stability = [STABILITIES.index(label) if isinstance(label, str) else label for label in stability]
+        self.stability = stability = np.asarray(stability, dtype=np.int8)
+        self.max_integrity = STABILITY_INTEGRITY[stability]
+        self.integrity = self.max_integrity.copy()
+        self.vulnerability = STABILITY_VULNERABILITY[stability]
+        self.decay = STABILITY_DECAY[stability]
+        self.standing = np.ones(rooms, dtype=bool)
+        self.pending = np.zeros(rooms, dtype=np.float32)
+        self.cause = np.full(rooms, STRAIN, dtype=np.int8)
+        
+        # Blasts and debris travel both ways through an exit, so use each connection once per direction
+        src = np.repeat(np.arange(rooms, dtype=np.int64), np.diff(graph.indptr))
+        pairs = np.unique(np.concatenate([np.stack([src, graph.indices], 1),
+                                          np.stack([graph.indices, src], 1)]).astype(np.int64), axis=0)
+        self.edge_src, self.edge_dst = pairs[:, 0], pairs[:, 1]
+        
+        self.prop_room = np.zeros(0, dtype=np.int32)
+        self.prop_integrity = np.zeros(0, dtype=np.float32)
+        self.prop_fragility = np.zeros(0, dtype=np.float32)
+        self.prop_blast = np.zeros(0, dtype=np.float32)
+        self.prop_pending = np.zeros(0, dtype=np.float32)
+        self.prop_intact = np.zeros(0, dtype=bool)
+        self.prop_names = []
+        
+        # Per prop template key: (integrity, fragility, blast)
+        self.prop_stats = {}
+        for key, prop in self.templates.PROP_TEMPLATES.items():
+            prop_type = prop.get('type')
+            blast = PROP_BLAST.get(key, HAZARD_BLAST if prop_type == 'hazard' else 0.0)
+            self.prop_stats[key] = (PROP_INTEGRITY.get(prop_type, DEFAULT_PROP_INTEGRITY),
+                                    PROP_FRAGILITY.get(prop_type, 1.0), blast)
+        self._prop_keys = {prop['name'].lower(): key for key, prop in self.templates.PROP_TEMPLATES.items()}
+    
+    def __len__(self):
+        return len(self.graph)
+    
+    @classmethod
+    def from_worlds(cls, worlds: list, templates: Optional[TemplatePack] = None) -> 'StabilitySimulation':
+        """Rooms from worlds (linked by exits naming each other) with their props"""
+        graph = RegionGraph.from_worlds(worlds)
+        stability = [world.get('stability') if world.get('stability') in STABILITIES else 'normal'
+                     for world in worlds]
+        sim = cls(graph, stability, [world.get('name', '') for world in worlds], templates)
+        rooms, props = [], []
+        for room, world in enumerate(worlds):
+            for prop in world.get('props', []):
+                rooms.append(room)
+                props.append(prop)
+        sim.add_props(rooms, props)
+        return sim
+    
+    # Setup
+    
+    def prop_key(self, prop) -> Optional[str]:
+        """Template key for a prop dict (matched by name) or key string"""
+        if isinstance(prop, str):
+            return prop if prop in self.prop_stats else None
+        return self._prop_keys.get(str(prop.get('name', '')).lower())
+    
+    def add_props(self, rooms, props: list) -> np.ndarray:
+        """Add props (template keys or prop dicts) to rooms, returning their ids"""
+        stats = []
+        for prop in props:
+            key = self.prop_key(prop)
+            if key is not None:
+                stats.append(self.prop_stats[key])
+            else:
+                prop_type = prop.get('type') if isinstance(prop, dict) else None
+                stats.append((PROP_INTEGRITY.get(prop_type, DEFAULT_PROP_INTEGRITY), PROP_FRAGILITY.get(prop_type, 1.0),
+                              HAZARD_BLAST if prop_type == 'hazard' else 0.0))
+            self.prop_names.append(prop.get('name', '') if isinstance(prop, dict) else
+                                   self.templates.PROP_TEMPLATES.get(prop, {}).get('name', str(prop)))
+        stats = np.array(stats, dtype=np.float32).reshape(-1, 3)
+        
+        ids = np.arange(len(self.prop_room), len(self.prop_room) + len(stats))
+        self.prop_room = np.concatenate([self.prop_room, np.asarray(rooms, dtype=np.int32)])
+        self.prop_integrity = np.concatenate([self.prop_integrity, stats[:, 0]])
+        self.prop_fragility = np.concatenate([self.prop_fragility, stats[:, 1]])
+        self.prop_blast = np.concatenate([self.prop_blast, stats[:, 2]])
+        self.prop_pending = np.concatenate([self.prop_pending, np.zeros(len(stats), dtype=np.float32)])
+        self.prop_intact = np.concatenate([self.prop_intact, np.ones(len(stats), dtype=bool)])
+        return ids
+    
+    # Damage
+    
+    def damage_room(self, rooms, amount: float):
+        """Deal damage to rooms (e.g. a falling boulder), applied next step"""
+        rooms = np.atleast_1d(np.asarray(rooms))
+        self.pending[rooms] += amount * self.vulnerability[rooms]
+        self.cause[rooms] = IMPACT
+    
+    def damage_prop(self, props, amount: float):
+        """Deal damage to props, applied next step"""
+        np.add.at(self.prop_pending, np.atleast_1d(np.asarray(props)), amount)
+    
+    def ignite(self, props):
+        """Destroy props outright next step; explosive ones go off"""
+        self.prop_pending[np.atleast_1d(np.asarray(props))] = np.inf
+    
+    def step(self) -> StepEvents:
+        """Apply pending damage, resolve explosions and collapses, and queue the damage they cause"""
+        self.tick += 1
+        rooms = len(self.graph)
+        
+        # Apply last step's damage plus this step's strain on fragile and hope rooms
+        self.integrity -= self.pending + self.decay * self.standing
+        self.pending[:] = 0
+        self.prop_integrity -= self.prop_pending
+        self.prop_pending[:] = 0
+        
+        broken = self.prop_intact & (self.prop_integrity <= 0)
+        destroyed = np.flatnonzero(broken)
+        exploded = destroyed[self.prop_blast[destroyed] > 0]
+        self.prop_intact[destroyed] = False
+        
+        collapsed = np.flatnonzero(self.standing & (self.integrity <= 0))
+        causes = self.cause[collapsed].copy()
+        self.standing[collapsed] = False
+        
+        # Damage produced this step: blasts hit their own room in full and neighbours with falloff,
+        # collapses shower neighbours with debris
+        blast = np.bincount(self.prop_room[exploded], weights=self.prop_blast[exploded], minlength=rooms)
+        debris = np.zeros(rooms)
+        debris[collapsed] = COLLAPSE_DEBRIS * self.max_integrity[collapsed]
+        blast_in = np.bincount(self.edge_dst, weights=blast[self.edge_src] * BLAST_FALLOFF, minlength=rooms)
+        debris_in = np.bincount(self.edge_dst, weights=debris[self.edge_src], minlength=rooms)
+        room_blast = blast + blast_in
+        
+        hit = self.standing & ((room_blast > 0) | (debris_in > 0))
+        self.pending += ((room_blast + debris_in) * self.vulnerability * hit).astype(np.float32)
+        self.cause[hit] = np.where(room_blast[hit] >= debris_in[hit], BLAST, DEBRIS)
+        
+        # Props take their room's blast and debris; props in a room that just collapsed are crushed
+        intact = np.flatnonzero(self.prop_intact)
+        prop_rooms = self.prop_room[intact]
+        self.prop_pending[intact] += ((room_blast + debris_in)[prop_rooms] * self.prop_fragility[intact]).astype(np.float32)
+        crushed = np.zeros(rooms, dtype=bool)
+        crushed[collapsed] = True
+        self.prop_pending[intact[crushed[prop_rooms]]] = np.inf
+        
+        return StepEvents(self.tick, exploded, destroyed, collapsed, causes)
+    
+    def run(self, max_steps: int = 100, until_quiet: bool = True) -> list:
+        """Step up to max_steps times, stopping early once no damage is pending"""
+        events = []
+        for _ in range(max_steps):
+            events.append(self.step())
+            if until_quiet and not self.pending.any() and not self.prop_pending.any():
+                break
+        return events
+    
+    # Queries
+    
+    def collapse_events(self, events: StepEvents) -> list:
+        """Collapses in a step as dicts: tick, room, name, stability and cause"""
+        return [
+            {
+                'tick': events.tick,
+                'room': int(room),
+                'name': self.names[room] if self.names else None,
+                'stability': STABILITIES[self.stability[room]],
+                'cause': CAUSES[cause],
+            }
+            for room, cause in zip(events.collapsed, events.causes)
+        ]
+    
+    def condition(self) -> np.ndarray:
+        """Remaining integrity as a fraction of full, per room (0 once collapsed)"""
+        return np.clip(self.integrity / self.max_integrity, 0, 1) * self.standing
+    
+    def label(self, room: int) -> str:
+        """A stability label for a room's current state, for updating its world"""
+        if not self.standing[room]:
+            return 'collapsed'
+        base = STABILITIES[self.stability[room]]
+        if base in ('solid', 'normal') and self.condition()[room] < 0.5:
+            return 'fragile'
+        return base
+    
+    def stats(self) -> dict:
+        """Counts of standing rooms and intact props"""
+        return {
+            'tick': self.tick,
+            'rooms': len(self.graph),
+            'standing': int(self.standing.sum()),
+            'props': len(self.prop_room),
+            'intact_props': int(self.prop_intact.sum()),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time chain-reaction steps on a procedural region")
+    parser.add_argument('--radius', type=int, default=1, help="Region radius in chunks")
+    parser.add_argument('--explosive-share', type=float, default=0.05, help="Share of rooms with an explosive barrel")
+    parser.add_argument('--ignite', type=int, default=20, help="Barrels lit at the start")
+    parser.add_argument('--steps', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    from layout import MapLayout
+    
+    graph = RegionGraph.from_layout(MapLayout(seed=args.seed), radius=args.radius)
+    rng = np.random.default_rng(args.seed)
+    rooms = len(graph)
+    sim = StabilitySimulation(graph, rng.choice(len(STABILITIES), rooms, p=[0.2, 0.5, 0.2, 0.1]).astype(np.int8))
+    
+    furniture = rng.integers(0, rooms, rooms * 2)
+    sim.add_props(furniture, rng.choice(['table', 'chair', 'crate', 'torch', 'statue'], len(furniture)).tolist())
+    barrel_rooms = rng.choice(rooms, int(rooms * args.explosive_share), replace=False)
+    barrels = sim.add_props(barrel_rooms, ['explosive_barrel'] * len(barrel_rooms))
+    sim.ignite(rng.choice(barrels, min(args.ignite, len(barrels)), replace=False))
+    
+    start = time.perf_counter()
+    events = sim.run(args.steps, until_quiet=False)
+    elapsed = time.perf_counter() - start
+    
+    collapsed = sum(len(e.collapsed) for e in events)
+    exploded = sum(len(e.exploded) for e in events)
+    print(f"{rooms:,} rooms, {len(sim.prop_room):,} props: {elapsed / len(events) * 1000:.2f} ms/step "
+          f"({rooms * len(events) / elapsed:,.0f} room updates/s)")
+    print(f"{exploded} explosions and {collapsed} collapses over {len(events)} steps; {sim.stats()}")
+
+
+if __name__ == '__main__':
+    main()
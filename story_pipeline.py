@@ -0,0 +1,230 @@
+"""
+Story Pipeline - One room per location described in a long adventure outline
+Streams the document through segmentation, parsing, dedupe and batched generation, emitting worlds as it goes
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+from matcher import PromptIndex, tokenize
+from parse_cache import normalize_prompt
+from world_generator import WorldGenerator
+
+# "# The Sunken Crypt", "Chapter 3: The Sunken Crypt", "Area 12. Guard Room", "Location - Old Mill";
+# the label is dropped inside markdown headings too ("## Area 1: The Gate" -> "The Gate")
+HEADING_LABEL = r"(?:chapter|part|act|scene|area|room|location|encounter)\s+[\w.]+\s*[:.\-–—]\s*"
+HEADING_RE = re.compile(
+    rf"^\s*(?:#{{1,6}}\s+(?:{HEADING_LABEL})?(?P<markdown>.+?)\s*#*"
+    rf"|{HEADING_LABEL}(?P<label>.+?))\s*$",
+    re.IGNORECASE,
+)
+# Capitalized phrase after "the" (or a sentence-initial "The"), e.g. "the Rusty Anchor tavern" or "The Hall of Kings"
+PLACE_NAME_RE = re.compile(
+    r"\b[Tt]he\s+((?:[A-Z][\w'-]*\s+){0,3}[A-Z][\w'-]*(?:\s+of\s+(?:the\s+)?[A-Z][\w'-]*)?)(?:\s+([a-z]+))?"
+)
+
+
+@dataclass
+class Segment:
+    """A paragraph of the document and the heading it sits under"""
+    
+    index: int
+    line: int
+    title: Optional[str]
+    text: str
+
+
+@dataclass
+class Location:
+    """A distinct place found in the document, ready to generate"""
+    
+    key: str
+    name: Optional[str]
+    prompt: str
+    segment: int
+    line: int
+
+
+def iter_segments(lines: Iterable[str], max_chars: int = 4000) -> Iterator[Segment]:
+    """Split a stream of lines into paragraphs, tracking the current heading
+
+    Only the paragraph being read is buffered; paragraphs longer than max_chars
+    are cut into pieces so a document without blank lines still streams.
+    """
+    title = None
+    buffer = []
+    size = 0
+    start = 1
+    index = 0
+    
+    def flush():
+        nonlocal buffer, size, index
+        text = ' '.join(buffer)
+        buffer, size = [], 0
+        if text:
+            index += 1
+            return Segment(index - 1, start, title, text)
+        return None
+    
+    for number, line in enumerate(lines, 1):
+        stripped = line.strip()
+        heading = HEADING_RE.match(stripped) if stripped else None
+        
+        if not stripped or heading:
+            segment = flush()
+            if segment:
+                yield segment
+            if heading:
+                title = (heading.group('markdown') or heading.group('label')).strip()
+            continue
+        
+        if not buffer:
+            start = number
+        buffer.append(stripped)
+        size += len(stripped) + 1
+        if size >= max_chars:
+            segment = flush()
+            if segment:
+                yield segment
+    
+    segment = flush()
+    if segment:
+        yield segment
+
+
+class StoryPipeline:
+    """Turns a long document into a stream of worlds, one per distinct location
+
+    Each stage is a generator: segments -> matched segments -> new locations ->
+    worlds, generated batch_size at a time with generate_batch (so the LLM path
+    packs several locations into one request). Segments with no keyword or
+    synonym evidence for a room type (the matcher then says generic), or whose
+    match is weaker than min_confidence, are narration, not places, and are
+    skipped. Only new places reach generation, so only they pay for the full parse.
+    """
+    
+    def __init__(self, generator: WorldGenerator, batch_size: int = 8, min_confidence: float = 0.3,
+                 max_segment_chars: int = 4000, max_prompt_chars: int = 600):
+        self.generator = generator
+        self.batch_size = batch_size
+        self.min_confidence = min_confidence
+        self.max_segment_chars = max_segment_chars
+        self.max_prompt_chars = max_prompt_chars
+        self.seen = {}
+        self.segments = 0
+        self.skipped = 0
+        self.duplicates = 0
+        self.generated = 0
+        
+        # Single words that name a room type, for spotting "the Rusty Anchor tavern"
+        index = generator.templates.PROMPT_INDEX
+        self.room_terms = {
+            term for term, labels in index.postings.items()
+            if ' ' not in term and any(axis == PromptIndex.ROOM for axis, _ in labels)
+        }
+    
+    def place_name(self, text: str) -> Optional[str]:
+        """The first proper name in a segment that names a place, if any"""
+        for match in PLACE_NAME_RE.finditer(text):
+            name, following = match.group(1), match.group(2)
+            if following and tokenize(following)[0] in self.room_terms:
+                return f"{name} {following.title()}"
+            if any(token in self.room_terms for token in tokenize(name)):
+                return name
+        return None
+    
+    def place_key(self, name: str) -> str:
+        """Dedupe key for a place name ("The Hall of Kings" and "the hall of kings" match)"""
+        key = normalize_prompt(name)
+        return key[4:] if key.startswith('the ') else key
+    
+    def parsed(self, segments: Iterable[Segment]) -> Iterator[tuple]:
+        """Run the room/mood matcher over each segment, yielding (segment, prompt, match)"""
+        for segment in segments:
+            self.segments += 1
+            prompt = segment.text[:self.max_prompt_chars]
+            yield segment, prompt, self.generator.match_prompt(normalize_prompt(prompt))
+    
+    def locations(self, parsed: Iterable[tuple]) -> Iterator[Location]:
+        """Keep segments that describe a place, once per place"""
+        for segment, prompt, match in parsed:
+            if match.room_type == 'generic' or match.room_confidence < self.min_confidence:
+                self.skipped += 1
+                continue
+            
+            # Named places dedupe by name (from the text, or a heading like "Area 3: The Hall of Kings");
+            # unnamed ones by heading and room type, so "the tavern" again is the same tavern
+            name = self.place_name(segment.text)
+            if not name and segment.title and any(token in self.room_terms for token in tokenize(segment.title)):
+                name = segment.title
+            key = self.place_key(name) if name else f"{normalize_prompt(segment.title or '')}|{match.room_type}"
+            if key in self.seen:
+                self.seen[key] += 1
+                self.duplicates += 1
+                continue
+            self.seen[key] = 1
+            yield Location(key, name or segment.title, prompt, segment.index, segment.line)
+    
+    def worlds(self, lines: Iterable[str]) -> Iterator[dict]:
+        """Worlds for every location in a stream of lines, emitted one batch at a time"""
+        locations = self.locations(self.parsed(iter_segments(lines, self.max_segment_chars)))
+        while True:
+            batch = list(islice(locations, self.batch_size))
+            if not batch:
+                return
+            
+            worlds = self.generator.generate_batch([location.prompt for location in batch])
+            for location, world in zip(batch, worlds):
+                if location.name:
+                    world['name'] = location.name
+                world['story'] = {'location': location.key, 'segment': location.segment, 'line': location.line}
+                self.generated += 1
+                yield world
+    
+    def stats(self) -> dict:
+        """Counters for the run so far"""
+        return {
+            'segments': self.segments,
+            'skipped': self.skipped,
+            'duplicates': self.duplicates,
+            'locations': len(self.seen),
+            'generated': self.generated,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate one world per location in a long story or adventure outline")
+    parser.add_argument('document', help="Text or Markdown file ('-' for stdin)")
+    parser.add_argument('--out', help="Write NDJSON here instead of stdout")
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--min-confidence', type=float, default=0.3, help="Weakest room match that counts as a place")
+    parser.add_argument('--templates', action='store_true', help="Use template generation even if ANTHROPIC_API_KEY is set")
+    parser.add_argument('--template-dir', default=os.environ.get("WORLD_FORGE_TEMPLATES"), help="Template pack directory")
+    args = parser.parse_args()
+    
+    api_key = None if args.templates else os.environ.get("ANTHROPIC_API_KEY")
+    generator = WorldGenerator(api_key=api_key, template_dir=args.template_dir)
+    pipeline = StoryPipeline(generator, args.batch_size, args.min_confidence)
+    
+    document = sys.stdin if args.document == '-' else open(args.document, encoding='utf-8')
+    out = open(args.out, 'w') if args.out else sys.stdout
+    try:
+        for world in pipeline.worlds(document):
+            out.write(json.dumps(world, default=str) + "\n")
+            out.flush()
+    finally:
+        if document is not sys.stdin:
+            document.close()
+        if args.out:
+            out.close()
+    
+    print(json.dumps(pipeline.stats()), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Stub Messages API - A local stand-in for the Anthropic Messages endpoint
+Serves recorded responses (or template-built ones) with optional latency, errors and SSE streaming,
+plus the Message Batches endpoints (create, retrieve, results) for offline batch jobs
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from transport import ReplayTransport, InjectedError, estimate_usage
+
+STREAM_CHUNK_CHARS = 40
+BATCHES_PATH = '/v1/messages/batches'
+
+
+def _message(request: dict, text: str) -> dict:
+    """A Messages API response body for a reply text"""
+    return {
+        'id': f"msg_stub_{uuid.uuid4().hex[:20]}",
+        'type': 'message',
+        'role': 'assistant',
+        'model': request.get('model'),
+        'content': [{'type': 'text', 'text': text}],
+        'stop_reason': 'end_turn',
+        'stop_sequence': None,
+        'usage': estimate_usage(request, text),
+    }
+
+
+def _timestamp(moment: datetime) -> str:
+    return moment.isoformat().replace('+00:00', 'Z')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """POST /v1/messages (with or without "stream": true), and the Message Batches endpoints:
+    POST /v1/messages/batches, GET /v1/messages/batches/{id} and GET /v1/messages/batches/{id}/results
+    """
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+    
+    def _send_json(self, status: int, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def _send_error(self, status: int, error_type: str, message: str):
+        self._send_json(status, {'type': 'error', 'error': {'type': error_type, 'message': message}})
+    
+    def do_POST(self):
+        path = self.path.split('?')[0].rstrip('/')
+        if path not in ('/v1/messages', BATCHES_PATH):
+            self._send_error(404, 'not_found_error', f"Unknown path {self.path}")
+            return
+        
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            request = json.loads(self.rfile.read(length))
+        except json.JSONDecodeError:
+            self._send_error(400, 'invalid_request_error', "Body is not valid JSON")
+            return
+        
+        if path == BATCHES_PATH:
+            requests = request.get('requests') if isinstance(request, dict) else None
+            if not isinstance(requests, list) or not requests:
+                self._send_error(400, 'invalid_request_error', "requests must be a non-empty list")
+                return
+            self._send_json(200, self.server.create_batch(requests))
+            return
+        
+        try:
+            text = self.server.transport.send(request)
+        except InjectedError as e:
+            self._send_error(529, 'overloaded_error', str(e))
+            return
+        except KeyError as e:
+            self._send_error(404, 'not_found_error', str(e))
+            return
+        
+        message = _message(request, text)
+        with self.server.lock:
+            self.server.served += 1
+        
+        if request.get('stream'):
+            self._stream(message)
+        else:
+            self._send_json(200, message)
+    
+    def do_GET(self):
+        parts = self.path.split('?')[0].rstrip('/').split('/')
+        # ['', 'v1', 'messages', 'batches', id] or [..., id, 'results']
+        if parts[:4] != ['', 'v1', 'messages', 'batches'] or len(parts) not in (5, 6) or \
+                (len(parts) == 6 and parts[5] != 'results'):
+            self._send_error(404, 'not_found_error', f"Unknown path {self.path}")
+            return
+        
+        with self.server.lock:
+            entry = self.server.batches.get(parts[4])
+            batch = dict(entry['batch']) if entry else None
+            results = list(entry['results']) if entry else None
+        if batch is None:
+            self._send_error(404, 'not_found_error', f"No batch {parts[4]}")
+            return
+        if len(parts) == 5:
+            self._send_json(200, batch)
+            return
+        if batch['processing_status'] != 'ended':
+            self._send_error(400, 'invalid_request_error', f"Batch {parts[4]} has not ended")
+            return
+        
+        payload = ''.join(json.dumps(result) + '\n' for result in results).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-jsonl')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def _event(self, name: str, data: dict):
+        self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode())
+        self.wfile.flush()
+    
+    def _stream(self, message: dict):
+        """Replay a message as Server-Sent Events in the Messages API streaming format"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        
+        text = message['content'][0]['text']
+        usage = message['usage']
+        start = dict(message, content=[], stop_reason=None, usage={**usage, 'output_tokens': 0})
+        self._event('message_start', {'type': 'message_start', 'message': start})
+        self._event('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                            'content_block': {'type': 'text', 'text': ''}})
+        for i in range(0, len(text), STREAM_CHUNK_CHARS):
+            self._event('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                                'delta': {'type': 'text_delta', 'text': text[i:i + STREAM_CHUNK_CHARS]}})
+            if self.server.chunk_delay:
+                time.sleep(self.server.chunk_delay)
+        self._event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+        self._event('message_delta', {'type': 'message_delta',
+                                      'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                                      'usage': {'output_tokens': usage['output_tokens']}})
+        self._event('message_stop', {'type': 'message_stop'})
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the replay transport and counters"""
+    
+    daemon_threads = True
+    
+    def __init__(self, address: tuple, transport: ReplayTransport, chunk_delay: float = 0.0, verbose: bool = False):
+        super().__init__(address, StubHandler)
+        self.transport = transport
+        self.chunk_delay = chunk_delay
+        self.verbose = verbose
+        self.served = 0
+        self.batches = {}
+        self.lock = threading.Lock()
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def create_batch(self, requests: list) -> dict:
+        """Register a message batch and work through it on a background thread"""
+        now = datetime.now(timezone.utc)
+        batch_id = f"msgbatch_stub_{uuid.uuid4().hex[:20]}"
+        batch = {
+            'id': batch_id,
+            'type': 'message_batch',
+            'processing_status': 'in_progress',
+            'request_counts': {'processing': len(requests), 'succeeded': 0, 'errored': 0,
+                               'canceled': 0, 'expired': 0},
+            'created_at': _timestamp(now),
+            'expires_at': _timestamp(now + timedelta(hours=24)),
+            'ended_at': None,
+            'cancel_initiated_at': None,
+            'archived_at': None,
+            'results_url': None,
+        }
+        with self.lock:
+            self.batches[batch_id] = {'batch': batch, 'results': []}
+        threading.Thread(target=self._process_batch, args=(batch_id, requests),
+                         name=f"stub-{batch_id}", daemon=True).start()
+        return dict(batch)
+    
+    def _process_batch(self, batch_id: str, requests: list):
+        entry = self.batches[batch_id]
+        try:
+            for item in requests:
+                params = item.get('params', {})
+                try:
+                    text = self.transport.send(params)
+                    result = {'type': 'succeeded', 'message': _message(params, text)}
+                    counter = 'succeeded'
+                except Exception as e:
+                    # Any transport failure (injected, unknown prompt, a live network error) errors just this request
+                    error_type = {InjectedError: 'overloaded_error', KeyError: 'not_found_error'}.get(type(e), 'api_error')
+                    result = {'type': 'errored', 'error': {'type': 'error', 'error': {'type': error_type, 'message': str(e)}}}
+                    counter = 'errored'
+                with self.lock:
+                    entry['results'].append({'custom_id': item.get('custom_id'), 'result': result})
+                    counts = entry['batch']['request_counts']
+                    counts['processing'] -= 1
+                    counts[counter] += 1
+                    self.served += 1
+        finally:
+            # Always end the batch, so clients polling it never wait forever
+            with self.lock:
+                entry['batch'].update(
+                    processing_status='ended',
+                    ended_at=_timestamp(datetime.now(timezone.utc)),
+                    results_url=f"{self.base_url}{BATCHES_PATH}/{batch_id}/results",
+                )
+    
+    def start(self) -> threading.Thread:
+        """Serve from a background thread (handy in tests and load runs)"""
+        thread = threading.Thread(target=self.serve_forever, name="stub-server", daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stub of the Messages API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--recordings', help="Directory written by the record transport")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds before each response")
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 529")
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument('--strict', action='store_true', help="404 on unrecorded requests instead of synthesizing")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    
+    transport = ReplayTransport(args.recordings, latency=args.latency, jitter=args.jitter,
+                                error_rate=args.error_rate, synthesize_misses=not args.strict)
+    server = StubServer((args.host, args.port), transport, args.chunk_delay, args.verbose)
+    print(f"Stub Messages API on {server.base_url} (set ANTHROPIC_BASE_URL to use it)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""
+Template Packs - Load template tables from YAML/JSON/TOML data files
+Packs are compiled once, cached on disk by content hash, and hot-reloaded when files change
+"""
+
+import hashlib
+import json
+import pickle
+import re
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+import matcher
+import templates
+from matcher import build_prompt_index
+
+TABLE_NAMES = tuple(name for name in vars(templates) if name.isupper())
+PACK_EXTENSIONS = ('.json', '.yaml', '.yml', '.toml')
+
+# Cache keys also cover the sources below, so edits to the built-in tables or the
+# compile/match code invalidate artifacts; bump this for changes made elsewhere
+COMPILER_VERSION = 2
+COMPILER_SOURCES = (templates.__file__, matcher.__file__, __file__)
+
+
+class TemplatePack:
+    """Compiled template tables, exposed as attributes named like the templates module constants"""
+    
+    def __init__(self, tables: dict, content_hash: str = 'builtin'):
+        self.__dict__.update(tables)
+        self.content_hash = content_hash
+    
+    def __repr__(self):
+        return f"TemplatePack({self.content_hash[:12]})"
+
+
+def compile_tables(tables: dict, content_hash: str = 'builtin') -> TemplatePack:
+    """Build the indexed runtime form of a set of raw tables"""
+    compiled = dict(tables)
+    
+    # Regexes are compiled once per pack instead of on every prompt
+    compiled['NPC_PATTERNS'] = [
+        (re.compile(pattern), npc_type) for pattern, npc_type in tables['NPC_PATTERNS']
+    ]
+    compiled['QUANTITY_PATTERNS'] = {
+        npc_type: [
+            (re.compile(rf'\b{word}\b.*{npc_type}'), num)
+            for word, num in tables['QUANTITY_WORDS'].items()
+        ]
+        for _, npc_type in tables['NPC_PATTERNS']
+    }
+    
+    # Inverted index for scored room type / mood matching
+    compiled['PROMPT_INDEX'] = build_prompt_index(tables)
+    
+    return TemplatePack(compiled, content_hash)
+
+
+@lru_cache(maxsize=1)
+def default_pack() -> TemplatePack:
+    """The built-in pack compiled from templates.py"""
+    return compile_tables({name: getattr(templates, name) for name in TABLE_NAMES})
+
+
+def pack_files(directory) -> list:
+    """Data files in a pack directory, in the order they are applied"""
+    root = Path(directory)
+    return sorted(
+        path for path in root.rglob('*')
+        if path.suffix in PACK_EXTENSIONS and path.is_file()
+        and not any(part.startswith('.') for part in path.relative_to(root).parts)
+    )
+
+
+def _read_file(path: Path) -> dict:
+    """Parse one data file into a dict of tables"""
+    text = path.read_text()
+    
+    if path.suffix == '.json':
+        data = json.loads(text)
+    elif path.suffix == '.toml':
+        import tomllib
+        data = tomllib.loads(text)
+    else:
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError(f"PyYAML is required to load {path}; install it with `pip install pyyaml`")
+        data = yaml.safe_load(text) or {}
+    
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} must map table names to tables, got a {type(data).__name__}")
+    return data
+
+
+@lru_cache(maxsize=1)
+def _compiler_hash() -> str:
+    """Hash of the built-in tables and compiler sources, read once per process"""
+    digest = hashlib.sha256(f"v{COMPILER_VERSION}".encode())
+    for source in COMPILER_SOURCES:
+        digest.update(Path(source).read_bytes())
+    return digest.hexdigest()
+
+
+def _content_hash(directory, files: list) -> str:
+    """Hash of every file's path and bytes, plus the built-in tables and compiler code"""
+    digest = hashlib.sha256(_compiler_hash().encode())
+    for path in files:
+        digest.update(str(path.relative_to(directory)).encode())
+        digest.update(b'\0')
+        digest.update(path.read_bytes())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def merge_tables(files: list) -> dict:
+    """Overlay data files onto the built-in tables
+
+    Dict tables are updated entry by entry, anything else is replaced.
+    """
+    tables = {name: getattr(templates, name) for name in TABLE_NAMES}
+    tables = {name: dict(value) if isinstance(value, dict) else value for name, value in tables.items()}
+    
+    for path in files:
+        for key, value in _read_file(path).items():
+            name = key.upper()
+            if name not in tables:
+                raise ValueError(f"Unknown template table '{key}' in {path}")
+            if isinstance(tables[name], dict) and isinstance(value, dict):
+                tables[name].update(value)
+            else:
+                tables[name] = value
+    
+    return tables
+
+
+def load_pack(directory, cache_dir=None) -> TemplatePack:
+    """Load a pack directory, reusing the precompiled artifact if the content is unchanged
+
+    The cache directory holds one pack's artifacts: writing a new one removes the others.
+    """
+    directory = Path(directory)
+    files = pack_files(directory)
+    content_hash = _content_hash(directory, files)
+    
+    cache_dir = Path(cache_dir) if cache_dir else directory / '.cache'
+    cache_path = cache_dir / f"{content_hash}.pickle"
+    
+    if cache_path.exists():
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable template cache {cache_path}: {e}")
+    
+    pack = compile_tables(merge_tables(files), content_hash)
+    
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix('.tmp')
+        with open(tmp, 'wb') as f:
+            pickle.dump(pack, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(cache_path)
+        for stale in cache_dir.glob('*.pickle'):
+            if stale != cache_path:
+                stale.unlink(missing_ok=True)
+    except OSError as e:
+        print(f"Could not write template cache {cache_path}: {e}")
+    
+    return pack
+
+
+class TemplatePackLoader:
+    """Serves the current pack for a directory, reloading it when files change"""
+    
+    def __init__(self, directory, cache_dir=None, check_interval: float = 2.0):
+        self.directory = Path(directory)
+        self.cache_dir = cache_dir
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = self._scan()
+        self._checked = time.monotonic()
+        self.pack = load_pack(self.directory, self.cache_dir)
+    
+    def _scan(self) -> tuple:
+        """Cheap change signature: path, mtime and size of every data file"""
+        signature = []
+        for path in pack_files(self.directory):
+            stat = path.stat()
+            signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+    
+    def current(self) -> TemplatePack:
+        """The current pack, checking for changes at most every check_interval seconds"""
+        if time.monotonic() - self._checked < self.check_interval:
+            return self.pack
+        
+        with self._lock:
+            if time.monotonic() - self._checked >= self.check_interval:
+                self._checked = time.monotonic()
+                try:
+                    signature = self._scan()
+                    if signature != self._signature:
+                        self.pack = load_pack(self.directory, self.cache_dir)
+                        self._signature = signature
+                except Exception as e:
+                    # Keep serving the last good pack, e.g. while a file is half-written or being deleted
+                    print(f"Template reload failed: {e}, keeping previous pack")
+        
+        return self.pack
+
+
+@lru_cache(maxsize=None)
+def shared_loader(directory: str) -> TemplatePackLoader:
+    """One loader per directory, shared by every generator in the process"""
+    return TemplatePackLoader(directory)
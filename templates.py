@@ -459,6 +459,12 @@ STABILITY_DESCRIPTIONS = {
     'hope': "Everything here seems held together by nothing more than desperate hope and defiance of physics. One wrong move and it all comes down.",
 }
 
+# Stability sentences appended to atmosphere text
+STABILITY_ATMOSPHERE = {
+    'fragile': "Cracks spider across the surfaces, and dust falls with every vibration.",
+    'hope': "Everything seems to be barely holding together, as if one wrong move could bring it all down.",
+}
+
 # Mood words for descriptions
 MOOD_WORDS = {
     'dark': ['shadowy', 'gloomy', 'dim', 'murky'],
@@ -474,3 +480,237 @@ MOOD_WORDS = {
     'gritty': ['rough', 'grimy', 'seedy', 'hardscrabble'],
     'neutral': ['atmospheric', 'distinct', 'notable', 'remarkable'],
 }
+
+# Extra tags mixed into every world's mood tags
+EXTRA_MOOD_TAGS = ['atmospheric', 'immersive', 'detailed']
+
+# NPC names by type
+NPC_NAMES = {
+    'jester': ['Finnick the Foolish', 'Motley Pete', 'Jingles', 'Bells McGee', 'Chuckles'],
+    'guard': ['Ser Marcus', 'Grim Gerald', 'Stone-faced Stan', 'Watchful Wendy', 'Iron Ivan'],
+    'wizard': ['Mysticus the Grey', 'Eldwin Sparkle', 'Nox the Unknowable', 'Sage Whisperwind'],
+    'bartender': ['Old Gus', 'Molly Stoutarm', 'Gruff McGruffin', 'Barrel Betty'],
+    'merchant': ['Silvertongue Sam', 'Honest Abe', 'Shady Sadie', 'Coins McGraw'],
+    'goblin': ['Snarl', 'Grubnik', 'Pointy Pete', 'Wort', 'Skritch', 'Nob'],
+    'skeleton': ['Bones', 'Rattles', 'Sir Calcium', 'Dusty', 'Clacksworth'],
+    'robot': ['Unit-7', 'RX-42', 'Chrome', 'Servo', 'Rusty'],
+    'king': ['King Aldric', 'His Majesty Thornwell', 'King Barron III'],
+    'queen': ['Queen Seraphina', 'Her Majesty Elowen', 'Queen Margot'],
+    'potato_person': ['Spud', 'Tater', 'Russet Ron', 'Yukon Yolanda', 'Mash'],
+}
+
+# Epithets that tell same-named NPCs apart
+NPC_EPITHETS = [
+    'the Younger',
+    'the Elder',
+    'the Lesser',
+    'the Greater',
+    'the Unlucky',
+    'the Wanderer',
+    'of the North',
+    'of the South',
+    'Junior',
+    'the Second-Best',
+]
+
+# Keywords that identify the room type; matcher.py scores every hit (ties go to the earlier keyword)
+ROOM_KEYWORDS = {
+    'throne': 'throne_room',
+    'throne room': 'throne_room',
+    'castle': 'throne_room',
+    'dungeon': 'dungeon',
+    'cell': 'dungeon',
+    'prison': 'dungeon',
+    'cave': 'cave',
+    'cavern': 'cave',
+    'tavern': 'tavern',
+    'inn': 'tavern',
+    'bar': 'tavern',
+    'pub': 'tavern',
+    'library': 'library',
+    'study': 'library',
+    'laboratory': 'laboratory',
+    'lab': 'laboratory',
+    'forest': 'forest',
+    'woods': 'forest',
+    'grove': 'forest',
+    'temple': 'temple',
+    'shrine': 'temple',
+    'church': 'temple',
+    'city': 'city',
+    'street': 'city',
+    'alley': 'alley',
+    'cyberpunk': 'cyberpunk',
+    'neon': 'cyberpunk',
+    'space': 'space_station',
+    'station': 'space_station',
+    'spaceship': 'space_station',
+    'ship': 'space_station',
+    'convergence': 'convergence_zero',
+    'convergence zero': 'convergence_zero',
+    'void': 'void',
+    'abstract': 'void',
+    'chaos': 'void',
+}
+
+# Extra words for each room type, matched as whole words with slightly less weight than keywords
+ROOM_SYNONYMS = {
+    'throne_room': ['palace', 'court', 'royal hall', 'keep'],
+    'dungeon': ['jail', 'oubliette', 'cellblock', 'gaol', 'crypt'],
+    'cave': ['grotto', 'cavern system', 'underground', 'mine'],
+    'tavern': ['saloon', 'taproom', 'alehouse', 'bar room', 'brewery'],
+    'library': ['archive', 'bookstore', 'scriptorium', 'reading room'],
+    'laboratory': ['workshop', 'alchemist', 'observatory'],
+    'temple': ['cathedral', 'chapel', 'monastery', 'sanctuary'],
+    'forest': ['jungle', 'thicket', 'glade', 'clearing'],
+    'city': ['town', 'market', 'plaza', 'square', 'village'],
+    'alley': ['backstreet', 'side street', 'lane'],
+    'cyberpunk': ['hologram', 'megacity', 'hacker'],
+    'space_station': ['starship', 'orbital', 'airlock', 'starbase'],
+    'void': ['nothingness', 'limbo', 'abyss'],
+}
+
+MOOD_SYNONYMS = {
+    'dark': ['shadowy', 'murky', 'dim', 'grim'],
+    'spooky': ['ghostly', 'cursed', 'spectral'],
+    'cheerful': ['merry', 'jolly', 'joyful', 'festive'],
+    'cozy': ['snug', 'homey', 'welcoming'],
+    'peaceful': ['tranquil', 'quiet', 'restful'],
+    'mysterious': ['enigmatic', 'strange', 'arcane', 'cryptic'],
+    'ancient': ['forgotten', 'timeworn', 'primordial', 'antique'],
+    'ruined': ['crumbling', 'derelict', 'decayed'],
+    'busy': ['bustling', 'lively', 'packed'],
+    'elegant': ['luxurious', 'opulent', 'refined', 'majestic'],
+    'gritty': ['seedy', 'filthy', 'rough'],
+}
+
+# Keywords that identify the size
+SIZE_KEYWORDS = {
+    'tiny': 'tiny',
+    'small': 'small',
+    'cozy': 'small',
+    'medium': 'medium',
+    'large': 'large',
+    'huge': 'vast',
+    'vast': 'vast',
+    'massive': 'vast',
+    'sprawling': 'vast',
+    'enormous': 'vast',
+}
+
+# Keywords that identify the mood
+MOOD_KEYWORDS = {
+    'dark': 'dark',
+    'gloomy': 'dark',
+    'spooky': 'spooky',
+    'haunted': 'spooky',
+    'creepy': 'spooky',
+    'bright': 'bright',
+    'cheerful': 'cheerful',
+    'happy': 'cheerful',
+    'cozy': 'cozy',
+    'warm': 'cozy',
+    'peaceful': 'peaceful',
+    'calm': 'peaceful',
+    'serene': 'peaceful',
+    'mysterious': 'mysterious',
+    'eerie': 'mysterious',
+    'ancient': 'ancient',
+    'old': 'ancient',
+    'ruined': 'ruined',
+    'abandoned': 'ruined',
+    'busy': 'busy',
+    'crowded': 'busy',
+    'elegant': 'elegant',
+    'grand': 'elegant',
+    'dirty': 'gritty',
+    'grimy': 'gritty',
+    'gritty': 'gritty',
+}
+
+# NPC patterns to look for
+NPC_PATTERNS = [
+    (r'(\w+)?\s*jester', 'jester'),
+    (r'(\w+)?\s*guard', 'guard'),
+    (r'(\w+)?\s*wizard', 'wizard'),
+    (r'(\w+)?\s*bartender', 'bartender'),
+    (r'(\w+)?\s*merchant', 'merchant'),
+    (r'(\w+)?\s*goblin', 'goblin'),
+    (r'(\w+)?\s*skeleton', 'skeleton'),
+    (r'(\w+)?\s*robot', 'robot'),
+    (r'(\w+)?\s*king', 'king'),
+    (r'(\w+)?\s*queen', 'queen'),
+    (r'(\w+)?\s*dragon', 'dragon'),
+    (r'(\w+)?\s*cat', 'cat'),
+    (r'(\w+)?\s*dog', 'dog'),
+    (r'potato\s*person|potato\s*people', 'potato_person'),
+]
+
+# Quantity words for NPC counts
+QUANTITY_WORDS = {
+    'a': 1, 'an': 1, 'one': 1,
+    'two': 2, 'couple': 2,
+    'three': 3, 'few': 3,
+    'four': 4,
+    'five': 5, 'several': 5,
+    'six': 6,
+    'many': 4,
+    'some': 3,
+}
+
+# Keywords for explicitly mentioned props
+PROP_KEYWORDS = {
+    'barrel': 'barrel',
+    'explosive': 'explosive_barrel',
+    'crate': 'crate',
+    'chest': 'chest',
+    'table': 'table',
+    'chair': 'chair',
+    'throne': 'throne',
+    'torch': 'torch',
+    'bookshelf': 'bookshelf',
+    'bed': 'bed',
+    'cauldron': 'cauldron',
+    'computer': 'computer',
+    'terminal': 'terminal',
+}
+
+# Exits by room type
+EXIT_TEMPLATES = {
+    'throne_room': {
+        'north': 'Royal Chambers',
+        'south': 'Grand Entrance Hall',
+        'east': 'War Room',
+    },
+    'dungeon': {
+        'north': 'Deeper into the dungeon',
+        'south': 'Stairs leading up',
+        'east': 'Another cell block',
+    },
+    'tavern': {
+        'south': 'The main street',
+        'up': 'Rooms for rent',
+    },
+    'library': {
+        'north': 'Restricted Section',
+        'south': 'Main Hall',
+    },
+    'cave': {
+        'north': 'Deeper into darkness',
+        'south': 'Towards daylight',
+    },
+    'cyberpunk': {
+        'north': 'Neon District',
+        'south': 'Underground Market',
+        'up': 'Rooftops',
+    },
+    'convergence_zero': {
+        'north': 'Command Center',
+        'south': 'Docking Bay',
+        'down': 'Maintenance Tunnels',
+    },
+    'generic': {
+        'north': 'Unknown passage',
+        'south': 'The way back',
+    },
+}
@@ -0,0 +1,187 @@
+"""
+LLM Transport - Pluggable live / record / replay backends for WorldGenerator's LLM path
+Recordings are JSON files keyed by a hash of the request, so benchmarks and load tests run offline
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from world_generator import WorldGenerator, estimate_tokens
+
+MODES = ('live', 'record', 'replay')
+
+BATCH_MARKER = "one per description"
+SINGLE_PREFIX = "Create a world based on: "
+
+
+class ReplayMiss(KeyError):
+    """No recording exists for a request"""
+
+
+class InjectedError(RuntimeError):
+    """A synthetic failure raised by ReplayTransport's error injection"""
+
+
+def request_key(request: dict) -> str:
+    """Stable hash of the fields that determine a response"""
+    fields = {name: request.get(name) for name in ('model', 'system', 'messages', 'max_tokens')}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+
+def synthesize_response(request: dict) -> str:
+    """Template-generated stand-in for a Claude response, in the shape the prompt asked for"""
+    content = request['messages'][-1]['content']
+    generator = WorldGenerator()
+    
+    if BATCH_MARKER in content:
+        numbered = content.split("\n\n", 1)[-1].splitlines()
+        items = []
+        for line in numbered:
+            number, _, prompt = line.partition('. ')
+            if number.isdigit():
+                world = generator.generate(prompt, remember=False)
+                world['index'] = int(number)
+                items.append(world)
+        return json.dumps(items)
+    
+    prompt = content[len(SINGLE_PREFIX):] if content.startswith(SINGLE_PREFIX) else content
+    return json.dumps(generator.generate(prompt, remember=False))
+
+
+def estimate_usage(request: dict, text: str) -> dict:
+    """Approximate token usage block for a request and its response"""
+    prompt = (request.get('system') or '') + ''.join(str(m.get('content', '')) for m in request.get('messages', []))
+    return {'input_tokens': estimate_tokens(prompt), 'output_tokens': estimate_tokens(text)}
+
+
+class LiveTransport:
+    """Calls the Messages API through the anthropic SDK (honours ANTHROPIC_BASE_URL)"""
+    
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        self.api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
+        self.base_url = base_url
+        self._client = None
+        self._lock = threading.Lock()
+    
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                import anthropic
+                
+                self._client = anthropic.Anthropic(api_key=self.api_key, base_url=self.base_url)
+            return self._client
+    
+    def send(self, request: dict) -> str:
+        """Response text for a request"""
+        message = self._get_client().messages.create(**request)
+        return message.content[0].text
+
+
+class RecordTransport:
+    """Passes requests to another transport and saves every request/response pair"""
+    
+    def __init__(self, directory: str, inner=None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.inner = inner or LiveTransport()
+        self.recorded = 0
+    
+    def send(self, request: dict) -> str:
+        text = self.inner.send(request)
+        record = {'request': request, 'response': text, 'recorded_at': time.time()}
+        path = self.directory / f"{request_key(request)}.json"
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(record, indent=2))
+        tmp.replace(path)
+        self.recorded += 1
+        return text
+
+
+class ReplayTransport:
+    """Serves recorded responses with synthetic latency and error injection
+
+    Latency is `latency` seconds plus uniform jitter of +/- `jitter`. With
+    synthesize_misses, requests that were never recorded get a template-built
+    response instead of raising ReplayMiss, so arbitrary prompt mixes can be replayed.
+    """
+    
+    def __init__(self, directory: Optional[str] = None, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, synthesize_misses: bool = False, seed: Optional[int] = None):
+        self.directory = Path(directory) if directory else None
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.synthesize_misses = synthesize_misses
+        self.calls = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._recordings = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def _lookup(self, key: str) -> Optional[str]:
+        if key in self._recordings:
+            return self._recordings[key]
+        path = self.directory / f"{key}.json" if self.directory else None
+        if path is None or not path.exists():
+            return None
+        text = json.loads(path.read_text())['response']
+        self._recordings[key] = text
+        return text
+    
+    def send(self, request: dict) -> str:
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            fail = self._rng.random() < self.error_rate
+        
+        time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.errors += 1
+            raise InjectedError("Injected overloaded_error from replay transport")
+        
+        key = request_key(request)
+        text = self._lookup(key)
+        with self._lock:
+            if text is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if text is not None:
+            return text
+        if self.synthesize_misses:
+            return synthesize_response(request)
+        raise ReplayMiss(f"No recording for request {key[:12]}")
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {'calls': self.calls, 'hits': self.hits, 'misses': self.misses, 'errors': self.errors}
+
+
+def make_transport(spec: str, api_key: Optional[str] = None):
+    """Build a transport from a spec like 'live', 'record:DIR' or 'replay:DIR?latency=0.8&error_rate=0.05'"""
+    mode, _, rest = spec.partition(':')
+    directory, _, query = rest.partition('?')
+    options = dict(part.split('=', 1) for part in query.split('&') if part)
+    
+    if mode == 'live':
+        return LiveTransport(api_key, options.get('base_url'))
+    if mode == 'record':
+        return RecordTransport(directory or 'recordings', LiveTransport(api_key, options.get('base_url')))
+    if mode == 'replay':
+        return ReplayTransport(
+            directory or None,
+            latency=float(options.get('latency', 0.0)),
+            jitter=float(options.get('jitter', 0.0)),
+            error_rate=float(options.get('error_rate', 0.0)),
+            synthesize_misses=options.get('synthesize', '0') in ('1', 'true', 'yes'),
+            seed=int(options['seed']) if 'seed' in options else None,
+        )
+    raise ValueError(f"Unknown transport mode '{mode}', expected one of {MODES}")
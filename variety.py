@@ -0,0 +1,137 @@
+"""
+Variety Engine - Draws template choices for a whole batch of worlds at once
+Index arrays are sampled with NumPy so large batches stay fast and avoid repeats
+"""
+
+from functools import lru_cache
+from typing import Optional
+import numpy as np
+from template_packs import TemplatePack, default_pack
+
+# random: independent draws, like random.choice
+# without_replacement: every world in a group gets a distinct entry (errors if the table is too small)
+# low_repeat: shuffled passes over the table, so nothing repeats until every entry has been used
+MODES = ('random', 'without_replacement', 'low_repeat')
+
+
+@lru_cache(maxsize=1024)
+def _name_table(templates: TemplatePack, room_type: str, mood: str) -> np.ndarray:
+    """Every prefix/core/suffix combination for a room type and mood"""
+    prefixes = templates.NAME_PARTS.get('prefixes', {}).get(mood, ['The'])
+    cores = templates.NAME_PARTS.get('cores', {}).get(room_type, ['Chamber'])
+    suffixes = list(dict.fromkeys(templates.NAME_PARTS.get('suffixes', [''])))
+    
+    names = [
+        f"{prefix} {core} {suffix}" if suffix else f"{prefix} {core}"
+        for prefix in prefixes for core in cores for suffix in suffixes
+    ]
+    return np.array(names, dtype=object)
+
+
+@lru_cache(maxsize=1024)
+def _atmosphere_table(templates: TemplatePack, room_type: str, mood: str, stability: str) -> np.ndarray:
+    """Every base/mood phrase combination for a room type, mood and stability"""
+    atmosphere = templates.ATMOSPHERE_PHRASES
+    endings = templates.STABILITY_ATMOSPHERE
+    phrases = atmosphere.get(room_type, atmosphere['generic'])
+    mood_phrases = atmosphere.get(f"mood_{mood}", [])
+    ending = f" {endings[stability]}" if stability in endings else ''
+    
+    if mood_phrases:
+        texts = [f"{base} {extra}{ending}" for base in phrases for extra in mood_phrases]
+    else:
+        texts = [f"{base}{ending}" for base in phrases]
+    return np.array(texts, dtype=object)
+
+
+def _group(*columns) -> tuple:
+    """Group row positions by their combined column values
+
+    Returns the unique keys and, per key, the positions of the rows that carry it.
+    """
+    codes = []
+    uniques = []
+    for column in columns:
+        values, inverse = np.unique(np.asarray(column, dtype=object).astype(str), return_inverse=True)
+        uniques.append(values)
+        codes.append(inverse)
+    
+    combined = np.ravel_multi_index(codes, [len(u) for u in uniques]) if len(codes) > 1 else codes[0]
+    keys, inverse = np.unique(combined, return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.cumsum(np.bincount(inverse))[:-1]
+    
+    group_keys = []
+    for key in keys:
+        parts = np.unravel_index(key, [len(u) for u in uniques]) if len(codes) > 1 else (key,)
+        group_keys.append(tuple(str(u[p]) for u, p in zip(uniques, parts)))
+    return group_keys, np.split(order, bounds)
+
+
+class VarietyEngine:
+    """Vectorized template selection for large batches of worlds"""
+    
+    def __init__(self, mode: str = 'low_repeat', seed=None, templates: Optional[TemplatePack] = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown variety mode '{mode}', expected one of {MODES}")
+        self.mode = mode
+        self.rng = np.random.default_rng(seed)
+        self.templates = templates or default_pack()
+    
+    def draw(self, table_size: int, n: int) -> np.ndarray:
+        """Draw n indices into a table of the given size according to the mode"""
+        if self.mode == 'random':
+            return self.rng.integers(0, table_size, n)
+        
+        if self.mode == 'without_replacement':
+            if n > table_size:
+                raise ValueError(f"Cannot draw {n} distinct entries from a table of {table_size}")
+            return self.rng.choice(table_size, n, replace=False)
+        
+        return self._low_repeat(table_size, n)
+    
+    def _low_repeat(self, table_size: int, n: int) -> np.ndarray:
+        """Concatenate independent permutations of the table"""
+        passes = -(-n // table_size)
+        tiled = np.broadcast_to(np.arange(table_size), (passes, table_size))
+        return self.rng.permuted(tiled, axis=1).ravel()[:n]
+    
+    def _draw_from_tables(self, table_for_key, *columns) -> list:
+        """Fill one output slot per row from the table belonging to that row's key"""
+        n = len(columns[0])
+        out = np.empty(n, dtype=object)
+        if n == 0:
+            return []
+        
+        keys, positions = _group(*columns)
+        for key, rows in zip(keys, positions):
+            table = table_for_key(self.templates, *key)
+            out[rows] = table[self.draw(len(table), len(rows))]
+        return out.tolist()
+    
+    def draw_names(self, room_types: list, moods: list) -> list:
+        """Draw a location name for every world"""
+        return self._draw_from_tables(_name_table, room_types, moods)
+    
+    def draw_atmospheres(self, room_types: list, moods: list, stabilities: list) -> list:
+        """Draw an atmosphere paragraph for every world"""
+        return self._draw_from_tables(_atmosphere_table, room_types, moods, stabilities)
+    
+    def draw_mood_tags(self, moods: list, room_types: list) -> list:
+        """Build mood tags for every world, drawing the extra tag in one pass"""
+        extra_tags = self.templates.EXTRA_MOOD_TAGS
+        
+        # The extra tag table is tiny, so it always repeats outside random mode
+        if self.mode == 'random':
+            picks = self.draw(len(extra_tags), len(moods))
+        else:
+            picks = self._low_repeat(len(extra_tags), len(moods))
+        extras = np.array(extra_tags, dtype=object)[picks]
+        
+        tags = []
+        for mood, room_type, extra in zip(moods, room_types, extras):
+            row = [mood] if mood != 'neutral' else []
+            row.append(room_type.replace('_', ' '))
+            row.append(extra)
+            tags.append(row[:4])
+        return tags
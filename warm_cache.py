@@ -0,0 +1,143 @@
+"""
+Warm Cache - Pre-generated worlds for popular prompts
+Seeded variants are generated at startup and refreshed in the background, so example clicks return instantly
+"""
+
+import copy
+import threading
+import time
+import zlib
+from typing import Optional
+from world_generator import WorldGenerator
+
+
+def prompt_key(prompt: str) -> str:
+    """Case- and whitespace-insensitive cache key"""
+    return ' '.join(prompt.lower().split())
+
+
+def load_prompts(path: str) -> list:
+    """Read popular prompts from a text file, one per line ('#' starts a comment)"""
+    with open(path, encoding='utf-8') as f:
+        lines = [line.split('#', 1)[0].strip() for line in f]
+    return [line for line in lines if line]
+
+
+class WarmCache:
+    """Holds several seeded variants per popular prompt and hands them out round-robin
+
+    Refreshes build a complete new set of variants before swapping it in, so
+    readers never see a half-filled entry. Each refresh uses new seeds, which keeps
+    repeat visitors from seeing the same world forever.
+    """
+    
+    def __init__(self, generator: WorldGenerator, prompts: list = (), variants: int = 3,
+                 refresh_interval: Optional[float] = 3600.0):
+        self.generator = generator
+        self.prompts = list(dict.fromkeys(prompts))
+        self.variants = variants
+        self.refresh_interval = refresh_interval
+        self.entries = {}
+        self.rounds = 0
+        self.hits = 0
+        self.misses = 0
+        self.last_refresh = None
+        self._cursor = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def __len__(self):
+        return sum(len(worlds) for worlds in self.entries.values())
+    
+    def _seed(self, key: str, variant: int) -> int:
+        return zlib.crc32(f"{key}:{self.rounds}:{variant}".encode())
+    
+    def refresh(self):
+        """Generate a fresh set of variants for every prompt"""
+        for prompt in self.prompts:
+            if self._stop.is_set():
+                return
+            key = prompt_key(prompt)
+            worlds = []
+            for variant in range(self.variants):
+                try:
+                    worlds.append(self.generator.generate(prompt, seed=self._seed(key, variant)))
+                except Exception as e:
+                    print(f"Warm cache generation failed for '{prompt}': {e}")
+            if worlds:
+                with self._lock:
+                    self.entries[key] = worlds
+        
+        with self._lock:
+            self.rounds += 1
+            self.last_refresh = time.time()
+    
+    def matches(self, generator: WorldGenerator) -> bool:
+        """Whether worlds built by this cache fit another generator's settings"""
+        ours = self.generator
+        return (bool(ours.api_key) == bool(generator.api_key)
+                and ours.include_npcs == generator.include_npcs
+                and ours.include_props == generator.include_props
+                and ours.include_exits == generator.include_exits
+                and ours.template_dir == generator.template_dir)
+    
+    def get(self, prompt: str, generator: Optional[WorldGenerator] = None) -> Optional[dict]:
+        """Next cached variant for a prompt (a copy), or None on a miss
+
+        Hits are remembered by `generator` (similarity index, world store) like generated worlds.
+        """
+        if generator is not None and not self.matches(generator):
+            return None
+        
+        key = prompt_key(prompt)
+        with self._lock:
+            worlds = self.entries.get(key)
+            if not worlds:
+                self.misses += 1
+                return None
+            cursor = self._cursor.get(key, 0)
+            self._cursor[key] = cursor + 1
+            self.hits += 1
+            world = worlds[cursor % len(worlds)]
+        
+        world = copy.deepcopy(world)
+        world['original_prompt'] = prompt
+        if generator is not None:
+            generator._remember(world)
+        return world
+    
+    def start(self):
+        """Warm up in the background, then keep refreshing on schedule"""
+        if self._thread is not None:
+            return
+        
+        def run():
+            while not self._stop.is_set():
+                self.refresh()
+                if not self.refresh_interval or self._stop.wait(self.refresh_interval):
+                    return
+        
+        self._thread = threading.Thread(target=run, name="warm-cache", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the refresh thread after its current generation"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def stats(self) -> dict:
+        """Entry counts and hit rate"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'prompts': len(self.entries),
+                'worlds': sum(len(worlds) for worlds in self.entries.values()),
+                'rounds': self.rounds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'last_refresh': self.last_refresh,
+            }
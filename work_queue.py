@@ -0,0 +1,301 @@
+"""
+Work Queue - Durable generation jobs shared by any number of worker processes or machines
+Tasks are leased, acknowledged, retried with backoff and deduplicated on (prompt, seed); results go to the world store
+"""
+
+import argparse
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+from scheduler import TokenBucket
+from world_generator import WorldGenerator
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    prompt TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    error TEXT,
+    created_at REAL,
+    finished_at REAL,
+    UNIQUE (prompt, seed)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_ready ON tasks(status, available_at);
+"""
+
+STATUSES = ('queued', 'leased', 'done', 'dead')
+
+
+def default_seed(prompt: str, variant: int = 0) -> int:
+    """Stable seed for a prompt variant, so re-enqueueing the same content pack dedupes"""
+    return zlib.crc32(f"{prompt}:{variant}".encode())
+
+
+@dataclass
+class Task:
+    """One leased unit of work"""
+    
+    id: int
+    prompt: str
+    seed: int
+    attempts: int
+
+
+class SQLiteWorkQueue:
+    """Work queue in one SQLite file (WAL mode), safe for many processes on one machine
+
+    Other backends only need the same methods: enqueue, claim, ack, nack, stats.
+    A claim leases tasks for `lease` seconds; tasks whose worker dies are claimed
+    again once the lease runs out, unless that was their last attempt. Acks and
+    nacks only count from the worker that still holds the lease, so a slow
+    worker cannot overwrite a newer attempt.
+    """
+    
+    def __init__(self, path: str = 'queue.db', lease: float = 300.0, max_attempts: int = 5,
+                 backoff: float = 5.0):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+    
+    def close(self):
+        self.conn.close()
+    
+    def enqueue(self, prompts: list, seeds: Optional[list] = None) -> int:
+        """Add (prompt, seed) tasks, skipping pairs already queued or done; returns how many were new"""
+        now = time.time()
+        seeds = seeds or [default_seed(prompt) for prompt in prompts]
+        rows = [(prompt, seed, now, now) for prompt, seed in zip(prompts, seeds)]
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO tasks (prompt, seed, available_at, created_at) VALUES (?, ?, ?, ?)", rows
+            )
+            return self.conn.total_changes - before
+    
+    def claim(self, worker: str, limit: int = 1) -> list:
+        """Lease up to `limit` ready tasks (queued, or leased by a worker whose lease expired)"""
+        now = time.time()
+        # A lease that expired on the last attempt (the worker died mid-task every time) is final
+        self.conn.execute(
+            "UPDATE tasks SET status = 'dead', lease_owner = NULL, finished_at = ?, "
+            "error = 'lease expired on the last attempt' "
+            "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, now, self.max_attempts),
+        )
+        rows = self.conn.execute(
+            """
+            UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1
+            WHERE id IN (
+                SELECT id FROM tasks
+                WHERE (status = 'queued' AND available_at <= ?) OR (status = 'leased' AND lease_expires < ?)
+                ORDER BY id LIMIT ?
+            )
+            RETURNING id, prompt, seed, attempts
+            """,
+            (worker, now + self.lease, now, now, limit),
+        ).fetchall()
+        return [Task(*row) for row in sorted(rows)]
+    
+    def ack(self, worker: str, task_ids: list) -> int:
+        """Mark leased tasks done, returning how many this worker still held"""
+        with self.conn:
+            cursor = self.conn.executemany(
+                "UPDATE tasks SET status = 'done', finished_at = ?, error = NULL "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                [(time.time(), task_id, worker) for task_id in task_ids],
+            )
+            return cursor.rowcount
+    
+    def nack(self, worker: str, task: Task, error: str):
+        """Give a task back after a failure: retry with exponential backoff, or mark it dead"""
+        if task.attempts >= self.max_attempts:
+            status, available_at = 'dead', time.time()
+        else:
+            status, available_at = 'queued', time.time() + self.backoff * 2 ** (task.attempts - 1)
+        with self.conn:
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, available_at = ?, error = ?, lease_owner = NULL "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (status, available_at, error[:1000], task.id, worker),
+            )
+    
+    def retry_dead(self) -> int:
+        """Put every dead task back in the queue with a fresh attempt count"""
+        with self.conn:
+            return self.conn.execute(
+                "UPDATE tasks SET status = 'queued', attempts = 0, available_at = ? WHERE status = 'dead'",
+                (time.time(),),
+            ).rowcount
+    
+    def stats(self) -> dict:
+        """Task counts by status"""
+        counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in STATUSES}
+
+
+def make_queue(spec: str, **kwargs):
+    """Build a queue from a spec like 'queue.db' or 'sqlite:queue.db'"""
+    kind, _, target = spec.partition(':')
+    if not target:
+        kind, target = 'sqlite', spec
+    if kind == 'sqlite':
+        return SQLiteWorkQueue(target, **kwargs)
+    raise ValueError(f"Unknown queue backend '{kind}'")
+
+
+class Worker:
+    """Pulls tasks, generates worlds and writes them to the world store
+
+    On the LLM path a template fallback counts as a failure and is retried, until
+    the last attempt, when the template world is kept. rate_limit caps this
+    worker's LLM requests per second; give each worker its share of the account limit.
+    """
+    
+    def __init__(self, queue, generator: WorldGenerator, store, batch_size: int = 8,
+                 rate_limit: Optional[float] = None, name: Optional[str] = None):
+        self.queue = queue
+        self.generator = generator
+        self.store = store
+        self.batch_size = batch_size
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.bucket = TokenBucket(rate_limit, max(1.0, rate_limit)) if rate_limit else None
+        self.completed = 0
+        self.failed = 0
+    
+    def _generate(self, task: Task) -> dict:
+        if self.bucket is not None and self.generator.api_key:
+            while not self.bucket.try_acquire():
+                time.sleep(self.bucket.retry_after())
+        world = self.generator.generate(task.prompt, seed=task.seed, remember=False)
+        if self.generator.api_key and world.get('source') != 'llm' and task.attempts < self.queue.max_attempts:
+            raise RuntimeError("LLM generation fell back to templates")
+        return world
+    
+    def run_once(self) -> int:
+        """Process one claimed batch, returning how many tasks were claimed"""
+        tasks = self.queue.claim(self.name, self.batch_size)
+        worlds, done = [], []
+        for task in tasks:
+            try:
+                world = self._generate(task)
+            except Exception as e:
+                self.queue.nack(self.name, task, f"{type(e).__name__}: {e}")
+                self.failed += 1
+                continue
+            world['task'] = {'id': task.id, 'seed': task.seed, 'worker': self.name}
+            worlds.append(world)
+            done.append(task.id)
+        
+        # Write before acking: a crash in between re-runs the task rather than losing it
+        if worlds:
+            self.store.add_many(worlds)
+            self.queue.ack(self.name, done)
+            self.completed += len(done)
+        return len(tasks)
+    
+    def run(self, idle_exit: Optional[float] = 5.0, poll_interval: float = 0.5):
+        """Work until the queue has been empty for idle_exit seconds (None: forever)"""
+        idle_since = None
+        while True:
+            if self.run_once():
+                idle_since = None
+                continue
+            idle_since = idle_since or time.monotonic()
+            if idle_exit is not None and time.monotonic() - idle_since >= idle_exit:
+                return
+            time.sleep(poll_interval)
+
+
+def _worker_process(queue_spec: str, db_path: str, batch_size: int, rate_limit: Optional[float],
+                    idle_exit: Optional[float], templates: bool, transport_spec: Optional[str]):
+    """Entry point for one worker process"""
+    from world_store import WorldStore
+    
+    api_key = None if templates else os.environ.get("ANTHROPIC_API_KEY")
+    transport = None
+    if transport_spec and not templates:
+        from transport import make_transport
+        
+        transport = make_transport(transport_spec, api_key)
+        if transport_spec.startswith('replay'):
+            api_key = api_key or 'replay'
+    generator = WorldGenerator(api_key=api_key, transport=transport)
+    queue = make_queue(queue_spec)
+    with WorldStore(db_path) as store:
+        worker = Worker(queue, generator, store, batch_size, rate_limit)
+        worker.run(idle_exit)
+    print(f"{worker.name}: {worker.completed} done, {worker.failed} failed")
+    queue.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Durable generation queue and workers")
+    parser.add_argument('--queue', default='queue.db', help="Queue spec, e.g. queue.db or sqlite:/shared/queue.db")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    enqueue = commands.add_parser('enqueue', help="Add prompts from a file (one per line)")
+    enqueue.add_argument('prompts')
+    enqueue.add_argument('--variants', type=int, default=1, help="Seeded variants per prompt")
+    
+    work = commands.add_parser('work', help="Run workers until the queue drains")
+    work.add_argument('--db', default=os.environ.get("WORLD_FORGE_DB", 'worlds.db'), help="World store to write to")
+    work.add_argument('--processes', type=int, default=1)
+    work.add_argument('--batch-size', type=int, default=8, help="Tasks claimed per lease")
+    work.add_argument('--rate-limit', type=float, help="LLM requests per second for all processes together")
+    work.add_argument('--idle-exit', type=float, default=5.0, help="Seconds of empty queue before exiting")
+    work.add_argument('--forever', action='store_true', help="Keep polling instead of exiting when idle")
+    work.add_argument('--templates', action='store_true', help="Use template generation even if ANTHROPIC_API_KEY is set")
+    work.add_argument('--transport', help="LLM transport spec (see transport.py)")
+    
+    commands.add_parser('status', help="Show task counts")
+    commands.add_parser('retry-dead', help="Requeue tasks that ran out of attempts")
+    args = parser.parse_args()
+    
+    if args.command == 'enqueue':
+        with open(args.prompts) as f:
+            prompts = [line.strip() for line in f if line.strip()]
+        pairs = [(prompt, default_seed(prompt, variant)) for prompt in prompts for variant in range(args.variants)]
+        queue = make_queue(args.queue)
+        added = queue.enqueue([p for p, _ in pairs], [s for _, s in pairs])
+        print(f"Queued {added} new tasks ({len(pairs) - added} already known)")
+    elif args.command == 'work':
+        rate = args.rate_limit / args.processes if args.rate_limit else None
+        worker_args = (args.queue, args.db, args.batch_size, rate, None if args.forever else args.idle_exit,
+                       args.templates, args.transport)
+        start = time.monotonic()
+        if args.processes == 1:
+            _worker_process(*worker_args)
+        else:
+            processes = [multiprocessing.Process(target=_worker_process, args=worker_args)
+                         for _ in range(args.processes)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+        print(f"Finished in {time.monotonic() - start:.1f}s")
+        queue = make_queue(args.queue)
+    elif args.command == 'retry-dead':
+        queue = make_queue(args.queue)
+        print(f"Requeued {queue.retry_dead()} tasks")
+    else:
+        queue = make_queue(args.queue)
+    print(queue.stats())
+
+
+if __name__ == '__main__':
+    main()
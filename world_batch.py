@@ -0,0 +1,475 @@
+"""
+World Batch - Columnar storage for large collections of worlds
+Struct-of-arrays with dictionary-encoded text and offset-encoded lists; worlds decode lazily on access
+"""
+
+import argparse
+import json
+import sys
+import time
+from array import array
+from typing import Iterable, Optional
+import numpy as np
+
+ABSENT = -1
+
+# Dictionary-encoded scalar text fields, in the order template worlds list them
+TEXT_FIELDS = ('description', 'atmosphere', 'size', 'stability', 'lighting', 'source', 'original_prompt')
+NPC_TEXT_FIELDS = ('type', 'description', 'behavior')
+PROP_FIELDS = ('name', 'type', 'description')
+
+COLUMNAR_KEYS = set(TEXT_FIELDS) | {'name', 'mood_tags', 'npcs', 'props', 'exits', 'parse', 'seed'}
+
+
+class Dictionary:
+    """Distinct values of one column; rows store int32 codes into it"""
+    
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+    
+    def __len__(self):
+        return len(self.values)
+    
+    def encode(self, value) -> int:
+        if value is None:
+            return ABSENT
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+    
+    def decode(self, code: int):
+        return None if code == ABSENT else self.values[code]
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(len(value.encode()) for value in self.values)
+
+
+class StringColumn:
+    """High-cardinality strings (names) as one UTF-8 buffer plus offsets, like an Arrow string array"""
+    
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('i', [0])
+    
+    def append(self, value: str):
+        self.data += value.encode()
+        self.offsets.append(len(self.data))
+    
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].decode()
+    
+    @property
+    def nbytes(self) -> int:
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+
+class ListColumn:
+    """Variable-length lists of dictionary codes: offsets into one flat codes array"""
+    
+    def __init__(self):
+        self.offsets = array('i', [0])
+        self.codes = array('i')
+    
+    def append(self, codes: list):
+        self.codes.extend(codes)
+        self.offsets.append(len(self.codes))
+    
+    def __getitem__(self, i: int):
+        return self.codes[self.offsets[i]:self.offsets[i + 1]]
+    
+    @property
+    def nbytes(self) -> int:
+        return self.offsets.itemsize * len(self.offsets) + self.codes.itemsize * len(self.codes)
+
+
+def _is_text(value) -> bool:
+    return value is None or isinstance(value, str)
+
+
+def _is_list(value) -> bool:
+    return isinstance(value, (list, tuple))
+
+
+def fits_schema(world: dict) -> bool:
+    """Whether a world can be stored column by column (otherwise it is kept as raw JSON)"""
+    if not isinstance(world.get('name'), str):
+        return False
+    if not all(_is_text(world.get(field)) for field in TEXT_FIELDS):
+        return False
+    seed = world.get('seed')
+    if seed is not None and not (isinstance(seed, int) and not isinstance(seed, bool) and 0 <= seed < 2 ** 63):
+        return False
+    mood_tags, npcs, props, exits = (world.get(key, default) for key, default in
+                                     (('mood_tags', []), ('npcs', []), ('props', []), ('exits', {})))
+    if not (_is_list(mood_tags) and _is_list(npcs) and _is_list(props) and isinstance(exits, dict)):
+        return False
+    if not all(isinstance(tag, str) for tag in mood_tags):
+        return False
+    for npc in npcs:
+        if not isinstance(npc, dict) or not isinstance(npc.get('name'), str):
+            return False
+        if set(npc) - {'name', 'dialogue', *NPC_TEXT_FIELDS}:
+            return False
+        if not all(_is_text(npc.get(field)) for field in NPC_TEXT_FIELDS):
+            return False
+        dialogue = npc.get('dialogue', [])
+        if not _is_list(dialogue) or not all(isinstance(line, str) for line in dialogue):
+            return False
+    for prop in props:
+        if not isinstance(prop, dict) or set(prop) - set(PROP_FIELDS):
+            return False
+        if not all(_is_text(prop.get(field)) for field in PROP_FIELDS):
+            return False
+    if not all(isinstance(k, str) and isinstance(v, str) for k, v in exits.items()):
+        return False
+    return world.get('parse') is None or isinstance(world['parse'], dict)
+
+
+class WorldBatch:
+    """Columnar collection of worlds
+
+    Repeated text (template descriptions, dialogue, prop names...) is stored once per
+    column dictionary, and lists (mood tags, NPCs, props, exits) are offset arrays over
+    flat child columns. Indexing or iterating decodes plain world dicts on demand.
+    Worlds that do not fit the schema (e.g. unusual LLM output) are kept as raw JSON.
+    Decoded worlds equal the originals after a JSON round trip (tuples come back as lists).
+    """
+    
+    def __init__(self):
+        self.length = 0
+        self.dictionaries = {}
+        self.codes = {}
+        self.names = StringColumn()
+        self.seeds = array('q')
+        self.mood_tags = ListColumn()
+        self.npc_offsets = array('i', [0])
+        self.npc_names = StringColumn()
+        self.npc_codes = {field: array('i') for field in NPC_TEXT_FIELDS}
+        self.npc_has_dialogue = array('b')
+        self.npc_dialogue = ListColumn()
+        self.prop_offsets = array('i', [0])
+        self.prop_codes = {field: array('i') for field in PROP_FIELDS}
+        self.exit_offsets = array('i', [0])
+        self.exit_directions = array('i')
+        self.exit_destinations = array('i')
+        self.present = array('b')
+        
+        for field in TEXT_FIELDS + ('room_type', 'mood', 'parse', 'extras', 'raw'):
+            self._column(field)
+    
+    def _column(self, name: str) -> array:
+        if name not in self.codes:
+            self.codes[name] = array('i')
+            self.dictionaries[name] = Dictionary()
+        return self.codes[name]
+    
+    def _dictionary(self, name: str) -> Dictionary:
+        if name not in self.dictionaries:
+            self.dictionaries[name] = Dictionary()
+        return self.dictionaries[name]
+    
+    def __len__(self):
+        return self.length
+    
+    # Building
+    
+    @classmethod
+    def from_worlds(cls, worlds: Iterable[dict]) -> 'WorldBatch':
+        """Encode any iterable of worlds (a generator works; worlds are not kept)"""
+        batch = cls()
+        for world in worlds:
+            batch.append(world)
+        return batch
+    
+    def _encode(self, column: str, value) -> None:
+        self.codes[column].append(self.dictionaries[column].encode(value))
+    
+    def append(self, world: dict):
+        """Add one world"""
+        if not fits_schema(world):
+            self._append_empty()
+            self.codes['raw'][-1] = self.dictionaries['raw'].encode(json.dumps(world, default=str))
+            self.length += 1
+            return
+        
+        self.codes['raw'].append(ABSENT)
+        self.names.append(world['name'])
+        for field in TEXT_FIELDS:
+            self._encode(field, world.get(field))
+        self.seeds.append(world['seed'] if world.get('seed') is not None else ABSENT)
+        
+        # Bit 0: mood_tags, 1: npcs, 2: props, 3: exits (absent lists stay absent on decode)
+        self.present.append(sum(1 << i for i, key in enumerate(('mood_tags', 'npcs', 'props', 'exits')) if key in world))
+        
+        tags = self._dictionary('mood_tags')
+        self.mood_tags.append([tags.encode(tag) for tag in world.get('mood_tags', [])])
+        
+        dialogue = self._dictionary('dialogue')
+        for npc in world.get('npcs', []):
+            self.npc_names.append(npc['name'])
+            for field in NPC_TEXT_FIELDS:
+                self.npc_codes[field].append(self._dictionary(f"npc_{field}").encode(npc.get(field)))
+            self.npc_has_dialogue.append('dialogue' in npc)
+            self.npc_dialogue.append([dialogue.encode(line) for line in npc.get('dialogue', [])])
+        self.npc_offsets.append(len(self.npc_names.offsets) - 1)
+        
+        for prop in world.get('props', []):
+            for field in PROP_FIELDS:
+                self.prop_codes[field].append(self._dictionary(f"prop_{field}").encode(prop.get(field)))
+        self.prop_offsets.append(len(self.prop_codes['name']))
+        
+        directions = self._dictionary('exit_direction')
+        destinations = self._dictionary('exit_destination')
+        for direction, destination in world.get('exits', {}).items():
+            self.exit_directions.append(directions.encode(direction))
+            self.exit_destinations.append(destinations.encode(destination))
+        self.exit_offsets.append(len(self.exit_directions))
+        
+        # A parse depends only on the prompt, so the whole thing is one dictionary entry
+        parse = world.get('parse')
+        self._encode('parse', json.dumps(parse) if parse is not None else None)
+        
+        # Queryable room type / mood, from the parse or the world itself
+        self._encode('room_type', (parse or world).get('room_type'))
+        self._encode('mood', (parse or world).get('mood'))
+        
+        extras = {key: value for key, value in world.items() if key not in COLUMNAR_KEYS}
+        self._encode('extras', json.dumps(extras, default=str) if extras else None)
+        self.length += 1
+    
+    def _append_empty(self):
+        """Placeholder row for a raw-JSON world"""
+        self.names.append('')
+        for field in TEXT_FIELDS + ('room_type', 'mood', 'parse', 'extras'):
+            self.codes[field].append(ABSENT)
+        self.codes['raw'].append(ABSENT)
+        self.seeds.append(ABSENT)
+        self.present.append(0)
+        self.mood_tags.append([])
+        self.npc_offsets.append(self.npc_offsets[-1])
+        self.prop_offsets.append(self.prop_offsets[-1])
+        self.exit_offsets.append(self.exit_offsets[-1])
+    
+    # Decoding
+    
+    def __getitem__(self, i: int) -> dict:
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError(i)
+        
+        raw = self.dictionaries['raw'].decode(self.codes['raw'][i])
+        if raw is not None:
+            return json.loads(raw)
+        
+        present = self.present[i]
+        world = {'name': self.names[i]}
+        for field in TEXT_FIELDS[:5]:
+            value = self.dictionaries[field].decode(self.codes[field][i])
+            if value is not None:
+                world[field] = value
+        
+        if present & 1:
+            tags = self.dictionaries['mood_tags']
+            world['mood_tags'] = [tags.values[code] for code in self.mood_tags[i]]
+        
+        if present & 2:
+            world['npcs'] = []
+            dialogue = self.dictionaries.get('dialogue')
+            for n in range(self.npc_offsets[i], self.npc_offsets[i + 1]):
+                npc = {'name': self.npc_names[n]}
+                for field in NPC_TEXT_FIELDS:
+                    value = self.dictionaries[f"npc_{field}"].decode(self.npc_codes[field][n])
+                    if value is not None:
+                        npc[field] = value
+                if self.npc_has_dialogue[n]:
+                    npc['dialogue'] = [dialogue.values[code] for code in self.npc_dialogue[n]]
+                world['npcs'].append(npc)
+        
+        if present & 4:
+            world['props'] = []
+            for p in range(self.prop_offsets[i], self.prop_offsets[i + 1]):
+                prop = {}
+                for field in PROP_FIELDS:
+                    value = self.dictionaries[f"prop_{field}"].decode(self.prop_codes[field][p])
+                    if value is not None:
+                        prop[field] = value
+                world['props'].append(prop)
+        
+        if present & 8:
+            directions = self.dictionaries['exit_direction']
+            destinations = self.dictionaries['exit_destination']
+            world['exits'] = {
+                directions.values[self.exit_directions[e]]: destinations.values[self.exit_destinations[e]]
+                for e in range(self.exit_offsets[i], self.exit_offsets[i + 1])
+            }
+        
+        for field in TEXT_FIELDS[5:]:
+            value = self.dictionaries[field].decode(self.codes[field][i])
+            if value is not None:
+                world[field] = value
+        
+        parse = self.dictionaries['parse'].decode(self.codes['parse'][i])
+        if parse is not None:
+            world['parse'] = json.loads(parse)
+        
+        extras = self.dictionaries['extras'].decode(self.codes['extras'][i])
+        if extras is not None:
+            world.update(json.loads(extras))
+        if self.seeds[i] != ABSENT:
+            world['seed'] = self.seeds[i]
+        return world
+    
+    def __iter__(self):
+        for i in range(self.length):
+            yield self[i]
+    
+    def to_worlds(self) -> list:
+        """Decode every world (defeats the purpose for big batches; prefer indexing or iterating)"""
+        return list(self)
+    
+    def column(self, name: str) -> list:
+        """Decoded values of a dictionary-encoded world column, e.g. column('room_type')"""
+        dictionary = self.dictionaries[name]
+        return [dictionary.decode(code) for code in self.codes[name]]
+    
+    def value_counts(self, name: str) -> dict:
+        """Count of each value in a dictionary-encoded world column, computed on the codes"""
+        codes = np.frombuffer(self.codes[name], dtype=np.int32)
+        counts = np.bincount(codes[codes != ABSENT], minlength=len(self.dictionaries[name]))
+        return {value: int(count) for value, count in zip(self.dictionaries[name].values, counts) if count}
+    
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns and dictionaries"""
+        arrays = [self.seeds, self.present, self.npc_offsets, self.prop_offsets, self.exit_offsets,
+                  self.exit_directions, self.exit_destinations, *self.codes.values(),
+                  *self.npc_codes.values(), self.npc_has_dialogue, *self.prop_codes.values()]
+        total = sum(a.itemsize * len(a) for a in arrays)
+        total += self.names.nbytes + self.npc_names.nbytes + self.mood_tags.nbytes + self.npc_dialogue.nbytes
+        total += sum(dictionary.nbytes for dictionary in self.dictionaries.values())
+        return total
+    
+    # Arrow / Parquet
+    
+    def to_arrow(self):
+        """Export as a pyarrow Table; dictionary columns stay dictionary-encoded"""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("pyarrow is required for Arrow/Parquet export; install it with `pip install pyarrow`")
+        
+        def codes(column: array):
+            return np.frombuffer(column, dtype=np.int32) if len(column) else np.empty(0, dtype=np.int32)
+        
+        def offsets(column: array):
+            return pa.array(np.frombuffer(column, dtype=np.int32))
+        
+        def dictionary_array(column: array, dictionary: Dictionary):
+            values = codes(column)
+            return pa.DictionaryArray.from_arrays(
+                pa.array(values, mask=values == ABSENT), pa.array(dictionary.values, type=pa.string()))
+        
+        def strings(column: StringColumn):
+            return pa.StringArray.from_buffers(
+                len(column.offsets) - 1,
+                pa.py_buffer(np.frombuffer(column.offsets, dtype=np.int32)),
+                pa.py_buffer(bytes(column.data)))
+        
+        def code_list(column: ListColumn, dictionary: Dictionary):
+            return pa.ListArray.from_arrays(offsets(column.offsets), dictionary_array(column.codes, dictionary))
+        
+        columns = {'name': strings(self.names)}
+        for field in ('room_type', 'mood') + TEXT_FIELDS:
+            columns[field] = dictionary_array(self.codes[field], self.dictionaries[field])
+        seeds = np.frombuffer(self.seeds, dtype=np.int64)
+        columns['seed'] = pa.array(seeds, mask=seeds == ABSENT)
+        columns['mood_tags'] = code_list(self.mood_tags, self._dictionary('mood_tags'))
+        
+        npcs = pa.StructArray.from_arrays(
+            [strings(self.npc_names)]
+            + [dictionary_array(self.npc_codes[field], self._dictionary(f"npc_{field}")) for field in NPC_TEXT_FIELDS]
+            + [code_list(self.npc_dialogue, self._dictionary('dialogue'))],
+            ['name', *NPC_TEXT_FIELDS, 'dialogue'])
+        columns['npcs'] = pa.ListArray.from_arrays(offsets(self.npc_offsets), npcs)
+        
+        props = pa.StructArray.from_arrays(
+            [dictionary_array(self.prop_codes[field], self._dictionary(f"prop_{field}")) for field in PROP_FIELDS],
+            list(PROP_FIELDS))
+        columns['props'] = pa.ListArray.from_arrays(offsets(self.prop_offsets), props)
+        
+        exits = pa.StructArray.from_arrays(
+            [dictionary_array(self.exit_directions, self._dictionary('exit_direction')),
+             dictionary_array(self.exit_destinations, self._dictionary('exit_destination'))],
+            ['direction', 'destination'])
+        columns['exits'] = pa.ListArray.from_arrays(offsets(self.exit_offsets), exits)
+        
+        for name in ('parse', 'extras', 'raw'):
+            columns[name] = dictionary_array(self.codes[name], self.dictionaries[name])
+        return pa.table(columns)
+    
+    def to_parquet(self, path: str, compression: str = 'zstd'):
+        """Write the batch to a Parquet file"""
+        table = self.to_arrow()
+        import pyarrow.parquet as pq
+        
+        pq.write_table(table, path, compression=compression)
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """Memory held by nested dicts/lists/strings, counting shared objects once"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare list-of-dicts and columnar memory for a template batch")
+    parser.add_argument('--worlds', type=int, default=100_000)
+    parser.add_argument('--parquet', help="Also write the batch here")
+    args = parser.parse_args()
+    
+    from world_generator import WorldGenerator
+    
+    prompts = [
+        "A throne room with a jester who tells dad jokes",
+        "Dark dungeon, held together by hope, explosive barrels",
+        "Cozy tavern with a grumpy bartender and three goblins",
+        "Cyberpunk alley with neon signs and a shady merchant",
+        "Peaceful library with a sleeping wizard",
+        "Convergence Zero control room with malfunctioning robots",
+    ]
+    generator = WorldGenerator()
+    worlds = generator.generate_batch([prompts[i % len(prompts)] for i in range(args.worlds)])
+    
+    start = time.perf_counter()
+    batch = WorldBatch.from_worlds(worlds)
+    encode_seconds = time.perf_counter() - start
+    dict_bytes = deep_sizeof(worlds)
+    
+    print(f"{len(batch):,} worlds")
+    print(f"list of dicts: {dict_bytes / 2 ** 20:8.1f} MiB")
+    print(f"WorldBatch:    {batch.nbytes / 2 ** 20:8.1f} MiB ({dict_bytes / batch.nbytes:.0f}x smaller, "
+          f"encoded in {encode_seconds:.2f}s)")
+    middle = len(batch) // 2
+    assert batch[middle] == json.loads(json.dumps(worlds[middle]))
+    
+    if args.parquet:
+        start = time.perf_counter()
+        batch.to_parquet(args.parquet)
+        print(f"parquet: {args.parquet} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,45 +3,23 @@ World Generator - Interprets natural language and generates world descriptions
 Supports both template-based and LLM-powered generation
 """
 
+import copy
+import json
+import os
 import random
 import re
+import threading
+from contextlib import nullcontext
 from typing import Optional
-from dataclasses import dataclass, field
-from templates import (
-    ROOM_TEMPLATES, NPC_TEMPLATES, PROP_TEMPLATES,
-    ATMOSPHERE_PHRASES, NAME_PARTS, DIALOGUE_TEMPLATES,
-    STABILITY_DESCRIPTIONS, MOOD_WORDS
-)
+from dataclasses import asdict, dataclass, field
+from template_packs import TemplatePack, default_pack, shared_loader
+from names import NameService
+from matcher import PromptMatch
+from parse_cache import ParseCache, normalize_prompt, shared_parse_cache
 
-@dataclass
-class WorldGenerator:
-    """Generates world descriptions from natural language prompts"""
-    
-    api_key: Optional[str] = None
-    creativity: float = 0.7
-    include_npcs: bool = True
-    include_props: bool = True
-    include_exits: bool = True
-    
-    def set_api_key(self, key: str):
-        """Set the Anthropic API key for LLM generation"""
-        self.api_key = key if key.strip() else None
-    
-    def generate(self, prompt: str) -> dict:
-        """Generate a world from a natural language prompt"""
-        if self.api_key:
-            return self._generate_with_llm(prompt)
-        else:
-            return self._generate_with_templates(prompt)
-    
-    def _generate_with_llm(self, prompt: str) -> dict:
-        """Use Claude API for rich generation"""
-        try:
-            import anthropic
-            
-            client = anthropic.Anthropic(api_key=self.api_key)
-            
-            system_prompt = """You are a creative world builder for games and storytelling. 
+LLM_MODEL = "claude-sonnet-4-20250514"
+
+SYSTEM_PROMPT = """You are a creative world builder for games and storytelling. 
             Given a description, generate a detailed world/room/location.
             
             Respond with ONLY valid JSON in this exact format:
@@ -73,29 +51,275 @@ class WorldGenerator:
             
             Be creative! If they mention jokes, include funny dialogue. Match the mood they describe.
             For "held together by hope" stability, describe things barely holding together."""
+
+# Rough budgets used when packing several prompts into one request
+WORLD_OUTPUT_TOKENS = 1500
+BATCH_OVERHEAD_TOKENS = 100
+SECTION_OUTPUT_TOKENS = 500
+
+# World fields that regenerate() can recompute on their own
+SECTIONS = ('name', 'description', 'atmosphere', 'lighting', 'mood_tags', 'npcs', 'props', 'exits')
+
+# Shape each section must have: (type, required string keys of each list item)
+SECTION_SHAPES = {
+    'name': (str, None),
+    'description': (str, None),
+    'atmosphere': (str, None),
+    'lighting': (str, None),
+    'mood_tags': (list, None),
+    'npcs': (list, ('name', 'type', 'description')),
+    'props': (list, ('name', 'type')),
+    'exits': (dict, None),
+}
+
+# Bookkeeping kept on template worlds for rerolls and storage; not part of exported worlds
+INTERNAL_KEYS = ('parse', 'seed', 'rerolls')
+
+
+def valid_section(section: str, value) -> bool:
+    """Whether a section value has the shape the rest of the app expects"""
+    expected, item_keys = SECTION_SHAPES[section]
+    if not isinstance(value, expected):
+        return False
+    if section == 'mood_tags':
+        return all(isinstance(tag, str) for tag in value)
+    if section == 'exits':
+        return all(isinstance(key, str) and isinstance(dest, str) for key, dest in value.items())
+    if item_keys:
+        return all(isinstance(item, dict) and all(isinstance(item.get(key), str) for key in item_keys)
+                   for item in value)
+    return True
+
+
+def public_world(world: dict) -> dict:
+    """A world without the generator's internal bookkeeping, for downloads and exports"""
+    return {key: value for key, value in world.items() if key not in INTERNAL_KEYS}
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def extract_json(response_text: str):
+    """Parse JSON from an LLM response, handling markdown code blocks"""
+    if "```json" in response_text:
+        response_text = response_text.split("```json")[1].split("```")[0]
+    elif "```" in response_text:
+        response_text = response_text.split("```")[1].split("```")[0]
+    
+    return json.loads(response_text.strip())
+
+
+@dataclass(frozen=True)
+class PromptParse:
+    """Everything template generation reads from a prompt; safe to share between generators"""
+    
+    room_type: str
+    size: str
+    stability: str
+    mood: str
+    npc_counts: tuple = ()      # ((npc_type, count), ...) in pattern order
+    prop_mentions: tuple = ()   # prop types mentioned explicitly
+    joke_style: Optional[str] = None
+
+
+@dataclass
+class WorldGenerator:
+    """Generates world descriptions from natural language prompts"""
+    
+    api_key: Optional[str] = None
+    creativity: float = 0.7
+    include_npcs: bool = True
+    include_props: bool = True
+    include_exits: bool = True
+    max_batch_tokens: int = 8000
+    variety_mode: str = 'low_repeat'
+    name_service: NameService = field(default_factory=NameService, repr=False)
+    template_dir: Optional[str] = None
+    similarity_index: Optional[object] = field(default=None, repr=False)
+    reuse_threshold: Optional[float] = None
+    world_store: Optional[object] = field(default=None, repr=False)
+    parse_cache: ParseCache = field(default_factory=shared_parse_cache, repr=False, compare=False)
+    transport: Optional[object] = field(default=None, repr=False, compare=False)
+    profiler: Optional[object] = field(default=None, repr=False, compare=False)
+    _client: Optional[object] = field(default=None, init=False, repr=False, compare=False)
+    _client_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self._template_loader = shared_loader(self.template_dir) if self.template_dir else None
+        # Remembered so set_api_key() can rebuild the transport with the new key
+        self._transport_spec = None
+        if self.transport is None and os.environ.get("WORLD_FORGE_LLM_TRANSPORT"):
+            from transport import make_transport
             
-            message = client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=1500,
-                messages=[
-                    {"role": "user", "content": f"Create a world based on: {prompt}"}
-                ],
-                system=system_prompt
-            )
-            
-            # Parse the response
-            response_text = message.content[0].text
+            self._transport_spec = os.environ["WORLD_FORGE_LLM_TRANSPORT"]
+            self.transport = make_transport(self._transport_spec, self.api_key)
+        if self.api_key and self.transport is None:
+            self.warm_up()
+    
+    @property
+    def templates(self) -> TemplatePack:
+        """Current template pack, hot-reloaded from template_dir when its files change"""
+        if self._template_loader:
+            return self._template_loader.current()
+        return default_pack()
+    
+    def set_api_key(self, key: str):
+        """Set the Anthropic API key for LLM generation"""
+        key = key if key.strip() else None
+        if key == self.api_key:
+            return
+        
+        # Under the lock, so an in-flight warm-up cannot install a client built with the old key
+        with self._client_lock:
+            self.api_key = key
+            self._client = None
+        if self._transport_spec:
+            from transport import make_transport
             
-            # Try to extract JSON from the response
-            import json
+            self.transport = make_transport(self._transport_spec, key)
+        if self.api_key and self.transport is None:
+            self.warm_up()
+    
+    def warm_up(self):
+        """Import the anthropic SDK and build the client in the background"""
+        def load():
+            try:
+                self._get_client()
+            except Exception:
+                # Reported by the first real LLM call instead
+                pass
+        
+        threading.Thread(target=load, name="anthropic-warmup", daemon=True).start()
+    
+    def _get_client(self):
+        """Create the Anthropic client once; the SDK is only imported on the LLM path"""
+        with self._client_lock:
+            if self._client is None:
+                import anthropic
+                
+                self._client = anthropic.Anthropic(api_key=self.api_key)
+            return self._client
+    
+    def generate(self, prompt: str, seed: Optional[int] = None, remember: bool = True) -> dict:
+        """Generate a world from a natural language prompt; a seed makes template output repeatable
+
+        remember=False skips the similarity index and world store (e.g. for speculative prefetches).
+        """
+        if self.profiler is not None:
+            return self.profiler.observe(prompt, lambda: self._generate(prompt, seed, remember))
+        return self._generate(prompt, seed, remember)
+    
+    def _generate(self, prompt: str, seed: Optional[int], remember: bool) -> dict:
+        with self._stage('reuse'):
+            reused = self._reuse_similar(prompt)
+        if reused:
+            return reused
+        
+        if self.api_key:
+            world = self._generate_with_llm(prompt)
+            if seed is not None:
+                world['seed'] = seed
+        else:
+            world = self._generate_with_templates(prompt, seed)
+        
+        if remember:
+            with self._stage('remember'):
+                self._remember(world)
+        return world
+    
+    def generate_batch(self, prompts: list) -> list:
+        """Generate one world per prompt, packing LLM prompts into shared requests"""
+        if self.profiler is not None:
+            label = f"batch of {len(prompts)}: {prompts[0] if prompts else ''}"
+            return self.profiler.observe(label, lambda: self._generate_batch(prompts))
+        return self._generate_batch(prompts)
+    
+    def _generate_batch(self, prompts: list) -> list:
+        if self.api_key:
+            worlds = self._generate_batch_with_llm(prompts)
+        else:
+            worlds = self._generate_batch_with_templates(prompts)
+        
+        with self._stage('remember'):
+            for world in worlds:
+                self._remember(world)
+        return worlds
+    
+    def _stage(self, name: str):
+        """Time a block as a named stage when a profiler is attached"""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(name)
+    
+    def regenerate(self, world: dict, sections: list = ('npcs',)) -> dict:
+        """Return a copy of a world with only the given sections recomputed"""
+        sections = list(dict.fromkeys(sections))
+        unknown = [section for section in sections if section not in SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown sections {unknown}, expected some of {SECTIONS}")
+        
+        if self.api_key:
+            return self._regenerate_with_llm(world, sections)
+        return self._regenerate_with_templates(world, sections)
+    
+    def find_similar(self, prompt: str, k: int = 5) -> list:
+        """Previously generated worlds close to a prompt, as (score, world) pairs"""
+        if self.similarity_index is None:
+            return []
+        return self.similarity_index.find_similar(prompt, k)
+    
+    def _reuse_similar(self, prompt: str) -> Optional[dict]:
+        """Return a copy of a near-duplicate world if reuse is enabled and one exists"""
+        if self.similarity_index is None or self.reuse_threshold is None:
+            return None
+        
+        matches = self.similarity_index.find_similar(prompt, 1, min_score=self.reuse_threshold)
+        if not matches:
+            return None
+        
+        score, match = matches[0]
+        world = copy.deepcopy(match)
+        world['source'] = 'reused'
+        world['reused_from'] = match.get('original_prompt')
+        world['similarity'] = score
+        world['original_prompt'] = prompt
+        return world
+    
+    def _remember(self, world: dict):
+        """Add a freshly generated world to the similarity index and world store, if configured"""
+        if self.similarity_index is not None:
+            self.similarity_index.add(world)
+        if self.world_store is not None:
+            self.world_store.add(world)
+    
+    def _call_llm(self, content: str, max_tokens: int) -> str:
+        """Send a single user message to Claude and return the response text"""
+        request = {
+            "model": LLM_MODEL,
+            "max_tokens": max_tokens,
+            "messages": [
+                {"role": "user", "content": content}
+            ],
+            "system": SYSTEM_PROMPT
+        }
+        
+        # A record/replay transport stands in for the SDK client when configured
+        with self._stage('llm_request'):
+            if self.transport is not None:
+                return self.transport.send(request)
             
-            # Handle potential markdown code blocks
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0]
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0]
+            message = self._get_client().messages.create(**request)
+            return message.content[0].text
+    
+    def _generate_with_llm(self, prompt: str) -> dict:
+        """Use Claude API for rich generation"""
+        try:
+            response_text = self._call_llm(f"Create a world based on: {prompt}", 1500)
             
-            world = json.loads(response_text.strip())
+            with self._stage('llm_parse'):
+                world = extract_json(response_text)
             world['source'] = 'llm'
             world['original_prompt'] = prompt
             
@@ -109,42 +333,260 @@ class WorldGenerator:
             print(f"LLM generation failed: {e}, falling back to templates")
             return self._generate_with_templates(prompt)
     
-    def _generate_with_templates(self, prompt: str) -> dict:
+    def _regenerate_with_llm(self, world: dict, sections: list) -> dict:
+        """Ask Claude for just the requested sections, keeping the rest of the world as context"""
+        context = {key: value for key, value in world.items()
+                   if key not in sections and key not in INTERNAL_KEYS and key != 'source'}
+        content = (
+            f"Here is an existing world:\n{json.dumps(context, default=str)}\n\n"
+            f"Write new values for only these fields: {', '.join(sections)}. "
+            "Keep them consistent with the rest of the world and use the format above. "
+            "Respond with ONLY a JSON object containing exactly those fields."
+        )
+        
+        try:
+            updates = extract_json(self._call_llm(content, SECTION_OUTPUT_TOKENS * len(sections)))
+            if not isinstance(updates, dict):
+                updates = {}
+        except ImportError:
+            updates = {}
+        except Exception as e:
+            print(f"LLM regeneration failed: {e}, falling back to templates")
+            updates = {}
+        
+        result = copy.deepcopy(world)
+        missing = []
+        for section in sections:
+            # Missing or malformed sections (e.g. npcs as a string) come from templates instead
+            if section in updates and valid_section(section, updates[section]):
+                result[section] = updates[section]
+            else:
+                missing.append(section)
+        
+        if missing:
+            result = self._regenerate_with_templates(result, missing)
+        return result
+    
+    def _pack_prompts(self, prompts: list) -> list:
+        """Split prompt indices into packs that fit one request's token budget"""
+        packs = []
+        current = []
+        current_tokens = estimate_tokens(SYSTEM_PROMPT) + BATCH_OVERHEAD_TOKENS
+        
+        for i, prompt in enumerate(prompts):
+            cost = estimate_tokens(prompt) + WORLD_OUTPUT_TOKENS
+            if current and current_tokens + cost > self.max_batch_tokens:
+                packs.append(current)
+                current = []
+                current_tokens = estimate_tokens(SYSTEM_PROMPT) + BATCH_OVERHEAD_TOKENS
+            current.append(i)
+            current_tokens += cost
+        
+        if current:
+            packs.append(current)
+        
+        return packs
+    
+    def _generate_batch_with_llm(self, prompts: list) -> list:
+        """Generate several worlds per Claude call, falling back per item"""
+        worlds = [None] * len(prompts)
+        
+        for pack in self._pack_prompts(prompts):
+            if len(pack) == 1:
+                worlds[pack[0]] = self._generate_with_llm(prompts[pack[0]])
+                continue
+            
+            numbered = "\n".join(f"{n}. {prompts[i]}" for n, i in enumerate(pack, 1))
+            content = (
+                f"Create one world for each of these {len(pack)} descriptions.\n"
+                "Respond with ONLY a JSON array of world objects in the format above, "
+                "one per description, each with an extra \"index\" field holding the "
+                f"description's number.\n\n{numbered}"
+            )
+            max_tokens = WORLD_OUTPUT_TOKENS * len(pack)
+            
+            try:
+                items = extract_json(self._call_llm(content, max_tokens))
+                if isinstance(items, dict):
+                    items = [items]
+                elif not isinstance(items, list):
+                    # A bare scalar is no usable answer; every item falls back below
+                    items = []
+            except ImportError:
+                items = []
+            except Exception as e:
+                print(f"LLM batch generation failed: {e}, falling back to templates")
+                items = []
+            
+            # Split results back per prompt, by index field or by position
+            by_number = {}
+            for position, item in enumerate(items, 1):
+                if not isinstance(item, dict):
+                    continue
+                number = item.pop('index', position)
+                if isinstance(number, int) and 1 <= number <= len(pack):
+                    by_number.setdefault(number, item)
+            
+            for n, i in enumerate(pack, 1):
+                world = by_number.get(n)
+                if world and world.get('name'):
+                    world['source'] = 'llm'
+                    world['original_prompt'] = prompts[i]
+                    worlds[i] = world
+                else:
+                    worlds[i] = self._generate_with_templates(prompts[i])
+        
+        return worlds
+    
+    def _generate_with_templates(self, prompt: str, seed: Optional[int] = None) -> dict:
         """Generate using smart templates and parsing"""
-        lower_prompt = prompt.lower()
+        # Only a caller's seed fixes the location name; drawn seeds keep names unique
+        name_rng = None if seed is None else random.Random(f"{seed}:name")
+        if seed is None:
+            seed = random.getrandbits(32)
+        rng = random.Random(seed)
         
         # Parse the prompt
-        room_type = self._detect_room_type(lower_prompt)
-        size = self._detect_size(lower_prompt)
-        stability = self._detect_stability(lower_prompt)
-        mood = self._detect_mood(lower_prompt)
+        with self._stage('parse'):
+            parse = self._parse_prompt(prompt)
+        
+        with self._stage('build'):
+            world = self._build_world(
+                prompt, parse,
+                name=self._generate_name(parse.room_type, parse.mood, name_rng),
+                atmosphere=self._generate_atmosphere(parse.room_type, parse.mood, parse.stability, rng),
+                mood_tags=self._generate_mood_tags(parse.mood, parse.room_type, rng),
+                rng=rng,
+            )
+        world['seed'] = seed
+        return world
+    
+    def _generate_batch_with_templates(self, prompts: list) -> list:
+        """Generate many template worlds, drawing names and flavor for the whole batch at once"""
+        from variety import VarietyEngine
+        
+        with self._stage('parse'):
+            parsed = [self._parse_prompt(prompt) for prompt in prompts]
+        room_types = [p.room_type for p in parsed]
+        stabilities = [p.stability for p in parsed]
+        moods = [p.mood for p in parsed]
+        
+        with self._stage('build'):
+            engine = VarietyEngine(mode=self.variety_mode, templates=self.templates)
+            names = engine.draw_names(room_types, moods)
+            atmospheres = engine.draw_atmospheres(room_types, moods, stabilities)
+            mood_tags = engine.draw_mood_tags(moods, room_types)
+            
+            return [
+                self._build_world(
+                    prompt, parse,
+                    name=names[i], atmosphere=atmospheres[i], mood_tags=mood_tags[i],
+                )
+                for i, (prompt, parse) in enumerate(zip(prompts, parsed))
+            ]
+    
+    def _regenerate_with_templates(self, world: dict, sections: list) -> dict:
+        """Recompute sections from the world's stored parse, with a fresh seed per reroll"""
+        parse = self._stored_parse(world)
+        room_templates = self.templates.ROOM_TEMPLATES
+        template = room_templates.get(parse.room_type, room_templates['generic'])
+        
+        result = copy.deepcopy(world)
+        seed = result.setdefault('seed', random.getrandbits(32))
+        rerolls = result.setdefault('rerolls', {})
+        
+        for section in sections:
+            rerolls[section] = rerolls.get(section, 0) + 1
+            rng = random.Random(f"{seed}:{section}:{rerolls[section]}")
+            
+            if section == 'name':
+                result['name'] = self._generate_name(parse.room_type, parse.mood, rng)
+            elif section == 'description':
+                result['description'] = self._fill_template(template['description'], parse.mood, parse.stability)
+            elif section == 'atmosphere':
+                result['atmosphere'] = self._generate_atmosphere(parse.room_type, parse.mood, parse.stability, rng)
+            elif section == 'lighting':
+                result['lighting'] = template.get('lighting', 'Ambient light from unknown sources')
+            elif section == 'mood_tags':
+                result['mood_tags'] = self._generate_mood_tags(parse.mood, parse.room_type, rng)
+            elif section == 'npcs':
+                result['npcs'] = self._generate_npcs(parse.npc_counts, parse.joke_style, rng)
+            elif section == 'props':
+                result['props'] = self._generate_props(parse.prop_mentions, template)
+            elif section == 'exits':
+                result['exits'] = self._generate_exits(parse.room_type)
+        
+        return result
+    
+    def _stored_parse(self, world: dict) -> PromptParse:
+        """The parse a template world was built from, or a fresh parse of its prompt"""
+        stored = world.get('parse')
+        if not stored:
+            return self._parse_prompt(world.get('original_prompt', ''))
+        
+        # JSON round trips turn the tuples into lists
+        return PromptParse(**{
+            **stored,
+            'npc_counts': tuple(tuple(pair) for pair in stored.get('npc_counts', ())),
+            'prop_mentions': tuple(stored.get('prop_mentions', ())),
+        })
+    
+    def _parse_prompt(self, prompt: str) -> PromptParse:
+        """Parse a prompt, memoized per template pack in the shared parse cache"""
+        text = normalize_prompt(prompt)
+        key = (self.templates.content_hash, text)
+        return self.parse_cache.get_or_compute(key, lambda: self._compute_parse(text))
+    
+    def _compute_parse(self, prompt: str) -> PromptParse:
+        """Detect every structured field from a normalized prompt"""
+        match = self.match_prompt(prompt)
+        return PromptParse(
+            room_type=match.room_type,
+            size=self._detect_size(prompt),
+            stability=self._detect_stability(prompt),
+            mood=match.mood,
+            npc_counts=self._detect_npcs(prompt),
+            prop_mentions=self._detect_props(prompt),
+            joke_style=self._detect_joke_style(prompt),
+        )
+    
+    def match_prompt(self, prompt: str) -> PromptMatch:
+        """Score room types and moods for a prompt, with confidences"""
+        return self.templates.PROMPT_INDEX.match(prompt)
+    
+    def _build_world(self, prompt: str, parse: PromptParse, name: str, atmosphere: str, mood_tags: list,
+                     rng=None) -> dict:
+        """Assemble a template world from parsed fields and drawn flavor text; rng seeds the NPC names"""
+        room_type, size, stability, mood = parse.room_type, parse.size, parse.stability, parse.mood
         
         # Get base template
-        template = ROOM_TEMPLATES.get(room_type, ROOM_TEMPLATES['generic'])
+        room_templates = self.templates.ROOM_TEMPLATES
+        template = room_templates.get(room_type, room_templates['generic'])
         
         # Generate world
         world = {
-            'name': self._generate_name(room_type, mood),
+            'name': name,
             'description': self._fill_template(template['description'], mood, stability),
-            'atmosphere': self._generate_atmosphere(room_type, mood, stability),
+            'atmosphere': atmosphere,
             'size': size,
             'stability': stability,
             'lighting': template.get('lighting', 'Ambient light from unknown sources'),
-            'mood_tags': self._generate_mood_tags(mood, room_type),
+            'mood_tags': mood_tags,
             'npcs': [],
             'props': [],
             'exits': {},
             'source': 'template',
-            'original_prompt': prompt
+            'original_prompt': prompt,
+            'parse': asdict(parse)
         }
         
         # Add NPCs if requested
         if self.include_npcs:
-            world['npcs'] = self._generate_npcs(lower_prompt, room_type)
+            world['npcs'] = self._generate_npcs(parse.npc_counts, parse.joke_style, rng, sample_dialogue=False)
         
         # Add props if requested
         if self.include_props:
-            world['props'] = self._generate_props(lower_prompt, room_type, template)
+            world['props'] = self._generate_props(parse.prop_mentions, template)
         
         # Add exits if requested
         if self.include_exits:
@@ -154,67 +596,11 @@ class WorldGenerator:
     
     def _detect_room_type(self, prompt: str) -> str:
         """Detect the type of room/location from the prompt"""
-        type_keywords = {
-            'throne': 'throne_room',
-            'throne room': 'throne_room',
-            'castle': 'throne_room',
-            'dungeon': 'dungeon',
-            'cell': 'dungeon',
-            'prison': 'dungeon',
-            'cave': 'cave',
-            'cavern': 'cave',
-            'tavern': 'tavern',
-            'inn': 'tavern',
-            'bar': 'tavern',
-            'pub': 'tavern',
-            'library': 'library',
-            'study': 'library',
-            'laboratory': 'laboratory',
-            'lab': 'laboratory',
-            'forest': 'forest',
-            'woods': 'forest',
-            'grove': 'forest',
-            'temple': 'temple',
-            'shrine': 'temple',
-            'church': 'temple',
-            'city': 'city',
-            'street': 'city',
-            'alley': 'alley',
-            'cyberpunk': 'cyberpunk',
-            'neon': 'cyberpunk',
-            'space': 'space_station',
-            'station': 'space_station',
-            'spaceship': 'space_station',
-            'ship': 'space_station',
-            'convergence': 'convergence_zero',
-            'convergence zero': 'convergence_zero',
-            'void': 'void',
-            'abstract': 'void',
-            'chaos': 'void',
-        }
-        
-        for keyword, room_type in type_keywords.items():
-            if keyword in prompt:
-                return room_type
-        
-        return 'generic'
+        return self.match_prompt(prompt).room_type
     
     def _detect_size(self, prompt: str) -> str:
         """Detect size from prompt"""
-        size_keywords = {
-            'tiny': 'tiny',
-            'small': 'small',
-            'cozy': 'small',
-            'medium': 'medium',
-            'large': 'large',
-            'huge': 'vast',
-            'vast': 'vast',
-            'massive': 'vast',
-            'sprawling': 'vast',
-            'enormous': 'vast',
-        }
-        
-        for keyword, size in size_keywords.items():
+        for keyword, size in self.templates.SIZE_KEYWORDS.items():
             if keyword in prompt:
                 return size
         
@@ -234,61 +620,50 @@ class WorldGenerator:
     
     def _detect_mood(self, prompt: str) -> str:
         """Detect mood/atmosphere from prompt"""
-        mood_keywords = {
-            'dark': 'dark',
-            'gloomy': 'dark',
-            'spooky': 'spooky',
-            'haunted': 'spooky',
-            'creepy': 'spooky',
-            'bright': 'bright',
-            'cheerful': 'cheerful',
-            'happy': 'cheerful',
-            'cozy': 'cozy',
-            'warm': 'cozy',
-            'peaceful': 'peaceful',
-            'calm': 'peaceful',
-            'serene': 'peaceful',
-            'mysterious': 'mysterious',
-            'eerie': 'mysterious',
-            'ancient': 'ancient',
-            'old': 'ancient',
-            'ruined': 'ruined',
-            'abandoned': 'ruined',
-            'busy': 'busy',
-            'crowded': 'busy',
-            'elegant': 'elegant',
-            'grand': 'elegant',
-            'dirty': 'gritty',
-            'grimy': 'gritty',
-            'gritty': 'gritty',
-        }
-        
-        for keyword, mood in mood_keywords.items():
-            if keyword in prompt:
-                return mood
-        
-        return 'neutral'
+        return self.match_prompt(prompt).mood
     
-    def _generate_name(self, room_type: str, mood: str) -> str:
-        """Generate a creative name for the location"""
-        prefixes = NAME_PARTS.get('prefixes', {}).get(mood, ['The'])
-        cores = NAME_PARTS.get('cores', {}).get(room_type, ['Chamber'])
-        suffixes = NAME_PARTS.get('suffixes', [''])
-        
-        prefix = random.choice(prefixes)
-        core = random.choice(cores)
-        suffix = random.choice(suffixes) if random.random() > 0.5 else ''
+    def _detect_npcs(self, prompt: str) -> tuple:
+        """Detect mentioned NPC types and how many of each"""
+        counts = []
+        templates = self.templates
         
-        name = f"{prefix} {core}"
-        if suffix:
-            name += f" {suffix}"
+        for pattern, npc_type in templates.NPC_PATTERNS:
+            if re.search(pattern, prompt):
+                # Try to find quantity
+                count = 1
+                for quantity_pattern, num in templates.QUANTITY_PATTERNS[npc_type]:
+                    if re.search(quantity_pattern, prompt):
+                        count = num
+                        break
+                counts.append((npc_type, count))
         
-        return name
+        return tuple(counts)
+    
+    def _detect_props(self, prompt: str) -> tuple:
+        """Detect explicitly mentioned props"""
+        prop_templates = self.templates.PROP_TEMPLATES
+        mentions = []
+        for keyword, prop_type in self.templates.PROP_KEYWORDS.items():
+            if keyword in prompt and prop_type in prop_templates and prop_type not in mentions:
+                mentions.append(prop_type)
+        return tuple(mentions)
+    
+    def _detect_joke_style(self, prompt: str) -> Optional[str]:
+        """Which joke dialogue table a prompt asks for, if any"""
+        if 'joke' in prompt or 'jokes' in prompt:
+            if 'dad' in prompt or 'bad' in prompt:
+                return 'dad_jokes'
+            return 'jokes'
+        return None
+    
+    def _generate_name(self, room_type: str, mood: str, rng=None) -> str:
+        """Generate a creative name for the location, unique within this generator (or fixed by a seeded rng)"""
+        return self.name_service.location_name(room_type, mood, templates=self.templates, rng=rng)
     
     def _fill_template(self, template: str, mood: str, stability: str) -> str:
         """Fill in template placeholders"""
-        mood_adj = MOOD_WORDS.get(mood, ['atmospheric'])[0]
-        stability_desc = STABILITY_DESCRIPTIONS.get(stability, '')
+        mood_adj = self.templates.MOOD_WORDS.get(mood, ['atmospheric'])[0]
+        stability_desc = self.templates.STABILITY_DESCRIPTIONS.get(stability, '')
         
         result = template.replace('{mood}', mood_adj)
         if stability == 'hope' or stability == 'fragile':
@@ -296,156 +671,97 @@ class WorldGenerator:
         
         return result
     
-    def _generate_atmosphere(self, room_type: str, mood: str, stability: str) -> str:
+    def _generate_atmosphere(self, room_type: str, mood: str, stability: str, rng=random) -> str:
         """Generate atmospheric description"""
-        phrases = ATMOSPHERE_PHRASES.get(room_type, ATMOSPHERE_PHRASES['generic'])
-        mood_phrases = ATMOSPHERE_PHRASES.get(f"mood_{mood}", [])
+        atmosphere = self.templates.ATMOSPHERE_PHRASES
+        phrases = atmosphere.get(room_type, atmosphere['generic'])
+        mood_phrases = atmosphere.get(f"mood_{mood}", [])
         
-        base = random.choice(phrases)
+        base = rng.choice(phrases)
         
         if mood_phrases:
-            base += " " + random.choice(mood_phrases)
+            base += " " + rng.choice(mood_phrases)
         
-        if stability == 'hope':
-            base += " Everything seems to be barely holding together, as if one wrong move could bring it all down."
-        elif stability == 'fragile':
-            base += " Cracks spider across the surfaces, and dust falls with every vibration."
+        if stability in self.templates.STABILITY_ATMOSPHERE:
+            base += " " + self.templates.STABILITY_ATMOSPHERE[stability]
         
         return base
     
-    def _generate_mood_tags(self, mood: str, room_type: str) -> list:
+    def _generate_mood_tags(self, mood: str, room_type: str, rng=random) -> list:
         """Generate mood tags for the location"""
         tags = [mood] if mood != 'neutral' else []
         tags.append(room_type.replace('_', ' '))
         
-        extra_tags = ['atmospheric', 'immersive', 'detailed']
-        tags.append(random.choice(extra_tags))
+        tags.append(rng.choice(self.templates.EXTRA_MOOD_TAGS))
         
         return tags[:4]
     
-    def _generate_npcs(self, prompt: str, room_type: str) -> list:
-        """Generate NPCs based on prompt"""
+    def _generate_npcs(self, npc_counts: tuple, joke_style: Optional[str] = None, rng=None,
+                       sample_dialogue: bool = True) -> list:
+        """Generate NPCs from parsed (npc_type, count) pairs; rng seeds names (and dialogue picks if sampling)"""
         npcs = []
+        name_scope = self.name_service.new_scope(rng)
+        npc_templates = self.templates.NPC_TEMPLATES
         
-        # NPC patterns to look for
-        npc_patterns = [
-            (r'(\w+)?\s*jester', 'jester'),
-            (r'(\w+)?\s*guard', 'guard'),
-            (r'(\w+)?\s*wizard', 'wizard'),
-            (r'(\w+)?\s*bartender', 'bartender'),
-            (r'(\w+)?\s*merchant', 'merchant'),
-            (r'(\w+)?\s*goblin', 'goblin'),
-            (r'(\w+)?\s*skeleton', 'skeleton'),
-            (r'(\w+)?\s*robot', 'robot'),
-            (r'(\w+)?\s*king', 'king'),
-            (r'(\w+)?\s*queen', 'queen'),
-            (r'(\w+)?\s*dragon', 'dragon'),
-            (r'(\w+)?\s*cat', 'cat'),
-            (r'(\w+)?\s*dog', 'dog'),
-            (r'potato\s*person|potato\s*people', 'potato_person'),
-        ]
-        
-        # Check for quantity words
-        quantity_words = {
-            'a': 1, 'an': 1, 'one': 1,
-            'two': 2, 'couple': 2,
-            'three': 3, 'few': 3,
-            'four': 4,
-            'five': 5, 'several': 5,
-            'six': 6,
-            'many': 4,
-            'some': 3,
-        }
-        
-        for pattern, npc_type in npc_patterns:
-            if re.search(pattern, prompt):
-                # Try to find quantity
-                count = 1
-                for word, num in quantity_words.items():
-                    if re.search(rf'\b{word}\b.*{npc_type}', prompt):
-                        count = num
-                        break
-                
-                template = NPC_TEMPLATES.get(npc_type, NPC_TEMPLATES['generic'])
-                
-                for i in range(count):
-                    npc = {
-                        'name': self._generate_npc_name(npc_type, i),
-                        'type': npc_type.replace('_', ' ').title(),
-                        'description': template['description'],
-                        'behavior': template['behavior'],
-                        'dialogue': self._generate_dialogue(npc_type, prompt)
-                    }
-                    npcs.append(npc)
+        for npc_type, count in npc_counts:
+            template = npc_templates.get(npc_type, npc_templates['generic'])
+            
+            for i in range(count):
+                npc = {
+                    'name': self._generate_npc_name(npc_type, name_scope, rng),
+                    'type': npc_type.replace('_', ' ').title(),
+                    'description': template['description'],
+                    'behavior': template['behavior'],
+                    'dialogue': self._generate_dialogue(npc_type, joke_style, rng if sample_dialogue else None)
+                }
+                npcs.append(npc)
         
         return npcs
     
-    def _generate_npc_name(self, npc_type: str, index: int = 0) -> str:
-        """Generate a name for an NPC"""
-        name_lists = {
-            'jester': ['Finnick the Foolish', 'Motley Pete', 'Jingles', 'Bells McGee', 'Chuckles'],
-            'guard': ['Ser Marcus', 'Grim Gerald', 'Stone-faced Stan', 'Watchful Wendy', 'Iron Ivan'],
-            'wizard': ['Mysticus the Grey', 'Eldwin Sparkle', 'Nox the Unknowable', 'Sage Whisperwind'],
-            'bartender': ['Old Gus', 'Molly Stoutarm', 'Gruff McGruffin', 'Barrel Betty'],
-            'merchant': ['Silvertongue Sam', 'Honest Abe', 'Shady Sadie', 'Coins McGraw'],
-            'goblin': ['Snarl', 'Grubnik', 'Pointy Pete', 'Wort', 'Skritch', 'Nob'],
-            'skeleton': ['Bones', 'Rattles', 'Sir Calcium', 'Dusty', 'Clacksworth'],
-            'robot': ['Unit-7', 'RX-42', 'Chrome', 'Servo', 'Rusty'],
-            'king': ['King Aldric', 'His Majesty Thornwell', 'King Barron III'],
-            'queen': ['Queen Seraphina', 'Her Majesty Elowen', 'Queen Margot'],
-            'potato_person': ['Spud', 'Tater', 'Russet Ron', 'Yukon Yolanda', 'Mash'],
-        }
-        
-        names = name_lists.get(npc_type, ['Stranger', 'Unknown Figure', 'Mysterious Entity'])
-        return names[index % len(names)]
+    def _generate_npc_name(self, npc_type: str, scope=None, rng=None) -> str:
+        """Generate a name for an NPC, unique within the scope (usually one world)"""
+        if scope is None:
+            scope = self.name_service.new_scope(rng)
+        return self.name_service.npc_name(npc_type, scope, templates=self.templates, rng=rng)
     
-    def _generate_dialogue(self, npc_type: str, prompt: str) -> list:
-        """Generate dialogue for an NPC"""
-        # Check for joke-related keywords
-        if 'joke' in prompt or 'jokes' in prompt:
-            if 'dad' in prompt or 'bad' in prompt:
-                return DIALOGUE_TEMPLATES['dad_jokes'][:5]
-            return DIALOGUE_TEMPLATES.get('jokes', DIALOGUE_TEMPLATES['generic'])[:3]
+    def _generate_dialogue(self, npc_type: str, joke_style: Optional[str] = None, rng=None) -> list:
+        """Generate dialogue for an NPC (the first lines, or a random pick when rerolling)"""
+        dialogue = self.templates.DIALOGUE_TEMPLATES
+        
+        # Prompts that ask for jokes get joke dialogue
+        if joke_style == 'dad_jokes':
+            lines, count = dialogue['dad_jokes'], 5
+        elif joke_style:
+            lines, count = dialogue.get('jokes', dialogue['generic']), 3
+        else:
+            lines, count = dialogue.get(npc_type, dialogue['generic']), 3
         
-        return DIALOGUE_TEMPLATES.get(npc_type, DIALOGUE_TEMPLATES['generic'])[:3]
+        if rng is not None:
+            return rng.sample(lines, min(count, len(lines)))
+        return lines[:count]
     
-    def _generate_props(self, prompt: str, room_type: str, template: dict) -> list:
+    def _generate_props(self, prop_mentions: tuple, template: dict) -> list:
         """Generate props for the room"""
         props = []
+        prop_templates = self.templates.PROP_TEMPLATES
         
         # Get default props for room type
         default_props = template.get('default_props', [])
         for prop_type in default_props:
-            if prop_type in PROP_TEMPLATES:
-                prop_data = PROP_TEMPLATES[prop_type]
+            if prop_type in prop_templates:
+                prop_data = prop_templates[prop_type]
                 props.append({
                     'name': prop_data['name'],
                     'type': prop_data['type'],
                     'description': prop_data['description']
                 })
         
-        # Check for explicitly mentioned props
-        prop_keywords = {
-            'barrel': 'barrel',
-            'explosive': 'explosive_barrel',
-            'crate': 'crate',
-            'chest': 'chest',
-            'table': 'table',
-            'chair': 'chair',
-            'throne': 'throne',
-            'torch': 'torch',
-            'bookshelf': 'bookshelf',
-            'bed': 'bed',
-            'cauldron': 'cauldron',
-            'computer': 'computer',
-            'terminal': 'terminal',
-        }
-        
-        for keyword, prop_type in prop_keywords.items():
-            if keyword in prompt and prop_type in PROP_TEMPLATES:
+        # Add explicitly mentioned props
+        for prop_type in prop_mentions:
+            if prop_type in prop_templates:
                 # Avoid duplicates
-                if not any(p['name'] == PROP_TEMPLATES[prop_type]['name'] for p in props):
-                    prop_data = PROP_TEMPLATES[prop_type]
+                if not any(p['name'] == prop_templates[prop_type]['name'] for p in props):
+                    prop_data = prop_templates[prop_type]
                     props.append({
                         'name': prop_data['name'],
                         'type': prop_data['type'],
@@ -456,42 +772,5 @@ class WorldGenerator:
     
     def _generate_exits(self, room_type: str) -> dict:
         """Generate exits for the room"""
-        exit_templates = {
-            'throne_room': {
-                'north': 'Royal Chambers',
-                'south': 'Grand Entrance Hall',
-                'east': 'War Room',
-            },
-            'dungeon': {
-                'north': 'Deeper into the dungeon',
-                'south': 'Stairs leading up',
-                'east': 'Another cell block',
-            },
-            'tavern': {
-                'south': 'The main street',
-                'up': 'Rooms for rent',
-            },
-            'library': {
-                'north': 'Restricted Section',
-                'south': 'Main Hall',
-            },
-            'cave': {
-                'north': 'Deeper into darkness',
-                'south': 'Towards daylight',
-            },
-            'cyberpunk': {
-                'north': 'Neon District',
-                'south': 'Underground Market',
-                'up': 'Rooftops',
-            },
-            'convergence_zero': {
-                'north': 'Command Center',
-                'south': 'Docking Bay',
-                'down': 'Maintenance Tunnels',
-            },
-        }
-        
-        return exit_templates.get(room_type, {
-            'north': 'Unknown passage',
-            'south': 'The way back',
-        })
+        exits = self.templates.EXIT_TEMPLATES
+        return dict(exits.get(room_type, exits['generic']))
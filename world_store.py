@@ -0,0 +1,291 @@
+"""
+World Store - Persistent SQLite storage for generated worlds
+Scalar fields, NPCs and props are broken out into indexed columns so queries never scan JSON
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional
+from template_packs import default_pack
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS worlds (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    room_type TEXT,
+    mood TEXT,
+    size TEXT,
+    stability TEXT,
+    source TEXT,
+    prompt TEXT,
+    created_at REAL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS npcs (
+    world_id INTEGER NOT NULL REFERENCES worlds(id),
+    npc_type TEXT,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS props (
+    world_id INTEGER NOT NULL REFERENCES worlds(id),
+    prop_name TEXT,
+    prop_type TEXT,
+    prop_key TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_worlds_room_stability ON worlds(room_type, stability);
+CREATE INDEX IF NOT EXISTS idx_worlds_mood ON worlds(mood);
+CREATE INDEX IF NOT EXISTS idx_worlds_size ON worlds(size);
+CREATE INDEX IF NOT EXISTS idx_worlds_source ON worlds(source);
+CREATE INDEX IF NOT EXISTS idx_worlds_prompt ON worlds(prompt);
+CREATE INDEX IF NOT EXISTS idx_npcs_type ON npcs(npc_type, world_id);
+CREATE INDEX IF NOT EXISTS idx_npcs_world ON npcs(world_id);
+CREATE INDEX IF NOT EXISTS idx_props_name ON props(prop_name, world_id);
+CREATE INDEX IF NOT EXISTS idx_props_key ON props(prop_key, world_id);
+CREATE INDEX IF NOT EXISTS idx_props_type ON props(prop_type, world_id);
+CREATE INDEX IF NOT EXISTS idx_props_world ON props(world_id);
+"""
+
+
+def _slug(value: str) -> str:
+    """'Potato Person' -> 'potato_person'"""
+    return (value or '').strip().lower().replace(' ', '_')
+
+
+def _items(value) -> list:
+    """A world's npcs or props as a list; None or a non-list counts as empty"""
+    return value if isinstance(value, (list, tuple)) else []
+
+
+class WorldStore:
+    """Batched, WAL-mode SQLite store for world dicts
+
+    Writes are flushed every batch_size worlds, or flush_interval seconds after
+    the first unwritten one (from a timer, so a lone write is not left waiting).
+    Props are indexed by template key ('barrel' for a 'Wooden Barrel'), resolved
+    through `templates` (the built-in pack by default); props no template
+    defines are keyed by their slugged name.
+    """
+    
+    def __init__(self, path: str = 'worlds.db', batch_size: int = 500, flush_interval: float = 1.0,
+                 templates=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.templates = templates
+        self._pending = []
+        self._pending_since = None
+        self._timer = None
+        self._lock = threading.Lock()
+        
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+        
+        prop_templates = (templates or default_pack()).PROP_TEMPLATES
+        self._prop_keys = {_slug(data['name']): key for key, data in prop_templates.items()}
+        self._prop_keys.update({key: key for key in prop_templates})
+        if self._backfill:
+            self._backfill_prop_keys()
+    
+    def _migrate(self):
+        """Add columns introduced after a database was created"""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(props)")]
+        self._backfill = bool(columns) and 'prop_key' not in columns
+        if self._backfill:
+            self.conn.execute("ALTER TABLE props ADD COLUMN prop_key TEXT")
+    
+    def _backfill_prop_keys(self):
+        with self.conn:
+            names = [row[0] for row in self.conn.execute("SELECT DISTINCT prop_name FROM props")]
+            self.conn.executemany("UPDATE props SET prop_key = ? WHERE prop_name = ?",
+                                  [(self._prop_key(name), name) for name in names])
+    
+    def _prop_key(self, name: str) -> str:
+        """Template key for a prop name or key, falling back to the slugged name"""
+        slug = _slug(name)
+        return self._prop_keys.get(slug, slug)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _classify(self, world: dict) -> tuple:
+        """Room type and mood, from the world itself, its stored parse, or by matching its prompt"""
+        parse = world.get('parse') if isinstance(world.get('parse'), dict) else {}
+        room_type = world.get('room_type') or parse.get('room_type')
+        mood = world.get('mood') or parse.get('mood')
+        if not room_type or not mood:
+            match = (self.templates or default_pack()).PROMPT_INDEX.match(world.get('original_prompt', ''))
+            room_type = room_type or match.room_type
+            mood = mood or match.mood
+        return room_type, mood
+    
+    def add(self, world: dict):
+        """Queue a world; it is written with the next batch"""
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append(world)
+            due = (len(self._pending) >= self.batch_size
+                   or time.monotonic() - self._pending_since >= self.flush_interval)
+            if not due and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+    
+    def add_many(self, worlds: list):
+        """Write many worlds in a single transaction"""
+        with self._lock:
+            self._pending.extend(worlds)
+        self.flush()
+    
+    def flush(self) -> int:
+        """Write all queued worlds, returning how many were written"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+            
+            try:
+                with self.conn:
+                    cursor = self.conn.cursor()
+                    npc_rows = []
+                    prop_rows = []
+                    for world in pending:
+                        cursor.execute(
+                            "INSERT INTO worlds (name, room_type, mood, size, stability, source, prompt, created_at, data) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            self._world_row(world),
+                        )
+                        self._child_rows(cursor.lastrowid, world, npc_rows, prop_rows)
+                    self._insert_children(cursor, npc_rows, prop_rows)
+            except Exception:
+                # The transaction rolled back; keep the batch for the next flush
+                self._pending = pending + self._pending
+                raise
+            return len(pending)
+    
+    def _world_row(self, world: dict) -> tuple:
+        room_type, mood = self._classify(world)
+        return (
+            world.get('name'), room_type, mood, world.get('size'), world.get('stability'),
+            world.get('source'), world.get('original_prompt'), time.time(),
+            json.dumps(world, default=str),
+        )
+    
+    def _child_rows(self, world_id: int, world: dict, npc_rows: list, prop_rows: list):
+        # LLM worlds are not validated: skip entries that are not objects (e.g. bare name strings)
+        npc_rows.extend(
+            (world_id, _slug(str(npc.get('type') or '')), npc.get('name'))
+            for npc in _items(world.get('npcs')) if isinstance(npc, dict)
+        )
+        prop_rows.extend(
+            (world_id, _slug(str(prop.get('name') or '')), prop.get('type'), self._prop_key(str(prop.get('name') or '')))
+            for prop in _items(world.get('props')) if isinstance(prop, dict)
+        )
+    
+    def _insert_children(self, cursor, npc_rows: list, prop_rows: list):
+        cursor.executemany("INSERT INTO npcs (world_id, npc_type, name) VALUES (?, ?, ?)", npc_rows)
+        cursor.executemany("INSERT INTO props (world_id, prop_name, prop_type, prop_key) VALUES (?, ?, ?, ?)",
+                           prop_rows)
+    
+    def replace(self, world: dict) -> int:
+        """Overwrite the world find() returns for this world's prompt (adding it if there is none); returns its id"""
+        self.flush()
+        with self._lock, self.conn:
+            cursor = self.conn.cursor()
+            row = cursor.execute(
+                "SELECT id FROM worlds WHERE prompt = ? ORDER BY id DESC LIMIT 1", (world.get('original_prompt'),)
+            ).fetchone()
+            if row is None:
+                cursor.execute(
+                    "INSERT INTO worlds (name, room_type, mood, size, stability, source, prompt, created_at, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    self._world_row(world),
+                )
+                world_id = cursor.lastrowid
+            else:
+                world_id = row[0]
+                cursor.execute(
+                    "UPDATE worlds SET name = ?, room_type = ?, mood = ?, size = ?, stability = ?, source = ?, "
+                    "prompt = ?, created_at = ?, data = ? WHERE id = ?",
+                    self._world_row(world) + (world_id,),
+                )
+                cursor.execute("DELETE FROM npcs WHERE world_id = ?", (world_id,))
+                cursor.execute("DELETE FROM props WHERE world_id = ?", (world_id,))
+            npc_rows, prop_rows = [], []
+            self._child_rows(world_id, world, npc_rows, prop_rows)
+            self._insert_children(cursor, npc_rows, prop_rows)
+        return world_id
+    
+    def close(self):
+        """Flush pending writes and close the database"""
+        self.flush()
+        self.conn.close()
+    
+    def get(self, world_id: int) -> Optional[dict]:
+        """Load one world by id"""
+        self.flush()
+        with self._lock:
+            row = self.conn.execute("SELECT data FROM worlds WHERE id = ?", (world_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def find(self, prompt: str) -> Optional[dict]:
+        """The most recently stored world for an exact prompt"""
+        self.flush()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT data FROM worlds WHERE prompt = ? ORDER BY id DESC LIMIT 1", (prompt,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def _where(self, room_type=None, mood=None, size=None, stability=None, source=None,
+               npc_type=None, prop=None, prop_type=None) -> tuple:
+        """WHERE clause and parameters for a query; every filter hits an index"""
+        clauses = []
+        params = []
+        for column, value in (('room_type', room_type), ('mood', mood), ('size', size),
+                              ('stability', stability), ('source', source)):
+            if value is not None:
+                clauses.append(f"w.{column} = ?")
+                params.append(value)
+        if npc_type is not None:
+            clauses.append("EXISTS (SELECT 1 FROM npcs n WHERE n.npc_type = ? AND n.world_id = w.id)")
+            params.append(_slug(npc_type))
+        if prop is not None:
+            # Template key or display name: 'barrel' and 'Wooden Barrel' both match a Wooden Barrel
+            clauses.append("EXISTS (SELECT 1 FROM props p WHERE p.prop_key = ? AND p.world_id = w.id)")
+            params.append(self._prop_key(prop))
+        if prop_type is not None:
+            clauses.append("EXISTS (SELECT 1 FROM props p WHERE p.prop_type = ? AND p.world_id = w.id)")
+            params.append(prop_type)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+    
+    def query(self, limit: int = 100, offset: int = 0, **filters) -> list:
+        """Worlds matching every filter, e.g. query(room_type='dungeon', stability='fragile', npc_type='goblin')"""
+        self.flush()
+        where, params = self._where(**filters)
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT w.data FROM worlds w{where} ORDER BY w.id LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+    
+    def count(self, **filters) -> int:
+        """Number of worlds matching every filter"""
+        self.flush()
+        where, params = self._where(**filters)
+        with self._lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM worlds w{where}", params).fetchone()[0]